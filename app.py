@@ -1,50 +1,514 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, flash
-import trabalho  # imports functions from the provided trabalho.py (keeps original logic)
+from flask import Flask, render_template, request, redirect, url_for, jsonify, flash, Response, session, make_response, g, abort
+from flask import stream_template, stream_with_context
+from markupsafe import Markup, escape
+import tarefas  # headless core package (trabalho.py re-exports it for the desktop app); no tkinter here
+import contextlib
+import functools
+import hashlib
+import io
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
 from datetime import datetime
 
 app = Flask(__name__)
 app.secret_key = 'dev-key'
 
-# Ensure DB initialized (uses trabalho.init_db)
-trabalho.init_db()
+# multi-tenant mode: every user or team gets its own database file (tarefas.tenants), picked per
+# request from the X-Tenant header or ?tenant= (remembered in the session), else DEFAULT_TENANT
+TENANTS_ENABLED = os.environ.get('TASKS_TENANTS') == '1'
+DEFAULT_TENANT = os.environ.get('TASKS_DEFAULT_TENANT', 'default')
 
-def row_to_dict(row):
-    # sqlite3.Row or tuple
+# Ensure DB initialized (uses tarefas.init_db); tenant databases are set up on first open
+if not TENANTS_ENABLED:
+    tarefas.init_db()
+
+ALERT_LOG_SIZE = 1000            # alerts kept in memory for Last-Event-ID resume
+STREAM_HEARTBEAT_SECONDS = 15    # keep-alive comment so proxies don't drop idle streams
+STREAM_CHUNK_BYTES = 16 * 1024   # streamed listings are sent in pieces of about this size
+# /debug/profiler is only routed when this is set (it exposes stack traces of the whole process)
+PROFILER_ENABLED = os.environ.get('TASKS_PROFILER') == '1'
+# route task writes through tarefas' group-commit queue: concurrent form posts share one commit
+WRITE_QUEUE_ENABLED = os.environ.get('TASKS_WRITE_QUEUE') == '1'
+# TASKS_NOTIFIER=0 runs no notifier in this worker: no due-task claims, alert delivery or archival
+# (benchmarks and read-only replicas); the alert endpoints then only serve events already stored
+NOTIFIER_ENABLED = os.environ.get('TASKS_NOTIFIER') != '0'
+# extra alert channels besides the browser stream (tarefas.dispatch): a log file ('-' = stderr)
+# and a local webhook that gets each Alta alert as JSON
+if os.environ.get('TASKS_ALERT_LOG'):
+    tarefas.DISPATCH_LOG_FILE = os.environ['TASKS_ALERT_LOG']
+if os.environ.get('TASKS_ALERT_WEBHOOK'):
+    tarefas.DISPATCH_WEBHOOK_URL = os.environ['TASKS_ALERT_WEBHOOK']
+
+tarefas.metrics.describe('trabalho_http_request_seconds', 'histogram', 'Flask request latency per route.')
+
+def _write_task(op, *args):
+    # waits for the commit either way, so redirects still show the change
+    if not WRITE_QUEUE_ENABLED:
+        return getattr(tarefas, op)(*args)
     try:
-        return dict(row)
-    except Exception:
-        # tuple - map by known order used in queries
-        return {
-            'id': row[0], 'title': row[1], 'description': row[2], 'due': row[3],
-            'priority': row[4], 'category': row[5] if len(row) > 5 else None,
-            'notify': bool(row[6]) if len(row) > 6 else False
-        }
+        return getattr(tarefas.get_write_queue(), op)(*args).result()
+    except queue.Full:
+        abort(503)
 
-@app.route('/')
-def index():
-    rows = trabalho.get_tasks(None)
+# Alerts come from the elected notifier (tarefas.scheduler): whichever process holds the lease claims
+# due tasks into notification_events, and this worker's scheduler thread reads them from there.
+# Event ids are the global event seq, so a client can resume on any worker and across restarts.
+# Each database has its own events and seqs, so there is one feed per tenant (None without tenants).
+# The scheduler hands the events to a dispatcher (tarefas.dispatch), whose 'stream' channel fills the
+# feeds; bursts arrive as one digest alert that covers a range of seqs.
+_feeds = {}  # tenant -> AlertFeed
+_notifier = None
+_dispatcher = None
+_notifier_lock = threading.Lock()
+
+def _alert(alert):
+    # what browsers get: the dispatch alert without the bookkeeping fields
+    return {'id': alert['task_id'], 'title': alert['title'], 'priority': alert['priority'],
+            'sound': alert['sound'], 'open': alert['open'], 'count': alert['count'], 'titles': alert['titles']}
+
+def _event_id(seq):
+    return str(seq)
+
+class AlertFeed:
+    def __init__(self, live=True):
+        self.log = deque(maxlen=ALERT_LOG_SIZE)  # (first seq, seq, alert), contiguous
+        self.live = live  # fed by this worker's scheduler; otherwise every read goes to the event table
+        self.delivered_seq = 0  # newest alert already sent to some client; new clients start after it
+        self.cond = threading.Condition()
+
+    def queue(self, alert):
+        with self.cond:
+            self.log.append((alert['first_seq'], alert['seq'], _alert(alert)))
+            self.cond.notify_all()
+
+    def resume_seq(self, event_id):
+        # no id (or one from before ids were global) -> only alerts nobody has received yet
+        if not event_id or not event_id.isdigit():
+            return self.delivered_seq
+        return int(event_id)
+
+    def after(self, seq):
+        # call without holding cond: the gap query runs outside it, so queue() (the dispatcher's
+        # stream channel) never waits on a database read. Runs in the feed's database.
+        with self.cond:
+            pending = [(s, a) for _, s, a in self.log if s > seq]
+            first = self.log[0][0] if self.log else None
+            # everything after delivered_seq reaches the log through queue(); older alerts that the
+            # log no longer (or never) held are read from the shared event table
+            covered = first - 1 if first is not None else self.delivered_seq
+        if seq < covered or not self.live:
+            gap = [tarefas.make_alert(e) for e in tarefas.get_notification_events(seq, ALERT_LOG_SIZE)
+                   if first is None or e[0] < first]
+            if _dispatcher is not None:
+                # a long gap reaches the client the way a live burst would: as one digest
+                digest_after = _dispatcher.channels['stream'].digest_after
+                if digest_after is not None and len(gap) > digest_after:
+                    gap = [tarefas.digest_alerts(gap)]
+            pending = [(a['seq'], _alert(a)) for a in gap] + pending
+        if pending:
+            with self.cond:
+                self.delivered_seq = max(self.delivered_seq, pending[-1][0])
+        return pending
+
+    def wait(self, seq, timeout):
+        # until the log has an alert after seq; checked under cond, so a queue() in between is not missed
+        with self.cond:
+            self.cond.wait_for(lambda: self.log and self.log[-1][1] > seq, timeout)
+
+def _queue_alert(alert):
+    _feeds[alert['tenant']].queue(alert)
+
+def _start_feed(tenant, add_scheduler):
+    # the feed exists before its scheduler can deliver; both start after the newest stored event
+    feed = _feeds[tenant] = AlertFeed()
+    scheduler = add_scheduler()
+    with feed.cond:
+        scheduler.last_seq = feed.delivered_seq = tarefas.latest_notification_seq()
+
+def alert_feed():
+    # the notifier is started lazily on the first request, so the debug reloader's parent process never
+    # runs one; every worker runs one, but only the lease holder of each database scans for due tasks.
+    # With tenants, a single thread serves every tenant this worker has seen (and those on disk).
+    global _notifier, _dispatcher
+    tenant = g.get('tenant')
+    with _notifier_lock:
+        if _notifier is None and NOTIFIER_ENABLED:
+            # the notifier only detects; delivery (stream, webhook, log) runs on the dispatcher's threads
+            _dispatcher = tarefas.Dispatcher([tarefas.CallbackChannel('stream', _queue_alert),
+                                              *tarefas.standard_channels()]).start()
+            if TENANTS_ENABLED:
+                _notifier = tarefas.TenantScheduler(lambda name, events: _dispatcher.submit(events, name))
+                for name in tarefas.list_tenants():
+                    with tarefas.use_tenant(name):
+                        _start_feed(name, functools.partial(_notifier.add_tenant, name))
+            else:
+                _notifier = tarefas.NotificationScheduler(_dispatcher.submit)
+                _start_feed(None, lambda: _notifier)
+            _notifier.start()
+        if tenant not in _feeds:
+            if _notifier is not None:
+                _start_feed(tenant, functools.partial(_notifier.add_tenant, tenant))
+            else:
+                # no notifier in this worker: the feed only reads events stored by other processes
+                feed = _feeds[tenant] = AlertFeed(live=False)
+                feed.delivered_seq = tarefas.latest_notification_seq()
+    return _feeds[tenant]
+
+def _tenant_scope(tenant):
+    return tarefas.use_tenant(tenant) if tenant else contextlib.nullcontext()
+
+@app.before_request
+def _select_tenant():
+    if not TENANTS_ENABLED:
+        return
+    name = (request.headers.get('X-Tenant') or request.args.get('tenant')
+            or session.get('tenant') or DEFAULT_TENANT)
+    try:
+        tarefas.tenant_path(name)
+    except ValueError:
+        abort(400)
+    if request.args.get('tenant'):
+        session['tenant'] = name
+    g.tenant = name
+    # everything in this request (reads, writes, cache, write queue) goes to the tenant's database
+    g.tenant_scope = contextlib.ExitStack()
+    g.tenant_scope.enter_context(tarefas.use_tenant(name))
+
+@app.teardown_request
+def _leave_tenant(exc):
+    scope = g.pop('tenant_scope', None)
+    if scope is not None:
+        scope.close()
+
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_request(resp):
+    # labelled by the route pattern (/edit_task/<int:task_id>), not the URL, to keep the series bounded
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        tarefas.metrics.observe('trabalho_http_request_seconds', time.perf_counter() - start,
+                                 route=route, method=request.method, status=str(resp.status_code))
+    return resp
+
+def conditional(*tables, extra=None):
+    """Strong ETag from the database change version of `tables` (plus the URL and extra()).
+
+    A matching If-None-Match gets a 304 before the view runs, so unchanged polls never read the
+    task table. Pages with pending flash messages are always rendered in full."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if session.get('_flashes'):
+                return view(*args, **kwargs)
+            state = (tarefas.current_db(), request.full_path, tarefas.get_change_version(*tables),
+                     extra() if extra else None)
+            tag = hashlib.sha1(repr(state).encode()).hexdigest()
+            if request.if_none_match.contains(tag):
+                resp = Response(status=304)
+            else:
+                resp = make_response(view(*args, **kwargs))
+            resp.set_etag(tag)
+            # the browser may keep a copy but has to revalidate it on every use
+            resp.headers['Cache-Control'] = 'private, no-cache'
+            return resp
+        return wrapper
+    return decorator
+
+def due_clock():
+    # what changes listings and counters with the clock alone: the newest passed due time of a task,
+    # and for recurring tasks the day their window is anchored on and the newest passed occurrence
+    return tarefas.last_passed_due(), tarefas.recurrence_clock()
+
+def row_to_dict(row):
+    # tuple in the column order of tarefas.get_tasks
+    # (id,title,description,due,priority,cat_title,notify,notified,due_ts,due_show)
+    return {
+        'id': row[0], 'title': row[1], 'description': row[2], 'due': row[3],
+        'priority': row[4], 'category': row[5] if len(row) > 5 else None,
+        'notify': bool(row[6]) if len(row) > 6 else False,
+        'due_ts': row[8] if len(row) > 8 else None,
+        'due_show': row[9] if len(row) > 9 else tarefas.format_due_iso(row[3])
+    }
+
+def task_filters(args):
+    # filters shared by the index page and /api/tasks; invalid values are ignored
+    filters = {}
+    cat = args.get('category', '')
+    if cat.isdigit():
+        filters['category_id'] = int(cat)
+    if args.get('priority') in tarefas.PRIORITIES:
+        filters['priority'] = args['priority']
+    if args.get('notify') in ('1', '0'):
+        filters['notify'] = args['notify'] == '1'
+    for name in ('due_from', 'due_to'):
+        dt = tarefas.parse_datetime_input(args.get(name, ''))
+        if dt:
+            filters[name] = tarefas.iso_or_none(dt)
+    if args.get('archived') == '1':
+        filters['include_archived'] = True
+    return filters
+
+def task_page(args):
+    filters = task_filters(args)
+    rows, next_cursor, prev_cursor = tarefas.get_tasks_page(
+        after=args.get('after'), before=args.get('before'), **filters)
+    # due_show is formatted by the query itself, no per-row datetime parsing here
+    tasks = [row_to_dict(r) for r in rows]
+    return tasks, next_cursor, prev_cursor
+
+def _chunked(pieces, size=STREAM_CHUNK_BYTES):
+    # joins the tiny strings a template (or a row generator) yields into fewer, larger writes.
+    # The pieces are produced after the view returns, so the tenant is entered again around them.
+    tenant = g.get('tenant')
+
+    def generate():
+        with _tenant_scope(tenant):
+            buf, n = [], 0
+            for piece in pieces:
+                buf.append(piece)
+                n += len(piece)
+                if n >= size:
+                    yield ''.join(buf)
+                    buf, n = [], 0
+            if buf:
+                yield ''.join(buf)
+    return generate()
+
+def render_streamed(template, **context):
+    # HTML goes out while the rows are still being read. Pages with pending flash messages are
+    # rendered in one piece: reading them changes the session cookie, already sent once a stream starts.
+    if session.get('_flashes'):
+        return render_template(template, **context)
+    return Response(_chunked(stream_template(template, **context)), mimetype='text/html')
+
+def _json_rows(rows):
+    # streamed {"tasks": [...]}, one row at a time
+    yield '{"tasks": ['
+    for i, row in enumerate(rows):
+        yield (',' if i else '') + app.json.dumps(row_to_dict(row))
+    yield ']}'
+
+def highlight(text):
+    # escape the task text, then turn the search markers into <mark> tags
+    return (escape(text or '')
+            .replace(tarefas.HIGHLIGHT_OPEN, Markup('<mark>'))
+            .replace(tarefas.HIGHLIGHT_CLOSE, Markup('</mark>')))
+
+def search_page(args):
+    # ranked results are paged by number (?page=), since relevance order has no stable key
+    page = int(args['page']) if args.get('page', '').isdigit() and int(args['page']) > 0 else 1
+    size = tarefas.TASKS_PAGE_SIZE
+    cat = args.get('category', '')
+    rows = tarefas.search_tasks(args.get('q', ''), limit=size + 1, offset=(page - 1) * size,
+                                 category_id=int(cat) if cat.isdigit() else None)
     tasks = []
-    for r in rows:
+    for r in rows[:size]:
         t = row_to_dict(r)
-        # format due for display
-        t['due_show'] = trabalho.format_due_iso(t['due'])
+        t['title_html'] = highlight(r[10])
+        t['snippet_html'] = highlight(r[11])
         tasks.append(t)
-    return render_template('index.html', tasks=tasks)
+    return tasks, (page + 1 if len(rows) > size else None), (page - 1 if page > 1 else None)
+
+def _mark_archived(rows, archived):
+    # archived rows are listed read-only (edit, delete and bulk actions only see tasks): `archived`
+    # gets their ids one batch ahead of the template that reads it
+    rows = iter(rows)
+    for batch in iter(lambda: list(itertools.islice(rows, tarefas.TASKS_STREAM_BATCH)), []):
+        archived.update(tarefas.archived_ids([r[0] for r in batch]))
+        yield from batch
+
+@app.route('/')
+@conditional('tasks', 'categories', extra=due_clock)
+def index():
+    if request.args.get('q', '').strip():
+        tasks, next_page, prev_page = search_page(request.args)
+        query = {k: v for k, v in request.args.items() if k != 'page' and v}
+        return render_template('index.html', tasks=tasks, categories=tarefas.get_categories(),
+                               priorities=tarefas.PRIORITIES, filters=query,
+                               next_page=next_page, prev_page=prev_page)
+    # revision read before the rows: a change in between is simply applied twice by tasks_sync.js.
+    # Archived rows are not in the change log, so a listing that includes them is not kept live.
+    sync_rev = tarefas.task_revision() if request.args.get('archived') != '1' else None
+    filters = task_filters(request.args)
+    if request.args.get('all') == '1':
+        # the whole filtered list, rendered as it is read (no pager)
+        tasks, next_cursor, prev_cursor = tarefas.iter_tasks(**filters), None, None
+    else:
+        rows, next_cursor, prev_cursor = tarefas.get_tasks_page(
+            after=request.args.get('after'), before=request.args.get('before'), **filters)
+        tasks = map(tarefas.TaskRow._make, rows)
+    archived = set()
+    if filters.get('include_archived'):
+        tasks = _mark_archived(tasks, archived)
+    # keep the filters in the pager links, but not the old cursor
+    query = {k: v for k, v in request.args.items() if k not in ('after', 'before') and v}
+    return render_streamed('index.html', tasks=tasks, categories=tarefas.get_categories(),
+                           priorities=tarefas.PRIORITIES, filters=query, archived_ids=archived,
+                           next_cursor=next_cursor, prev_cursor=prev_cursor, sync_rev=sync_rev)
+
+@app.route('/api/search')
+@conditional('tasks', 'categories')
+def api_search():
+    tasks, next_page, prev_page = search_page(request.args)
+    for t in tasks:
+        t['title_html'] = str(t['title_html'])
+        t['snippet_html'] = str(t['snippet_html'])
+    return jsonify({'results': tasks, 'next_page': next_page, 'prev_page': prev_page})
+
+@app.route('/api/tasks')
+@conditional('tasks', 'categories', extra=due_clock)
+def api_tasks():
+    # ?all=1 streams every matching task (after ?after=, if given) instead of one page, as
+    # {"tasks": [...]} or, with ?format=ndjson, one task per line. Rows are read in keyset batches,
+    # so memory stays flat and the first tasks go out before the last ones are read.
+    fmt = request.args.get('format')
+    if request.args.get('all') == '1' or fmt == 'ndjson':
+        rows = tarefas.iter_tasks(after=tarefas.decode_cursor(request.args.get('after')),
+                                  **task_filters(request.args))
+        if fmt == 'ndjson':
+            lines = (app.json.dumps(row_to_dict(r)) + '\n' for r in rows)
+            return Response(stream_with_context(_chunked(lines)), mimetype='application/x-ndjson')
+        return Response(stream_with_context(_chunked(_json_rows(rows))), mimetype='application/json')
+    tasks, next_cursor, prev_cursor = task_page(request.args)
+    return jsonify({'tasks': tasks, 'next': next_cursor, 'prev': prev_cursor})
+
+@app.route('/api/tasks/changes')
+@conditional('tasks', 'categories')
+def api_task_changes():
+    # delta sync: only rows inserted/updated/deleted after the client's revision.
+    # "reset" tells the client to drop its copy and rebuild it from "changed"; "more" to call again now.
+    since = request.args.get('since', '')
+    limit = request.args.get('limit', '')
+    limit = int(limit) if limit.isdigit() and int(limit) > 0 else tarefas.CHANGES_PAGE_SIZE
+    result = tarefas.get_task_changes(int(since) if since.isdigit() else 0,
+                                      min(limit, tarefas.CHANGES_PAGE_SIZE))
+    changed = []
+    for row in result['changed']:
+        task = row_to_dict(row)
+        task['category_id'] = row[10]
+        task['recurring'] = bool(row[11])
+        changed.append(task)
+    result['changed'] = changed
+    return jsonify(result)
+
+# bulk actions on the selected rows: {"action": ..., "ids": [...]} plus "category_id" or "priority"
+BULK_ACTIONS = {
+    'move': lambda ids, data: tarefas.move_tasks(ids, data.get('category_id')),
+    'priority': lambda ids, data: tarefas.set_priority(ids, data.get('priority')),
+    'renotify': lambda ids, data: tarefas.reset_notifications(ids),
+    'delete': lambda ids, data: tarefas.delete_tasks(ids),
+}
+
+@app.route('/api/tasks/<int:task_id>/occurrences', methods=['POST'])
+def api_task_occurrence(task_id):
+    # one occurrence of a recurring task, by its original due: {"occurrence", "state", "due"};
+    # state "done"/"cancelled" completes or skips it, due moves it, neither restores it
+    data = request.get_json(silent=True) or {}
+    if not tarefas.get_recurrence(task_id):
+        return jsonify({'error': 'tarefa não é recorrente'}), 404
+    try:
+        tarefas.override_occurrence(task_id, data.get('occurrence'), due=data.get('due'), state=data.get('state'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'id': task_id, 'occurrence': data.get('occurrence'), 'state': data.get('state'),
+                    'due': data.get('due')})
+
+@app.route('/api/tasks/bulk', methods=['POST'])
+def api_tasks_bulk():
+    data = request.get_json(silent=True) or {}
+    action = BULK_ACTIONS.get(data.get('action'))
+    ids = data.get('ids')
+    if action is None:
+        return jsonify({'error': 'ação inválida'}), 400
+    if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        return jsonify({'error': 'ids deve ser uma lista de inteiros'}), 400
+    try:
+        done = action(ids, data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'action': data['action'], 'ids': done, 'count': len(done)})
+
+def _import_format(filename=''):
+    fmt = request.args.get('format') or request.form.get('format')
+    if fmt in ('csv', 'jsonl'):
+        return fmt
+    return 'jsonl' if filename.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+def _run_import():
+    # multipart upload ("file") or the raw request body, decoded as a stream
+    upload = request.files.get('file')
+    raw = upload.stream if upload else request.stream
+    fmt = _import_format(upload.filename if upload else '')
+    return tarefas.import_tasks(io.TextIOWrapper(raw, encoding='utf-8-sig', newline=''), fmt)
+
+@app.route('/import', methods=['POST'])
+def import_tasks():
+    try:
+        report = _run_import()
+    except ValueError as e:
+        # the whole file was unreadable (e.g. not UTF-8) and nothing was imported: the bare layout
+        # shows the message, with a 400 (a redirect would hide the status)
+        flash('Arquivo inválido: %s' % e, 'error')
+        return render_template('base.html'), 400
+    flash('%d tarefas importadas, %d categorias criadas' % (report['imported'], report['categories_created']))
+    for line_no, msg in report['errors']:
+        flash('Linha %d: %s' % (line_no, msg), 'error')
+    return redirect(url_for('index'))
+
+@app.route('/api/import', methods=['POST'])
+def api_import():
+    try:
+        return jsonify(_run_import())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/export')
+def api_export():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'jsonl'):
+        return jsonify({'error': 'formato inválido'}), 400
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    # _chunked re-enters the request's tenant: the rows are read after the view has returned
+    return Response(_chunked(tarefas.export_tasks(fmt)), mimetype=mimetype,
+                    headers={'Content-Disposition': 'attachment; filename=tasks.%s' % fmt})
 
 @app.route('/categories')
+@conditional('categories')
 def categories():
-    cats = trabalho.get_categories()
+    cats = tarefas.get_categories()
     categories = [{'id': c[0], 'title': c[1], 'description': c[2]} for c in cats]
     return render_template('categories.html', categories=categories)
 
+def recurrence_from_form(form, due_iso):
+    # (freq, every, byday, cron, until) from the "Repetição" fields, or None for a one-off task;
+    # raises ValueError with a message for the user when the rule is invalid
+    freq = form.get('repeat', '')
+    if not freq:
+        return None
+    if not due_iso:
+        raise ValueError('Tarefa recorrente precisa de vencimento')
+    freq, every, byday, cron = tarefas.normalize_rule(freq, form.get('every') or 1, form.getlist('byday'),
+                                                      form.get('cron', ''))
+    until = tarefas.iso_or_none(tarefas.parse_datetime_input(form.get('until', '')))
+    return freq, every, byday, cron, until
+
 @app.route('/new_task', methods=['GET','POST'])
 def new_task():
     if request.method == 'POST':
         title = request.form.get('title','').strip()
         desc = request.form.get('description','').strip()
         due_raw = request.form.get('due','').strip()
-        due_dt = trabalho.parse_datetime_input(due_raw) if due_raw else None
-        due_iso = trabalho.iso_or_none(due_dt)
+        due_dt = tarefas.parse_datetime_input(due_raw) if due_raw else None
+        due_iso = tarefas.iso_or_none(due_dt)
         priority = request.form.get('priority','Baixa')
         cat = request.form.get('category')
         category_id = int(cat) if cat else None
@@ -52,29 +516,48 @@ def new_task():
         if not title:
             flash('Título obrigatório','error')
             return redirect(url_for('new_task'))
-        trabalho.add_task(title, desc, due_iso, priority, category_id, notify)
+        try:
+            rule = recurrence_from_form(request.form, due_iso)
+        except ValueError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('new_task'))
+        task_id = _write_task('add_task', title, desc, due_iso, priority, category_id, notify)
+        if rule:
+            tarefas.set_recurrence(task_id, *rule)
         return redirect(url_for('index'))
-    cats = trabalho.get_categories()
-    return render_template('form_task.html', task=None, categories=cats, priorities=trabalho.PRIORITIES)
+    cats = tarefas.get_categories()
+    return render_template('form_task.html', task=None, recurrence=None, categories=cats,
+                           priorities=tarefas.PRIORITIES)
 
 @app.route('/edit_task/<int:task_id>', methods=['GET','POST'])
 def edit_task(task_id):
-    row = trabalho.db_execute("SELECT t.id,t.title,t.description,t.due,t.priority,c.title, t.notify, t.notified FROM tasks t LEFT JOIN categories c ON t.category_id = c.id WHERE t.id=?", (task_id,), fetch=True)
-    if not row:
+    existing = tarefas.get_task(task_id)
+    if not existing:
+        if tarefas.archived_ids([task_id]):
+            flash('Tarefa arquivada: restaure-a para editar','error')
+            return redirect(url_for('index', archived=1))
         flash('Tarefa não encontrada','error')
         return redirect(url_for('index'))
-    existing = row[0]
     if request.method == 'POST':
         title = request.form.get('title','').strip()
         desc = request.form.get('description','').strip()
         due_raw = request.form.get('due','').strip()
-        due_dt = trabalho.parse_datetime_input(due_raw) if due_raw else None
-        due_iso = trabalho.iso_or_none(due_dt)
+        due_dt = tarefas.parse_datetime_input(due_raw) if due_raw else None
+        due_iso = tarefas.iso_or_none(due_dt)
         priority = request.form.get('priority','Baixa')
         cat = request.form.get('category')
         category_id = int(cat) if cat else None
         notify = True if request.form.get('notify') == 'on' else False
-        trabalho.update_task(task_id, title, desc, due_iso, priority, category_id, notify)
+        try:
+            rule = recurrence_from_form(request.form, due_iso)
+        except ValueError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('edit_task', task_id=task_id))
+        _write_task('update_task', task_id, title, desc, due_iso, priority, category_id, notify)
+        if rule:
+            tarefas.set_recurrence(task_id, *rule)
+        elif tarefas.get_recurrence(task_id):
+            tarefas.clear_recurrence(task_id)
         return redirect(url_for('index'))
     # prepare existing for form
     task = {
@@ -82,20 +565,28 @@ def edit_task(task_id):
         'due': existing[3] or '', 'priority': existing[4] or 'Baixa',
         'category': existing[5], 'notify': bool(existing[6])
     }
-    cats = trabalho.get_categories()
-    return render_template('form_task.html', task=task, categories=cats, priorities=trabalho.PRIORITIES)
+    cats = tarefas.get_categories()
+    return render_template('form_task.html', task=task, recurrence=tarefas.get_recurrence(task_id),
+                           categories=cats, priorities=tarefas.PRIORITIES)
 
 @app.route('/delete_task/<int:task_id>', methods=['POST'])
 def delete_task(task_id):
-    trabalho.delete_task(task_id)
+    _write_task('delete_task', task_id)
     return redirect(url_for('index'))
 
+@app.route('/restore_task/<int:task_id>', methods=['POST'])
+def restore_task(task_id):
+    # archived_tasks -> tasks, same id; from there it can be edited again
+    if not tarefas.restore_tasks([task_id]):
+        flash('Tarefa não encontrada','error')
+    return redirect(url_for('index', archived=1))
+
 @app.route('/new_category', methods=['POST'])
 def new_category():
     title = request.form.get('title','').strip()
     desc = request.form.get('description','').strip()
     if title:
-        ok = trabalho.add_category(title, desc)
+        ok = tarefas.add_category(title, desc)
         if not ok:
             flash('Categoria já existe','error')
     return redirect(url_for('categories'))
@@ -105,74 +596,103 @@ def edit_category(cat_id):
     title = request.form.get('title','').strip()
     desc = request.form.get('description','').strip()
     if title:
-        trabalho.update_category(cat_id, title, desc)
+        tarefas.update_category(cat_id, title, desc)
     return redirect(url_for('categories'))
 
 @app.route('/delete_category/<int:cat_id>', methods=['POST'])
 def delete_category(cat_id):
-    trabalho.delete_category(cat_id)
+    tarefas.delete_category(cat_id)
     return redirect(url_for('categories'))
 
-# API for notifications - returns tasks due (notified=0, notify=1, due not null and due <= now)
+# API for notifications - polling fallback for clients without EventSource.
+# ?since=<event id> returns alerts after that id; the newest id goes back in X-Last-Event-ID.
 @app.route('/api/notifications')
 def api_notifications():
-    rows = trabalho.db_execute("""SELECT id,title,due,priority FROM tasks WHERE due IS NOT NULL AND notify=1 AND notified=0""", fetch=True)
-    alerts = []
-    from datetime import datetime
-    now = datetime.now()
-    for r in rows:
-        tid, title, due_s, priority = r
-        try:
-            due_dt = datetime.fromisoformat(due_s)
-        except Exception:
-            continue
-        if now >= due_dt:
-            alerts.append({'id': tid, 'title': title, 'priority': priority})
-            # mark notified so it won't popup again; web client may also call an endpoint to 'open' task later
-            trabalho.set_task_notified(tid)
-    return jsonify(alerts)
+    feed = alert_feed()
+    with feed.cond:
+        since = feed.resume_seq(request.args.get('since'))
+    pending = feed.after(since)
+    last = pending[-1][0] if pending else since
+    resp = jsonify([a for _, a in pending])
+    resp.headers['X-Last-Event-ID'] = _event_id(last)
+    return resp
+
+# Server-Sent Events: pushes each alert as soon as the scheduler claims it.
+# Browsers resend the last id in Last-Event-ID when they reconnect, so nothing is missed or repeated.
+@app.route('/api/notifications/stream')
+def notifications_stream():
+    feed = alert_feed()
+    tenant = g.get('tenant')
+    with feed.cond:
+        start = feed.resume_seq(request.headers.get('Last-Event-ID') or request.args.get('last_id'))
+
+    def generate(last):
+        # runs after the request has ended: enter the tenant again for the event table reads
+        with _tenant_scope(tenant):
+            yield 'retry: 3000\n\n'
+            while True:
+                pending = feed.after(last)
+                if not pending:
+                    feed.wait(last, STREAM_HEARTBEAT_SECONDS)
+                    pending = feed.after(last)
+                if not pending:
+                    yield ': keep-alive\n\n'
+                    continue
+                for seq, alert in pending:
+                    last = seq
+                    yield 'id: %s\nevent: alert\ndata: %s\n\n' % (_event_id(seq), json.dumps(alert))
+
+    return Response(generate(start), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
+@app.route('/api/cache_stats')
+def api_cache_stats():
+    return jsonify(tarefas.cache_stats())
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus text format; the read cache is reported from its own counters at scrape time
+    stats = tarefas.cache_stats()
+    lines = ['# TYPE trabalho_cache_size gauge', 'trabalho_cache_size %d' % stats['size']]
+    for key in ('hits', 'misses', 'evictions', 'invalidations'):
+        lines.append('# TYPE trabalho_cache_%s_total counter' % key)
+        lines.append('trabalho_cache_%s_total %d' % (key, stats[key]))
+    lines.append('# TYPE trabalho_notification_stream_log_size gauge')
+    lines.append('trabalho_notification_stream_log_size %d' % sum(len(f.log) for f in list(_feeds.values())))
+    body = tarefas.metrics.render() + '\n'.join(lines) + '\n'
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@app.route('/debug/profiler', methods=['GET', 'POST'])
+def profiler():
+    # POST action=start|stop toggles the sampler; GET returns the stacks collected so far
+    # (collapsed format, ready for flamegraph.pl or speedscope)
+    if not PROFILER_ENABLED:
+        abort(404)
+    if request.method == 'POST':
+        action = request.values.get('action')
+        if action == 'start':
+            tarefas.start_profiler(float(request.values.get('interval', tarefas.PROFILER_INTERVAL_SECONDS)))
+            return jsonify({'running': True})
+        if action == 'stop':
+            return Response(tarefas.stop_profiler() or '', mimetype='text/plain')
+        return jsonify({'error': 'action must be start or stop'}), 400
+    stacks = tarefas.profiler_snapshot()
+    if stacks is None:
+        return jsonify({'running': False})
+    return Response(stacks, mimetype='text/plain')
+
 @app.route("/dashboard")
 def dashboard():
     # render the dashboard page (front-end will fetch data via /api/dashboard_data)
     return render_template("dashboard.html")
 
 @app.route("/api/dashboard_data")
+# overdue/pending also depend on the clock, so the tag changes whenever a due time passes
+@conditional('tasks', 'categories', extra=due_clock)
 def dashboard_data():
-    # compute simple statistics from tasks table
-    from datetime import datetime
-    now = datetime.now()
-    rows = trabalho.get_tasks()  # returns many fields, see trabalho.get_tasks implementation
-    total = 0
-    pending = 0
-    overdue = 0
-    no_notify = 0
-    for r in rows:
-        # r: (id,title,description,due,priority,cat_title,notify,notified)
-        total += 1
-        due = r[3]
-        notify = r[6]
-        if notify == 0:
-            no_notify += 1
-        if due:
-            try:
-                due_dt = datetime.fromisoformat(due)
-                if due_dt < now:
-                    overdue += 1
-                else:
-                    pending += 1
-            except Exception:
-                pending += 1
-        else:
-            # tasks without due date count as pending
-            pending += 1
-    return jsonify({
-        "total": total,
-        "pending": pending,
-        "overdue": overdue,
-        "no_notify": no_notify
-    })
+    # counters are kept by triggers in the database; only the overdue split depends on the clock
+    return jsonify(tarefas.get_dashboard_stats(include_archived=request.args.get('archived') == '1'))
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,6 @@
+"""Benchmarks reproduzíveis do gerenciador de tarefas.
+
+- benchmarks.generate: gera bancos sintéticos (1k / 100k / 1M tarefas)
+- benchmarks.run: mede as rotas do Flask e as funções do núcleo (pacote tarefas), grava um
+  relatório JSON e compara com um baseline salvo (--compare)
+"""
@@ -0,0 +1,108 @@
+"""Gerador de bancos sintéticos para os benchmarks.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.generate saida.db --tasks 100000 --categories 50 --due mixed
+"""
+
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+
+import tarefas
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+DUE_DISTRIBUTIONS = ("mixed", "uniform", "past", "future", "clustered")
+PRIORITY_WEIGHTS = (0.5, 0.3, 0.2)  # Baixa, Média, Alta
+BATCH_SIZE = 5000
+
+WORDS = ("relatório", "prova", "reunião", "projeto", "academia", "mercado", "notebook", "estudar",
+         "revisar", "enviar", "ligar", "comprar", "pagar", "consulta", "entrega", "apresentação")
+
+
+def random_due(rng, distribution, now):
+    """Vencimento (datetime ou None) conforme a distribuição pedida."""
+    if distribution == "uniform":
+        return now + timedelta(minutes=rng.randint(-525_600, 525_600))
+    if distribution == "past":
+        return now - timedelta(minutes=rng.randint(1, 525_600))
+    if distribution == "future":
+        return now + timedelta(minutes=rng.randint(1, 525_600))
+    if distribution == "clustered":
+        # muitas tarefas no mesmo minuto (rajadas de notificações)
+        return now + timedelta(hours=rng.randint(-48, 48))
+    # mixed: 20% sem data, 30% atrasadas, 50% no futuro
+    r = rng.random()
+    if r < 0.2:
+        return None
+    if r < 0.5:
+        return now - timedelta(minutes=rng.randint(1, 525_600))
+    return now + timedelta(minutes=rng.randint(1, 525_600))
+
+
+def generate_db(path, n_tasks, n_categories=50, distribution="mixed", seed=0):
+    """Cria (ou sobrescreve) `path` com n_categories categorias e n_tasks tarefas. Determinístico para a mesma seed."""
+    if distribution not in DUE_DISTRIBUTIONS:
+        raise ValueError(f"Distribuição desconhecida: {distribution}")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    rng = random.Random(seed)
+    # minutos cheios, como os vencimentos digitados nos formulários
+    now = datetime.now().replace(second=0, microsecond=0)
+    previous_db = tarefas.DB
+    tarefas.DB = path
+    try:
+        tarefas.init_db()
+        with tarefas.transaction():
+            tarefas.db_execute("INSERT INTO categories(title,description) VALUES(?,?)",
+                                [(f"Categoria {i}", f"Categoria sintética {i}") for i in range(n_categories)],
+                                many=True)
+            cat_ids = [r[0] for r in tarefas.db_execute("SELECT id FROM categories", fetch=True)]
+            batch = []
+            for i in range(n_tasks):
+                due = random_due(rng, distribution, now)
+                title = " ".join(rng.choices(WORDS, k=3)) + f" #{i}"
+                description = " ".join(rng.choices(WORDS, k=rng.randint(0, 12)))
+                priority = rng.choices(tarefas.PRIORITIES, weights=PRIORITY_WEIGHTS)[0]
+                category_id = rng.choice(cat_ids) if cat_ids and rng.random() < 0.9 else None
+                notify = 1 if rng.random() < 0.8 else 0
+                # parte das tarefas vencidas já foi notificada
+                notified = 1 if due is not None and due < now and rng.random() < 0.7 else 0
+                batch.append((title, description, tarefas.iso_or_none(due), priority, category_id, notify, notified))
+                if len(batch) >= BATCH_SIZE:
+                    _insert(batch)
+            if batch:
+                _insert(batch)
+        tarefas.db_execute("ANALYZE")
+        tarefas.close_connection()
+    finally:
+        tarefas.DB = previous_db
+    return path
+
+
+def _insert(batch):
+    tarefas.db_execute("INSERT INTO tasks(title,description,due,priority,category_id,notify,notified) "
+                        "VALUES(?,?,?,?,?,?,?)", batch, many=True)
+    batch.clear()
+
+
+def parse_size(text):
+    """'1k', '100k', '1m' ou um número."""
+    return SIZES.get(text.lower()) or int(text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um tasks.db sintético")
+    parser.add_argument("path")
+    parser.add_argument("--tasks", default="1k", help="1k, 100k, 1m ou um número")
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--due", choices=DUE_DISTRIBUTIONS, default="mixed")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    generate_db(args.path, parse_size(args.tasks), args.categories, args.due, args.seed)
+    print(f"{args.path}: {parse_size(args.tasks)} tarefas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Executa os benchmarks e grava um relatório JSON.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.run --sizes 1k 100k --out bench.json
+    python -m benchmarks.run --sizes 1k --compare baseline.json          # roda e compara
+    python -m benchmarks.run --report bench.json --compare baseline.json  # só compara
+
+Cada tamanho usa um banco sintético novo (benchmarks.generate), então as escritas de um
+benchmark não afetam os outros tamanhos. Com --data-dir os bancos gerados são reaproveitados
+entre execuções (copiados antes de cada rodada).
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import tarefas
+from benchmarks.generate import generate_db, parse_size
+
+DEFAULT_REPEAT = 20
+DEFAULT_THRESHOLD = 0.20  # regressão = mediana 20% acima do baseline
+IMPORT_ROWS = 1000  # linhas do CSV usado no benchmark de escrita em lote
+
+
+def summarize(samples):
+    """Estatísticas (ms) de uma lista de amostras em ms."""
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "min_ms": round(samples[0], 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def measure(fn, repeat):
+    """Roda fn `repeat` vezes (depois de uma rodada de aquecimento) e devolve estatísticas em ms."""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def _import_csv(rng):
+    lines = ["title,description,due,priority,category,notify"]
+    for i in range(IMPORT_ROWS):
+        lines.append(f"bench {i},importada,2030-01-{rng.randint(1, 28):02d} 10:00,"
+                     f"{rng.choice(tarefas.PRIORITIES)},Categoria {rng.randint(0, 9)},1")
+    return ("\n".join(lines) + "\n").encode()
+
+
+def benchmarks(client, task_ids, rng):
+    """Nome -> função sem argumentos. Rotas passam pelo test client do Flask; o resto chama o núcleo direto."""
+    csv_body = _import_csv(rng)
+
+    def route(url, **kwargs):
+        def call():
+            resp = client.get(url, **kwargs)
+            assert resp.status_code in (200, 304), (url, resp.status_code)
+            # "/" e as exportações vêm em streaming: sem ler o corpo, só o primeiro pedaço seria medido
+            resp.get_data()
+        return call
+
+    def edit_task():
+        resp = client.get(f"/edit_task/{rng.choice(task_ids)}")
+        assert resp.status_code == 200
+
+    def bulk_import():
+        resp = client.post("/api/import?format=csv", data=csv_body)
+        assert resp.status_code == 200
+
+    etag = {}
+
+    def dashboard_not_modified():
+        # a ETag é pega na rodada de aquecimento, depois das escritas dos benchmarks anteriores
+        if "dashboard" not in etag:
+            etag["dashboard"] = client.get("/api/dashboard_data").headers.get("ETag")
+        resp = client.get("/api/dashboard_data", headers={"If-None-Match": etag["dashboard"]})
+        assert resp.status_code == 304, resp.status_code
+
+    def add_burst():
+        for _ in range(100):
+            tarefas.add_task("bench", "", "2030-01-01 10:00:00", "Baixa", None)
+
+    def add_burst_queued():
+        # as mesmas 100 escritas pela fila de escrita: um commit por lote em vez de um por tarefa
+        queue = tarefas.get_write_queue()
+        futures = [queue.add_task("bench", "", "2030-01-01 10:00:00", "Baixa", None) for _ in range(100)]
+        for future in futures:
+            future.result()
+
+    return {
+        "route:/": route("/"),
+        "route:/api/notifications": route("/api/notifications"),
+        "route:/api/dashboard_data": route("/api/dashboard_data"),
+        "route:/api/dashboard_data (304)": dashboard_not_modified,
+        "route:/edit_task": edit_task,
+        "route:/api/import (1000 rows)": bulk_import,
+        "core:get_tasks (all)": lambda: tarefas.get_tasks(),
+        "core:get_tasks_page": lambda: tarefas.get_tasks_page(),
+        "core:add_task": lambda: tarefas.add_task("bench", "", "2030-01-01 10:00:00", "Baixa", None),
+        "core:add_task (burst 100)": add_burst,
+        "core:add_task (burst 100, queued)": add_burst_queued,
+        "core:notifier scan": lambda: tarefas.get_due_notifications(),
+        "core:dashboard stats": lambda: tarefas.get_dashboard_stats(),
+        "core:search_tasks": lambda: tarefas.search_tasks("relatório prova"),
+    }
+
+
+def run_size(n_tasks, repeat, data_dir, workdir, only=None):
+    source = os.path.join(data_dir or workdir, f"bench_{n_tasks}.db")
+    if not os.path.exists(source):
+        generate_db(source, n_tasks)
+    db_path = os.path.join(workdir, f"run_{n_tasks}.db")
+    shutil.copyfile(source, db_path)
+    tarefas.DB = db_path
+    # sem notificador: ele reivindicaria as tarefas vencidas e arquivaria as antigas no meio da rodada,
+    # e cada benchmark mediria um banco diferente
+    os.environ["TASKS_NOTIFIER"] = "0"
+    import app as webapp  # importado depois de trocar tarefas.DB (app.py chama init_db ao importar)
+    tarefas.init_db()
+    client = webapp.app.test_client()
+    rng = random.Random(n_tasks)
+    task_ids = [r[0] for r in tarefas.db_execute("SELECT id FROM tasks ORDER BY random() LIMIT 1000", fetch=True)]
+    results = {}
+    for name, fn in benchmarks(client, task_ids, rng).items():
+        if only and not any(o in name for o in only):
+            continue
+        # listar a tabela inteira repetidas vezes em 1M tarefas levaria minutos
+        runs = max(1, repeat // 10) if name == "core:get_tasks (all)" and n_tasks >= 100_000 else repeat
+        results[name] = measure(fn, runs)
+        print(f"  {name:<36} median {results[name]['median_ms']:>10.3f} ms", file=sys.stderr)
+    tarefas.stop_write_queue()  # a thread do escritor tem conexão própria com o banco desta rodada
+    tarefas.close_connection()
+    return results
+
+
+def metadata():
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Lista de regressões: (tamanho, benchmark, mediana baseline, mediana atual, variação)."""
+    regressions = []
+    for size, benches in current["results"].items():
+        for name, stats in benches.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if not base or not base["median_ms"]:
+                continue
+            change = stats["median_ms"] / base["median_ms"] - 1
+            if change > threshold:
+                regressions.append((size, name, base["median_ms"], stats["median_ms"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do gerenciador de tarefas")
+    parser.add_argument("--sizes", nargs="+", default=["1k"], help="1k, 100k, 1m ou números")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--startup-repeat", type=int, default=10,
+                        help="partidas a frio medidas por módulo (0 desliga; ver benchmarks.startup)")
+    parser.add_argument("--only", nargs="*", help="roda só os benchmarks cujo nome contém um destes textos")
+    parser.add_argument("--data-dir", help="onde guardar/reaproveitar os bancos gerados")
+    parser.add_argument("--out", help="arquivo JSON do relatório (padrão: saída padrão)")
+    parser.add_argument("--report", help="usa um relatório já gravado em vez de rodar")
+    parser.add_argument("--compare", help="relatório baseline para detectar regressões")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.report:
+        with open(args.report, encoding="utf-8") as f:
+            report = json.load(f)
+    else:
+        report = {"meta": metadata(), "results": {}}
+        if args.data_dir:
+            os.makedirs(args.data_dir, exist_ok=True)
+        with tempfile.TemporaryDirectory() as workdir:
+            for size in args.sizes:
+                n_tasks = parse_size(size)
+                print(f"{n_tasks} tarefas", file=sys.stderr)
+                report["results"][str(n_tasks)] = run_size(n_tasks, args.repeat, args.data_dir, workdir, args.only)
+        if args.startup_repeat:
+            from benchmarks.startup import measure_startup  # startup usa summarize() deste módulo
+            print("partida a frio", file=sys.stderr)
+            report["results"]["startup"] = measure_startup(args.startup_repeat)
+        text = json.dumps(report, indent=2, ensure_ascii=False)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for size, name, before, after, change in regressions:
+            print(f"REGRESSÃO [{size}] {name}: {before:.3f} -> {after:.3f} ms (+{change:.0%})", file=sys.stderr)
+        if regressions:
+            return 1
+        print("Sem regressões acima de {:.0%}".format(args.threshold), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
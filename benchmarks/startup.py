@@ -0,0 +1,65 @@
+"""Tempo de partida a frio: cada medida é um interpretador novo importando um módulo.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.startup --repeat 20
+
+É o custo que cada worker do servidor paga ao subir; também confere que o app web não
+carrega o tkinter. benchmarks.run inclui estes números no relatório (seção "startup").
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.run import summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_REPEAT = 10
+
+# nome -> código executado em "python -c"; "python" é o piso (só o interpretador)
+TARGETS = {
+    "startup:python": "pass",
+    "startup:import tarefas": "import tarefas",
+    "startup:import app": "import app",
+    "startup:import trabalho": "import trabalho",
+}
+TK_CHECK = "import app, sys; print('tkinter' in sys.modules)"
+
+
+def _run(code, workdir):
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    start = time.perf_counter()
+    # cwd temporário: app.py chama init_db() ao ser importado e criaria o tasks.db do projeto
+    subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000
+
+
+def measure_startup(repeat=DEFAULT_REPEAT):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, code in TARGETS.items():
+            _run(code, workdir)  # aquecimento: cache de disco, .pyc e o banco vazio criado
+            results[name] = summarize([_run(code, workdir) for _ in range(repeat)])
+            print(f"  {name:<36} median {results[name]['median_ms']:>10.3f} ms", file=sys.stderr)
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        out = subprocess.run([sys.executable, "-c", TK_CHECK], cwd=workdir, env=env, check=True,
+                             capture_output=True, text=True).stdout
+    results["startup:import app"]["tkinter_loaded"] = out.strip() == "True"
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tempo de partida a frio dos módulos")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    args = parser.parse_args(argv)
+    print(json.dumps(measure_startup(args.repeat), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
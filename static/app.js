@@ -1,31 +1,65 @@
 
 document.addEventListener('DOMContentLoaded', function(){
-  // Poll notifications every 30s
-  function checkNotifications(){
-    fetch('/api/notifications').then(r=>r.json()).then(data=>{
-      if(Array.isArray(data) && data.length){
-        data.forEach(item=>{
-          // simple browser alert for prototype
-          try {
-            if (Notification && Notification.permission === 'granted') {
-              new Notification('Tarefa: ' + item.title, { body: 'Prioridade: ' + item.priority });
-            } else if (Notification && Notification.permission !== 'denied') {
-              Notification.requestPermission().then(permission => {
-                if(permission === 'granted') new Notification('Tarefa: ' + item.title, { body: 'Prioridade: ' + item.priority });
-                else tryPlayNotificationSound(); alert('Tarefa: ' + item.title + '\nPrioridade: ' + item.priority);
-              });
-            } else {
-              tryPlayNotificationSound(); alert('Tarefa: ' + item.title + '\nPrioridade: ' + item.priority);
-            }
-          } catch (e) {
-            tryPlayNotificationSound(); alert('Tarefa: ' + item.title + '\nPrioridade: ' + item.priority);
-          }
+  function showAlert(item){
+    // the server applies the priority rules: item.sound (Média/Alta) and, for a burst, one digest
+    // alert (item.count > 1) listing the first titles
+    const heading = item.count > 1 ? item.title : 'Tarefa: ' + item.title;
+    let body = 'Prioridade: ' + item.priority;
+    if (item.count > 1) body += '\n' + item.titles.join(', ') + (item.count > item.titles.length ? ', ...' : '');
+    function fallback(){
+      if (item.sound) tryPlayNotificationSound();
+      alert(heading + '\n' + body);
+    }
+    try {
+      if (Notification && Notification.permission === 'granted') {
+        new Notification(heading, { body: body, silent: !item.sound });
+      } else if (Notification && Notification.permission !== 'denied') {
+        Notification.requestPermission().then(permission => {
+          if(permission === 'granted') new Notification(heading, { body: body, silent: !item.sound });
+          else fallback();
         });
+      } else {
+        fallback();
       }
-    }).catch(()=>{});
+    } catch (e) {
+      fallback();
+    }
+  }
+
+  // id of the last alert received (stream or polling), so a fallback poll resumes where the stream stopped
+  let lastEventId = '';
+  let pollTimer = null;
+
+  // Fallback: poll every 30s
+  function checkNotifications(){
+    fetch('/api/notifications' + (lastEventId ? '?since=' + encodeURIComponent(lastEventId) : ''))
+      .then(r=>{
+        lastEventId = r.headers.get('X-Last-Event-ID') || lastEventId;
+        return r.json();
+      }).then(data=>{
+        if(Array.isArray(data)) data.forEach(showAlert);
+      }).catch(()=>{});
+  }
+  function startPolling(){
+    if (pollTimer) return;
+    checkNotifications();
+    pollTimer = setInterval(checkNotifications, 30000);
+  }
+
+  // Server push: the browser reconnects by itself and sends Last-Event-ID, so alerts are not repeated
+  if (window.EventSource) {
+    const stream = new EventSource('/api/notifications/stream');
+    stream.addEventListener('alert', ev=>{
+      lastEventId = ev.lastEventId || lastEventId;
+      try { showAlert(JSON.parse(ev.data)); } catch(e){}
+    });
+    stream.addEventListener('error', ()=>{
+      // CLOSED means the browser gave up reconnecting (e.g. the server does not support streaming)
+      if (stream.readyState === EventSource.CLOSED) startPolling();
+    });
+  } else {
+    startPolling();
   }
-  checkNotifications();
-  setInterval(checkNotifications, 30000);
 });
 
 
@@ -1,14 +1,34 @@
 
 // Dashboard JS: fetch statistics and draw chart
+let lastEtag = null;
+function fillList(id, entries){
+  const ul = document.getElementById(id);
+  if(!ul) return;
+  ul.innerHTML = '';
+  entries.forEach(([label, count])=>{
+    const li = document.createElement('li');
+    li.textContent = label + ': ' + count;
+    ul.appendChild(li);
+  });
+}
+
 async function fetchStats(){
   try {
-    const resp = await fetch('/api/dashboard_data');
+    // 'no-cache' revalidates with If-None-Match; an unchanged answer comes back as 304 (served from cache)
+    const archived = document.getElementById('include-archived');
+    const url = '/api/dashboard_data' + (archived && archived.checked ? '?archived=1' : '');
+    const resp = await fetch(url, { cache: 'no-cache' });
     if(!resp.ok) return;
+    const etag = resp.headers.get('ETag');
+    if(etag && etag === lastEtag) return;  // nothing changed, keep the chart as it is
+    lastEtag = etag;
     const data = await resp.json();
     document.getElementById('total').innerText = data.total;
     document.getElementById('pending').innerText = data.pending;
     document.getElementById('overdue').innerText = data.overdue;
     document.getElementById('no_notify').innerText = data.no_notify;
+    fillList('by_priority', Object.entries(data.by_priority || {}));
+    fillList('by_category', (data.by_category || []).map(c=>[c.title, c.total]));
     const ctx = document.getElementById('chart').getContext('2d');
     const chartData = {
       labels: ['Pendentes','Atrasadas','Sem notificação'],
@@ -35,4 +55,6 @@ async function fetchStats(){
 document.addEventListener('DOMContentLoaded', ()=>{
   fetchStats();
   setInterval(fetchStats, 30000);
+  const archived = document.getElementById('include-archived');
+  if(archived) archived.addEventListener('change', fetchStats);
 });
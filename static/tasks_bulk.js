@@ -0,0 +1,67 @@
+// Bulk actions on the checked rows: one POST to /api/tasks/bulk (one transaction on the server)
+// instead of one form submission per task.
+document.addEventListener('DOMContentLoaded', function(){
+  const bar = document.getElementById('bulk-bar');
+  const body = document.querySelector('table.tasks tbody');
+  if (!bar || !body) return;
+  const selectAll = document.getElementById('select-all');
+  const count = document.getElementById('bulk-count');
+  const CONFIRM = {
+    delete: n => 'Excluir ' + n + ' tarefa(s)?',
+  };
+
+  function selectedIds(){
+    // the occurrences of a recurring task share its id
+    return Array.from(new Set(Array.from(body.querySelectorAll('.task-select:checked')).map(box => parseInt(box.value, 10))));
+  }
+  function update(){
+    const boxes = body.querySelectorAll('.task-select');
+    const n = selectedIds().length;
+    const checked = body.querySelectorAll('.task-select:checked').length;
+    bar.hidden = n === 0;
+    count.textContent = n + (n === 1 ? ' selecionada' : ' selecionadas');
+    selectAll.checked = checked > 0 && checked === boxes.length;
+    selectAll.indeterminate = checked > 0 && checked < boxes.length;
+  }
+
+  selectAll.addEventListener('change', ()=>{
+    body.querySelectorAll('.task-select').forEach(box => { box.checked = selectAll.checked; });
+    update();
+  });
+  body.addEventListener('change', e=>{ if (e.target.classList.contains('task-select')) update(); });
+  // rows added or removed by tasks_sync.js
+  body.addEventListener('tasks:synced', update);
+
+  async function run(action){
+    const ids = selectedIds();
+    if (!ids.length) return;
+    if (CONFIRM[action] && !confirm(CONFIRM[action](ids.length))) return;
+    const payload = { action: action, ids: ids };
+    if (action === 'move') {
+      const cat = document.getElementById('bulk-category').value;
+      payload.category_id = cat ? parseInt(cat, 10) : null;
+    } else if (action === 'priority') {
+      payload.priority = document.getElementById('bulk-priority').value;
+    }
+    const resp = await fetch('/api/tasks/bulk', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(payload),
+    });
+    const data = await resp.json().catch(() => ({}));
+    if (!resp.ok) { alert(data.error || 'Erro ao aplicar a ação.'); return; }
+    if (action === 'delete') {
+      data.ids.forEach(id=>{
+        body.querySelectorAll('tr.task-row[data-id="' + id + '"]').forEach(tr => tr.remove());
+      });
+    }
+    // the live listing patches the changed rows itself; search results are not synced, so reload
+    if (body.dataset.syncRev !== undefined) document.dispatchEvent(new Event('tasks:changed'));
+    else location.reload();
+    update();
+  }
+  bar.querySelectorAll('[data-bulk]').forEach(btn=>{
+    btn.addEventListener('click', ()=> run(btn.dataset.bulk));
+  });
+  update();
+});
@@ -0,0 +1,139 @@
+// Live task table: polls /api/tasks/changes and patches the rows on screen instead of reloading the page.
+// The server marks the table with the revision it was rendered at (data-sync-rev); search results are not synced.
+document.addEventListener('DOMContentLoaded', function(){
+  const body = document.querySelector('tbody[data-sync-rev]');
+  if (!body) return;
+  const SYNC_INTERVAL = 10000;
+  let rev = parseInt(body.dataset.syncRev, 10) || 0;
+  const filters = JSON.parse(body.dataset.filters || '{}');
+  const hasPrev = body.dataset.hasPrev === '1';
+  const hasNext = body.dataset.hasNext === '1';
+
+  // datetime-local value -> timestamp, wall clock read as UTC like tarefas.to_ts
+  function toTs(value){
+    const m = (value || '').match(/^(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2})/);
+    return m ? Date.UTC(+m[1], m[2] - 1, +m[3], +m[4], +m[5]) / 1000 : null;
+  }
+  const dueFrom = toTs(filters.due_from);
+  const dueTo = toTs(filters.due_to);
+
+  function matches(t){
+    if (filters.category && String(t.category_id) !== filters.category) return false;
+    if (filters.priority && t.priority !== filters.priority) return false;
+    if (filters.notify && (t.notify ? '1' : '0') !== filters.notify) return false;
+    if ((dueFrom !== null || dueTo !== null) && t.due_ts === null) return false;
+    if (dueFrom !== null && t.due_ts < dueFrom) return false;
+    if (dueTo !== null && t.due_ts > dueTo) return false;
+    return true;
+  }
+
+  // same order as the listing: dated tasks by (due_ts, id), then undated ones by id
+  function taskKey(t){ return [t.due_ts === null ? 1 : 0, t.due_ts === null ? 0 : t.due_ts, t.id]; }
+  function rowKey(tr){
+    const due = tr.dataset.dueTs;
+    return [due === '' ? 1 : 0, due === '' ? 0 : Number(due), Number(tr.dataset.id)];
+  }
+  function compare(a, b){
+    for (let i = 0; i < 3; i++) if (a[i] !== b[i]) return a[i] < b[i] ? -1 : 1;
+    return 0;
+  }
+  // a new row only belongs on this page if it sorts between the first and the last row shown
+  function inPage(key){
+    const rows = body.querySelectorAll('tr.task-row');
+    if (!rows.length) return !hasPrev && !hasNext;
+    if (hasPrev && compare(key, rowKey(rows[0])) < 0) return false;
+    if (hasNext && compare(key, rowKey(rows[rows.length - 1])) > 0) return false;
+    return true;
+  }
+
+  function cell(label, text, cls){
+    const td = document.createElement('td');
+    td.dataset.label = label;
+    if (cls) td.className = cls;
+    td.textContent = text;
+    return td;
+  }
+  function buildRow(t){
+    const tr = document.createElement('tr');
+    tr.className = 'task-row';
+    tr.dataset.id = t.id;
+    tr.dataset.dueTs = t.due_ts === null ? '' : t.due_ts;
+    const select = document.createElement('td');
+    select.className = 'col-select';
+    const box = document.createElement('input');
+    box.type = 'checkbox';
+    box.className = 'task-select';
+    box.value = t.id;
+    box.setAttribute('aria-label', 'Selecionar');
+    select.appendChild(box);
+    tr.appendChild(select);
+    tr.appendChild(cell('Título:', t.title));
+    tr.appendChild(cell('Descrição:', (t.description || '').slice(0, 100)));
+    tr.appendChild(cell('Vencimento:', t.due_show, 'col-due'));
+    tr.appendChild(cell('Prioridade:', t.priority, 'col-priority'));
+    tr.appendChild(cell('Categoria:', t.category || 'Sem categoria', 'col-category'));
+    tr.appendChild(cell('Notificar:', t.notify ? 'Sim' : 'Não', 'col-notify'));
+    const actions = document.createElement('td');
+    actions.className = 'actions';
+    const edit = document.createElement('a');
+    edit.className = 'btn small';
+    edit.href = '/edit_task/' + t.id;
+    edit.textContent = 'Editar';
+    const form = document.createElement('form');
+    form.action = '/delete_task/' + t.id;
+    form.method = 'post';
+    form.style.display = 'inline';
+    const del = document.createElement('button');
+    del.className = 'btn small danger';
+    del.type = 'submit';
+    del.textContent = 'Excluir';
+    form.appendChild(del);
+    actions.append(edit, ' ', form);
+    tr.appendChild(actions);
+    return tr;
+  }
+  function insertSorted(tr){
+    const key = rowKey(tr);
+    const next = Array.from(body.querySelectorAll('tr.task-row')).find(r => compare(rowKey(r), key) > 0);
+    body.insertBefore(tr, next || null);
+  }
+
+  // a recurring task is listed once per occurrence, so one id can own several rows
+  function rowsOf(id){ return body.querySelectorAll('tr.task-row[data-id="' + id + '"]'); }
+
+  function apply(data){
+    // occurrences are expanded by the server: a changed series means reloading the page
+    if (data.changed.some(t => t.recurring)) { location.reload(); return; }
+    data.deleted.forEach(id=>{
+      rowsOf(id).forEach(tr => tr.remove());
+    });
+    data.changed.forEach(t=>{
+      const rows = rowsOf(t.id);
+      const checked = rows.length ? rows[0].querySelector('.task-select').checked : false;  // a rebuilt row keeps its selection
+      rows.forEach(tr => tr.remove());
+      if (matches(t) && inPage(taskKey(t))) {
+        const row = buildRow(t);
+        row.querySelector('.task-select').checked = checked;
+        insertSorted(row);
+      }
+    });
+    rev = data.rev;
+    body.dispatchEvent(new Event('tasks:synced'));
+  }
+
+  async function sync(){
+    try {
+      // unchanged since the last poll -> 304 from the ETag, nothing to parse
+      const resp = await fetch('/api/tasks/changes?since=' + rev, { cache: 'no-cache' });
+      if (!resp.ok) return;
+      const data = await resp.json();
+      if (data.reset) { location.reload(); return; }  // too far behind: the page itself is stale
+      apply(data);
+      if (data.more) sync();
+    } catch (e) {}
+  }
+  setInterval(()=>{ if (!document.hidden) sync(); }, SYNC_INTERVAL);
+  // this page's own writes (tasks_bulk.js): fetch them now instead of at the next tick
+  document.addEventListener('tasks:changed', sync);
+  document.addEventListener('visibilitychange', ()=>{ if (!document.hidden) sync(); });
+});
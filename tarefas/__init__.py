@@ -0,0 +1,125 @@
+"""Núcleo do gerenciador de tarefas, sem interface gráfica.
+
+- db: conexão SQLite por thread, transações, migrações e db_execute instrumentado
+- querycache: cache LRU das leituras e versões de mudança das tabelas
+- models: categorias e tarefas (consultas, escrita, busca, dashboard, séries recorrentes)
+- recurrence: regras de recorrência e expansão das ocorrências
+- utils: conversão de datas
+- transfer: importação/exportação em lote e a linha de comando
+- scheduler: agendador de notificações
+- dispatch: entrega dos alertas pelos canais (popup, navegador, webhook, log)
+- instrument: métricas (Prometheus) e profiler por amostragem
+- archive: camada fria (archived_tasks) e compactação do banco
+- writequeue: fila de escrita opcional, com commit em grupo
+- tenants: um banco por usuário ou equipe (use_tenant)
+
+Nada aqui importa tkinter; a GUI fica em tarefas.gui e só é carregada por quem a abre.
+
+As constantes de configuração podem ser lidas e trocadas direto no pacote
+(tarefas.DB = "outro.db", tarefas.SLOW_QUERY_SECONDS = 0.05): a atribuição é repassada
+ao módulo que usa a constante.
+"""
+
+import sys
+import types
+
+from . import (archive, db, dispatch, instrument, models, querycache, recurrence, scheduler, tenants, transfer,
+               utils, writequeue)
+from .archive import (archive_stats, archive_tasks, archived_ids, compact_database, restore_tasks, run_archival,
+                      vacuum_database)
+from .db import (close_connection, current_db, db_execute, explain_query, get_connection, init_db, migrate,
+                 transaction, use_database)
+from .dispatch import (CallbackChannel, Channel, Dispatcher, LogChannel, WebhookChannel, digest_alerts, make_alert,
+                       standard_channels)
+from .instrument import Metrics, SamplingProfiler, metrics, profiler_snapshot, start_profiler, stop_profiler
+from .models import (TaskRow, _schedule_changed, _schedule_reload, add_category, add_task, claim_due_notifications,
+                     claim_due_occurrences, clear_recurrence, complete_occurrence, decode_cursor, delete_category,
+                     delete_task, delete_tasks, encode_cursor, get_categories, get_dashboard_stats,
+                     get_due_notifications, get_recurrence, get_task, get_task_changes, get_tasks, get_tasks_page,
+                     iter_tasks, move_tasks, next_occurrence_notifications, override_occurrence,
+                     prune_task_tombstones, recurrence_clock, reset_notifications, search_tasks, set_priority,
+                     set_recurrence, set_task_notified, task_revision, update_category, update_task)
+from .querycache import QueryCache, cache, cache_stats, get_change_version, last_passed_due
+from .recurrence import normalize_rule, occurrences, parse_cron, series_occurrences
+from .scheduler import (NotificationScheduler, TenantScheduler, acquire_lease, get_notification_events,
+                        latest_notification_seq, lease_holder, publish_notifications, release_lease)
+from .tenants import list_tenants, tenant_path, use_tenant
+from .transfer import cli, export_tasks, import_tasks, validate_task_record
+from .utils import format_due_iso, iso_or_none, parse_datetime_input, to_ts
+from .writequeue import WriteQueue, get_write_queue, stop_write_queue
+
+# configuração pública -> módulo dono (o único que a define); tarefas.X lê e grava lá, para que a
+# troca valha em tempo de execução. Os outros módulos leem essas constantes pelo dono (models.PRIORITIES),
+# nunca por uma cópia importada. Nomes com _ são internos e ficam de fora.
+_SETTINGS = {name: module for module, names in (
+    (db, ("DB", "PRAGMAS", "STATEMENT_CACHE_SIZE", "METRICS_ENABLED", "SLOW_QUERY_SECONDS", "QUERY_LABELS_MAX",
+          "DB_POOL_SIZE", "DB_POOL_IDLE_SECONDS", "DB_IDLE_CONNECTIONS", "SCHEMA_VERSION", "MIGRATIONS")),
+    (instrument, ("LATENCY_BUCKETS", "PROFILER_INTERVAL_SECONDS")),
+    (querycache, ("CACHE_MAX_ENTRIES", "CACHE_MAX_DATABASES")),
+    (models, ("PRIORITIES", "TASK_COLUMNS", "DUE_SHOW_SQL", "ALL_TASKS_SQL", "CURRENT_REV_SQL", "TASKS_PAGE_SIZE",
+              "TASKS_STREAM_BATCH", "CHANGES_PAGE_SIZE", "TOMBSTONE_RETENTION_REVS", "BULK_CHUNK_SIZE",
+              "HIGHLIGHT_OPEN", "HIGHLIGHT_CLOSE")),
+    (transfer, ("IMPORT_BATCH_SIZE", "MAX_IMPORT_ERRORS", "TASK_EXPORT_FIELDS")),
+    (scheduler, ("RECONCILE_INTERVAL_SECONDS", "SCHEDULER_HEAP_LIMIT", "LEASE_NAME", "LEASE_TTL_SECONDS",
+                 "LEASE_HEARTBEAT_SECONDS", "EVENT_POLL_SECONDS", "NOTIFICATION_EVENTS_KEEP")),
+    (writequeue, ("WRITE_BATCH_MAX", "WRITE_BATCH_DELAY_SECONDS", "WRITE_QUEUE_MAX", "WRITE_QUEUE_TIMEOUT_SECONDS",
+                  "WRITE_DURABILITY", "DURABILITY_MODES")),
+    (archive, ("ARCHIVE_NOTIFIED_AFTER_DAYS", "ARCHIVE_OVERDUE_AFTER_DAYS", "ARCHIVE_BATCH_SIZE",
+               "ARCHIVE_MAX_BATCHES", "ARCHIVE_INTERVAL_SECONDS", "ARCHIVE_VACUUM_PAGES")),
+    (recurrence, ("FREQUENCIES", "OCCURRENCE_STATES", "RECURRENCE_LOOKBEHIND_DAYS", "RECURRENCE_HORIZON_DAYS",
+                  "CRON_SEARCH_DAYS")),
+    (tenants, ("TENANT_DIR", "TENANT_NAME_RE")),
+    (dispatch, ("DISPATCH_ROUTES", "DISPATCH_PRIORITY_STYLE", "DISPATCH_CHANNEL_OPTIONS", "DISPATCH_WINDOW_SECONDS",
+                "DISPATCH_DIGEST_AFTER", "DISPATCH_DIGEST_TITLES", "DISPATCH_QUEUE_MAX", "DISPATCH_RETRIES",
+                "DISPATCH_BACKOFF_SECONDS", "DISPATCH_BACKOFF_MAX_SECONDS", "DISPATCH_LOG_FILE",
+                "DISPATCH_WEBHOOK_URL", "DISPATCH_WEBHOOK_TIMEOUT_SECONDS")),
+) for name in names}
+
+# nomes antigos (trabalho.py de antes do pacote) -> configuração que os substituiu
+_ALIASES = {
+    "CHECK_INTERVAL_SECONDS": "RECONCILE_INTERVAL_SECONDS",  # o notificador não varre mais a tabela a cada 30s
+}
+
+__all__ = [
+    "archive_stats", "archive_tasks", "archived_ids", "compact_database", "restore_tasks", "run_archival",
+    "vacuum_database",
+    "close_connection", "current_db", "db_execute", "explain_query", "get_connection", "init_db", "migrate",
+    "transaction", "use_database",
+    "CallbackChannel", "Channel", "Dispatcher", "LogChannel", "WebhookChannel", "digest_alerts", "make_alert",
+    "standard_channels",
+    "Metrics", "SamplingProfiler", "metrics", "profiler_snapshot", "start_profiler", "stop_profiler",
+    "TaskRow", "add_category", "add_task", "claim_due_notifications", "claim_due_occurrences", "clear_recurrence",
+    "complete_occurrence", "decode_cursor", "delete_category", "delete_task", "delete_tasks", "encode_cursor",
+    "get_categories", "get_dashboard_stats", "get_due_notifications", "get_recurrence", "get_task",
+    "get_task_changes", "get_tasks", "get_tasks_page", "iter_tasks", "move_tasks", "next_occurrence_notifications",
+    "override_occurrence", "prune_task_tombstones", "recurrence_clock", "reset_notifications", "search_tasks",
+    "set_priority", "set_recurrence", "set_task_notified", "task_revision", "update_category", "update_task",
+    "QueryCache", "cache", "cache_stats", "get_change_version", "last_passed_due",
+    "normalize_rule", "occurrences", "parse_cron", "series_occurrences",
+    "NotificationScheduler", "TenantScheduler", "acquire_lease", "get_notification_events",
+    "latest_notification_seq", "lease_holder", "publish_notifications", "release_lease",
+    "list_tenants", "tenant_path", "use_tenant",
+    "cli", "export_tasks", "import_tasks", "validate_task_record",
+    "format_due_iso", "iso_or_none", "parse_datetime_input", "to_ts",
+    "WriteQueue", "get_write_queue", "stop_write_queue",
+] + sorted(_SETTINGS)
+
+
+class _Package(types.ModuleType):
+    def __getattr__(self, name):
+        name = _ALIASES.get(name, name)
+        module = _SETTINGS.get(name)
+        if module is None:
+            raise AttributeError(f"module {self.__name__!r} has no attribute {name!r}")
+        return getattr(module, name)
+
+    def __setattr__(self, name, value):
+        name = _ALIASES.get(name, name)
+        module = _SETTINGS.get(name)
+        if module is not None:
+            setattr(module, name, value)
+        else:
+            super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
@@ -0,0 +1,150 @@
+"""Camada fria: tarefas antigas saem de tasks para archived_tasks.
+
+tasks fica só com o conjunto de trabalho, e as listagens, o dashboard, o agendador e a busca
+percorrem só ele. Uma tarefa é arquivada quando:
+- já foi notificada e venceu há mais de ARCHIVE_NOTIFIED_AFTER_DAYS dias, ou
+- venceu há mais de ARCHIVE_OVERDUE_AFTER_DAYS dias e não tem alerta pendente (sem notify ou já avisada).
+Tarefas sem data, com alerta ainda por sair e mestres de séries recorrentes nunca são arquivados.
+A mudança é feita em lotes de ARCHIVE_BATCH_SIZE, um commit por lote, para não segurar o banco;
+o DELETE em tasks dispara os triggers de sempre (contadores, FTS, log de mudanças), então para os
+clientes a tarefa arquivada some como uma exclusão.
+
+As arquivadas continuam disponíveis com include_archived=True em get_tasks/get_tasks_page e
+get_dashboard_stats, e voltam para tasks com restore_tasks(). O líder do agendador roda
+run_archival() a cada ARCHIVE_INTERVAL_SECONDS; também há "python trabalho.py archive".
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from .db import db_execute, transaction
+from .instrument import metrics
+from .models import _id_chunks, _schedule_changed
+from .querycache import cache
+from .utils import iso_or_none, to_ts
+
+ARCHIVE_NOTIFIED_AFTER_DAYS = 30  # None desliga a regra
+ARCHIVE_OVERDUE_AFTER_DAYS = 180  # None desliga a regra
+ARCHIVE_BATCH_SIZE = 500  # tarefas movidas por transação
+ARCHIVE_MAX_BATCHES = 20  # lotes por rodada do agendador; o resto fica para a próxima
+ARCHIVE_INTERVAL_SECONDS = 3600  # intervalo entre rodadas no líder do agendador
+ARCHIVE_VACUUM_PAGES = 2000  # páginas livres devolvidas ao sistema por rodada (auto_vacuum=INCREMENTAL)
+
+_TASK_FIELDS = "id, title, description, due, priority, category_id, notify, notified"
+
+metrics.describe("trabalho_archive_moved_total", "counter", "Tarefas movidas para archived_tasks.")
+metrics.describe("trabalho_archive_restored_total", "counter", "Tarefas devolvidas de archived_tasks para tasks.")
+metrics.describe("trabalho_archive_run_seconds", "histogram", "Duração de cada rodada de arquivamento e compactação.")
+
+
+def _archive_conditions(now):
+    """Condição SQL (sobre tasks) das regras de idade, com os parâmetros; None se nenhuma regra está ligada."""
+    rules, params = [], []
+    if ARCHIVE_NOTIFIED_AFTER_DAYS is not None:
+        rules.append("(notified = 1 AND due_ts < ?)")
+        params.append(to_ts(now - timedelta(days=ARCHIVE_NOTIFIED_AFTER_DAYS)))
+    if ARCHIVE_OVERDUE_AFTER_DAYS is not None:
+        # um alerta pendente sai antes: o agendador nunca vê a tarefa depois de arquivada
+        rules.append("(due_ts < ? AND NOT (notify = 1 AND notified = 0))")
+        params.append(to_ts(now - timedelta(days=ARCHIVE_OVERDUE_AFTER_DAYS)))
+    if not rules:
+        return None, ()
+    # o limite maior restringe a faixa lida em idx_tasks_due_ts; as regras filtram dentro dela
+    # o mestre de uma série recorrente fica em tasks enquanto a regra existir
+    return (f"due_ts IS NOT NULL AND due_ts < ? AND ({' OR '.join(rules)})"
+            " AND id NOT IN (SELECT task_id FROM task_recurrence)", (max(params), *params))
+
+
+def archive_tasks(now=None, batch_size=None, max_batches=None):
+    """Move as tarefas que se encaixam nas regras para archived_tasks; devolve quantas foram movidas."""
+    now = now or datetime.now()
+    batch_size = batch_size or ARCHIVE_BATCH_SIZE
+    where, params = _archive_conditions(now)
+    if where is None:
+        return 0
+    archived_at = iso_or_none(now)
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction():
+            ids = [r[0] for r in db_execute(f"SELECT id FROM tasks WHERE {where} ORDER BY due_ts LIMIT ?",
+                                            (*params, batch_size), fetch=True)]
+            if ids:
+                marks = ",".join("?" * len(ids))
+                db_execute(f"""INSERT OR REPLACE INTO archived_tasks({_TASK_FIELDS}, archived_at)
+                               SELECT {_TASK_FIELDS}, ? FROM tasks WHERE id IN ({marks})""", (archived_at, *ids))
+                db_execute(f"DELETE FROM tasks WHERE id IN ({marks})", ids)
+        for task_id in ids:
+            cache.invalidate("task", task_id)
+            _schedule_changed(task_id, None)
+        moved += len(ids)
+        batches += 1
+        if len(ids) < batch_size:
+            break
+    if moved:
+        cache.invalidate("dashboard")
+        metrics.inc("trabalho_archive_moved_total", moved)
+    return moved
+
+
+def restore_tasks(task_ids):
+    """Devolve tarefas arquivadas para tasks (com o mesmo id); devolve os ids restaurados."""
+    restored = []
+    with transaction():
+        for chunk, marks in _id_chunks(task_ids):
+            found = db_execute(f"""SELECT id, CASE WHEN notify = 1 AND notified = 0 THEN due END
+                                   FROM archived_tasks WHERE id IN ({marks})""", chunk, fetch=True)
+            if found:
+                db_execute(f"""INSERT INTO tasks({_TASK_FIELDS})
+                               SELECT {_TASK_FIELDS} FROM archived_tasks WHERE id IN ({marks})""", chunk)
+                db_execute(f"DELETE FROM archived_tasks WHERE id IN ({marks})", chunk)
+                restored.extend(found)
+    # uma restaurada ainda pode ter notificação pendente
+    for task_id, pending_due in restored:
+        _schedule_changed(task_id, pending_due)
+    if restored:
+        cache.invalidate("dashboard")
+        metrics.inc("trabalho_archive_restored_total", len(restored))
+    return [r[0] for r in restored]
+
+
+def archived_ids(task_ids):
+    """Os ids dados que estão em archived_tasks (as listagens com include_archived os mostram só para leitura)."""
+    found = set()
+    for chunk, marks in _id_chunks(task_ids):
+        found.update(r[0] for r in db_execute(f"SELECT id FROM archived_tasks WHERE id IN ({marks})", chunk,
+                                              fetch=True))
+    return found
+
+
+def archive_stats():
+    """{"hot": tarefas em tasks, "archived": tarefas em archived_tasks}."""
+    hot = db_execute("SELECT COALESCE(SUM(total), 0) FROM task_counters", fetch=True)[0][0]
+    archived = db_execute("SELECT COUNT(*) FROM archived_tasks", fetch=True)[0][0]
+    return {"hot": hot, "archived": archived}
+
+
+def compact_database(vacuum_pages=None):
+    """Depois de mover muitas linhas: atualiza as estatísticas do planejador e devolve páginas livres.
+
+    incremental_vacuum só tem efeito em bancos com auto_vacuum=INCREMENTAL (os criados com
+    essa versão, ou um antigo depois de "python trabalho.py archive --vacuum")."""
+    db_execute("ANALYZE tasks")
+    db_execute("ANALYZE archived_tasks")
+    if db_execute("PRAGMA auto_vacuum", fetch=True)[0][0] == 2:
+        db_execute(f"PRAGMA incremental_vacuum({int(vacuum_pages or ARCHIVE_VACUUM_PAGES)})", fetch=True)
+
+
+def vacuum_database():
+    """VACUUM completo: reconstrói o arquivo e passa a valer auto_vacuum=INCREMENTAL. Bloqueia o banco enquanto roda."""
+    db_execute("PRAGMA auto_vacuum=INCREMENTAL")
+    db_execute("VACUUM")
+
+
+def run_archival(now=None, max_batches=None):
+    """Uma rodada: arquiva até max_batches lotes (padrão ARCHIVE_MAX_BATCHES) e compacta se algo saiu."""
+    start = time.perf_counter()
+    moved = archive_tasks(now, max_batches=max_batches or ARCHIVE_MAX_BATCHES)
+    if moved:
+        compact_database()
+    metrics.observe("trabalho_archive_run_seconds", time.perf_counter() - start)
+    return moved
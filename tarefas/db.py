@@ -0,0 +1,559 @@
+"""Acesso ao SQLite: conexão por thread, transações, migrações do esquema e db_execute instrumentado.
+
+O banco usado é DB, a não ser dentro de use_database(caminho) (um tenant, ver tarefas.tenants):
+a escolha vale para o contexto atual (thread ou requisição), não para o processo. Cada thread
+guarda até DB_POOL_SIZE conexões abertas, uma por arquivo, e o esquema de um arquivo é criado ou
+migrado na primeira vez que o processo o abre.
+"""
+
+import contextvars
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .instrument import metrics
+
+DB = "tasks.db"
+# pragmas aplicados uma única vez, quando a conexão da thread é aberta
+PRAGMAS = (
+    # só vale em banco novo (antes do journal_mode, que já grava o cabeçalho) ou depois de um VACUUM:
+    # libera páginas aos poucos, ver tarefas.archive
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",  # 256 MiB
+    "PRAGMA cache_size=-16000",    # ~16 MiB
+    "PRAGMA temp_store=MEMORY",
+)
+STATEMENT_CACHE_SIZE = 256  # statements preparados reaproveitados por conexão
+METRICS_ENABLED = True  # latência por comando SQL em db_execute (custa ~1µs por chamada)
+SLOW_QUERY_SECONDS = 0.1  # comandos mais lentos que isso têm o EXPLAIN QUERY PLAN registrado
+QUERY_LABELS_MAX = 500  # rótulos "query" distintos nas métricas; os que passarem disso viram "other"
+DB_POOL_SIZE = 32  # conexões abertas por thread (uma por arquivo); a menos usada é fechada
+DB_POOL_IDLE_SECONDS = 300  # conexão sem uso por esse tempo é fechada na próxima abertura da thread
+DB_IDLE_CONNECTIONS = 16  # conexões de threads encerradas guardadas para as próximas (todos os arquivos)
+
+_local = threading.local()
+_current_db = contextvars.ContextVar("tarefas_db", default=None)
+_schema_ready = set()  # arquivos cujo esquema já foi conferido por este processo
+_schema_lock = threading.Lock()
+_idle = []  # (caminho, conexão, devolvida em) das threads encerradas, da mais antiga para a mais nova
+_idle_lock = threading.Lock()
+
+
+def current_db():
+    """Arquivo do banco no contexto atual: o de use_database(), ou DB."""
+    return _current_db.get() or DB
+
+
+@contextmanager
+def use_database(path):
+    """Dentro do bloco, db_execute/transaction (e tudo o que os usa) trabalham no banco `path`."""
+    token = _current_db.set(path)
+    try:
+        yield path
+    finally:
+        _current_db.reset(token)
+
+
+class _ThreadConnections:
+    """Conexões de uma thread. Quando a thread termina, o objeto é liberado e as conexões vão
+    para _idle (as threads do servidor web e da GUI costumam durar uma requisição só)."""
+    __slots__ = ("entries", "__weakref__")
+
+    def __init__(self):
+        self.entries = OrderedDict()  # caminho -> [conexão, último uso], do menos para o mais recente
+        weakref.finalize(self, _release_connections, self.entries).atexit = False
+
+
+def get_connection():
+    """Conexão SQLite da thread atual para current_db(). É aberta na primeira chamada e reutilizada depois.
+
+    Uma thread nova pega, se houver, a conexão deixada por uma thread que já terminou."""
+    holder = getattr(_local, "connections", None)
+    if holder is None:
+        holder = _local.connections = _ThreadConnections()
+    pool = holder.entries
+    path = current_db()
+    entry = pool.get(path)
+    now = time.monotonic()
+    if entry is None:
+        _evict_connections(pool, now)
+        conn = _take_idle(path, now)
+        if conn is None:
+            # isolation_level=None: fora de transaction() cada comando faz autocommit.
+            # check_same_thread=False: a conexão passa de uma thread encerrada para outra (nunca duas ao mesmo tempo)
+            conn = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                   cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            metrics.inc("trabalho_db_connections_opened_total")
+            metrics.inc("trabalho_db_connections_open")
+        entry = pool[path] = [conn, now]
+        if path not in _schema_ready:
+            _ensure_schema(conn, path)
+    else:
+        entry[1] = now
+        pool.move_to_end(path)
+    return entry[0]
+
+
+def _close(conn):
+    conn.close()
+    metrics.inc("trabalho_db_connections_open", -1)
+    metrics.inc("trabalho_db_connections_evicted_total")
+
+
+def _evict_connections(pool, now):
+    # antes de abrir mais uma: fecha as paradas há muito tempo e, no limite, as menos usadas.
+    # Uma conexão com transação aberta nunca é fechada.
+    for path, (conn, last_used) in list(pool.items()):
+        full = len(pool) >= DB_POOL_SIZE
+        if not full and now - last_used < DB_POOL_IDLE_SECONDS:
+            break
+        if conn.in_transaction:
+            continue
+        del pool[path]
+        _close(conn)
+
+
+def _take_idle(path, now):
+    """Conexão livre para path deixada por uma thread encerrada, ou None; fecha as paradas há muito tempo."""
+    found, stale = None, []
+    with _idle_lock:
+        for i in range(len(_idle) - 1, -1, -1):
+            idle_path, conn, returned = _idle[i]
+            if now - returned >= DB_POOL_IDLE_SECONDS:
+                stale.append(_idle.pop(i)[1])
+            elif found is None and idle_path == path:
+                found = _idle.pop(i)[1]
+    for conn in stale:
+        _close(conn)
+    return found
+
+
+def _release_connections(entries):
+    # a thread terminou: as conexões vão para _idle, até DB_IDLE_CONNECTIONS; as mais antigas são fechadas
+    now = time.monotonic()
+    overflow = []
+    for path, (conn, _) in entries.items():
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            overflow.append(conn)
+            continue
+        with _idle_lock:
+            _idle.append((path, conn, now))
+            while len(_idle) > DB_IDLE_CONNECTIONS:
+                overflow.append(_idle.pop(0)[1])
+    entries.clear()
+    for conn in overflow:
+        _close(conn)
+
+
+def _ensure_schema(conn, path):
+    # primeira abertura do arquivo neste processo: cria as tabelas ou aplica as migrações que faltam.
+    # Um banco já atualizado custa só a leitura de user_version, sem pegar o lock de escrita.
+    with _schema_lock:
+        if path in _schema_ready:
+            return
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                create_schema(conn)
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+        _schema_ready.add(path)
+
+
+def close_connection():
+    """Fecha as conexões abertas pela thread atual."""
+    holder = getattr(_local, "connections", None)
+    pool = holder.entries if holder is not None else {}
+    for conn, _ in pool.values():
+        conn.close()
+        metrics.inc("trabalho_db_connections_open", -1)
+    pool.clear()
+
+
+@contextmanager
+def transaction():
+    """Agrupa vários comandos em um único commit. Chamadas aninhadas reutilizam a transação externa.
+
+    with transaction():
+        db_execute(...)
+        db_execute(...)
+    """
+    conn = get_connection()
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+
+def init_db():
+    """Cria ou migra o esquema do banco atual (get_connection já faz isso na primeira abertura)."""
+    with transaction() as conn:
+        create_schema(conn)
+    _schema_ready.add(current_db())
+
+
+def create_schema(conn):
+    """Tabelas base e migrações pendentes, na transação aberta em conn."""
+    c = conn.cursor()
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS categories(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT UNIQUE NOT NULL,
+        description TEXT
+    )""")
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS tasks(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        due TEXT, -- ISO datetime string or NULL
+        priority TEXT CHECK(priority IN ('Baixa','Média','Alta')) DEFAULT 'Baixa',
+        category_id INTEGER,
+        notify INTEGER DEFAULT 1,
+        notified INTEGER DEFAULT 0,
+        FOREIGN KEY(category_id) REFERENCES categories(id)
+    )""")
+    migrate(conn)
+
+
+# ---------- migrations ----------
+# Cada migração é (versão, passos); um passo é um comando SQL ou uma função que recebe a conexão.
+# A versão aplicada fica gravada em PRAGMA user_version, então um tasks.db antigo é
+# atualizado no lugar na próxima chamada de init_db(). Novas migrações entram sempre no fim.
+MIGRATIONS = [
+    (1, [
+        # normaliza datas gravadas com 'T' para o formato de iso_or_none ('YYYY-MM-DD HH:MM:SS'),
+        # assim a comparação de texto em SQL (due <= ?) segue a ordem cronológica
+        "UPDATE tasks SET due = replace(due, 'T', ' ') WHERE due LIKE '%T%'",
+        # índice parcial e cobridor da consulta de notificações: só contém tarefas pendentes de aviso
+        # (notify/notified entram nas colunas para o SQLite não precisar ler a tabela)
+        """CREATE INDEX IF NOT EXISTS idx_tasks_pending_due
+           ON tasks(due, title, priority, notify, notified) WHERE notify=1 AND notified=0 AND due IS NOT NULL""",
+    ]),
+    (2, [
+        # contadores do dashboard por (categoria, prioridade), mantidos pelos triggers abaixo;
+        # category_key = 0 representa "Sem categoria" (NULL não serve em chave única)
+        """CREATE TABLE IF NOT EXISTS task_counters(
+            category_key INTEGER NOT NULL,
+            priority TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            no_notify INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(category_key, priority)
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS trg_task_counters_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_counters(category_key, priority, total, no_notify)
+            VALUES(COALESCE(NEW.category_id, 0), COALESCE(NEW.priority, ''), 1, NEW.notify = 0)
+            ON CONFLICT(category_key, priority) DO UPDATE
+            SET total = total + 1, no_notify = no_notify + excluded.no_notify;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_task_counters_delete AFTER DELETE ON tasks BEGIN
+            UPDATE task_counters SET total = total - 1, no_notify = no_notify - (OLD.notify = 0)
+            WHERE category_key = COALESCE(OLD.category_id, 0) AND priority = COALESCE(OLD.priority, '');
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_task_counters_update
+        AFTER UPDATE OF category_id, priority, notify ON tasks BEGIN
+            UPDATE task_counters SET total = total - 1, no_notify = no_notify - (OLD.notify = 0)
+            WHERE category_key = COALESCE(OLD.category_id, 0) AND priority = COALESCE(OLD.priority, '');
+            INSERT INTO task_counters(category_key, priority, total, no_notify)
+            VALUES(COALESCE(NEW.category_id, 0), COALESCE(NEW.priority, ''), 1, NEW.notify = 0)
+            ON CONFLICT(category_key, priority) DO UPDATE
+            SET total = total + 1, no_notify = no_notify + excluded.no_notify;
+        END""",
+        "DELETE FROM task_counters",
+        """INSERT INTO task_counters(category_key, priority, total, no_notify)
+           SELECT COALESCE(category_id, 0), COALESCE(priority, ''), COUNT(*), SUM(notify = 0)
+           FROM tasks GROUP BY 1, 2""",
+        # a divisão atrasadas/pendentes depende da hora atual e é contada por faixa neste índice
+        "CREATE INDEX IF NOT EXISTS idx_tasks_due ON tasks(due)",
+    ]),
+    (3, [
+        # paginação por chave filtrada por categoria: (category_id, due, rowid)
+        "CREATE INDEX IF NOT EXISTS idx_tasks_category_due ON tasks(category_id, due)",
+    ]),
+    (4, [
+        # vencimento numérico (segundos desde a época, horário de parede sem fuso, ver to_ts).
+        # Coluna gerada: o SQLite a calcula a partir de `due` em toda escrita, inclusive nas
+        # linhas antigas, então não há backfill nem código de sincronização para esquecer.
+        """ALTER TABLE tasks ADD COLUMN due_ts INTEGER
+           GENERATED ALWAYS AS (CAST(strftime('%s', due) AS INTEGER)) VIRTUAL""",
+        # os índices sobre o texto `due` passam para due_ts
+        "DROP INDEX IF EXISTS idx_tasks_pending_due",
+        "DROP INDEX IF EXISTS idx_tasks_due",
+        "DROP INDEX IF EXISTS idx_tasks_category_due",
+        """CREATE INDEX IF NOT EXISTS idx_tasks_pending_due_ts
+           ON tasks(due_ts, due, title, priority, notify, notified) WHERE notify=1 AND notified=0 AND due_ts IS NOT NULL""",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_due_ts ON tasks(due_ts)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_category_due_ts ON tasks(category_id, due_ts)",
+    ]),
+    (5, [
+        # busca textual: índice invertido FTS5 sobre título/descrição, com o conteúdo lido da
+        # própria tabela tasks (content=) e mantido pelos triggers abaixo
+        """CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            title, description, content='tasks', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2')""",
+        """CREATE TRIGGER IF NOT EXISTS trg_tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts(rowid, title, description) VALUES(NEW.id, NEW.title, NEW.description);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES('delete', OLD.id, OLD.title, OLD.description);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES('delete', OLD.id, OLD.title, OLD.description);
+            INSERT INTO tasks_fts(rowid, title, description) VALUES(NEW.id, NEW.title, NEW.description);
+        END""",
+        "INSERT INTO tasks_fts(tasks_fts) VALUES('rebuild')",
+    ]),
+    (6, [
+        # versão de cada tabela, incrementada por trigger em toda escrita (de qualquer processo);
+        # o cache de leitura compara com ela para saber o que ficou velho
+        """CREATE TABLE IF NOT EXISTS table_versions(
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )""",
+        "INSERT OR IGNORE INTO table_versions(name, version) VALUES('tasks', 0), ('categories', 0)",
+    ] + [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+        END"""
+        for table in ("tasks", "categories") for event in ("INSERT", "UPDATE", "DELETE")
+    ]),
+    # v7: log de mudanças para a sincronização incremental (get_task_changes). Uma linha por tarefa
+    # com a revisão da última mudança; AUTOINCREMENT garante que uma revisão nunca é reutilizada.
+    # Exclusões viram tombstones (deleted=1), descartadas depois por prune_task_tombstones().
+    (7, [
+        """CREATE TABLE IF NOT EXISTS task_changes(
+            rev INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL UNIQUE,
+            deleted INTEGER NOT NULL DEFAULT 0
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_task_changes_tombstones ON task_changes(rev) WHERE deleted = 1",
+        """CREATE TABLE IF NOT EXISTS sync_meta(
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )""",
+        # revisões até tombstone_floor podem ter perdido exclusões: quem parou antes disso recomeça do zero
+        "INSERT OR IGNORE INTO sync_meta(name, value) VALUES('tombstone_floor', 0)",
+        "INSERT OR REPLACE INTO task_changes(task_id, deleted) SELECT id, 0 FROM tasks ORDER BY id",
+        """CREATE TRIGGER IF NOT EXISTS trg_tasks_changes_insert AFTER INSERT ON tasks BEGIN
+            INSERT OR REPLACE INTO task_changes(task_id, deleted) VALUES (new.id, 0);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_tasks_changes_update AFTER UPDATE ON tasks BEGIN
+            INSERT OR REPLACE INTO task_changes(task_id, deleted) VALUES (new.id, 0);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_tasks_changes_delete AFTER DELETE ON tasks BEGIN
+            INSERT OR REPLACE INTO task_changes(task_id, deleted) VALUES (old.id, 1);
+        END""",
+        # o título da categoria aparece nas linhas das tarefas: renomear conta como mudança nelas
+        """CREATE TRIGGER IF NOT EXISTS trg_categories_changes_title AFTER UPDATE OF title ON categories
+        WHEN new.title IS NOT old.title BEGIN
+            INSERT OR REPLACE INTO task_changes(task_id, deleted)
+            SELECT id, 0 FROM tasks WHERE category_id = new.id;
+        END""",
+    ]),
+    # v8: um só notificador entre processos. O lease (holder, expires_at em segundos unix) elege o
+    # líder; as tarefas que ele reivindica viram eventos que todos os processos leem por seq.
+    (8, [
+        """CREATE TABLE IF NOT EXISTS notifier_lease(
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS notification_events(
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            task_id INTEGER NOT NULL,
+            title TEXT,
+            due TEXT,
+            priority TEXT
+        )""",
+    ]),
+    # v9: camada fria. tarefas antigas saem de tasks (e de todos os índices, contadores e FTS dela)
+    # para archived_tasks, com o mesmo id; ver tarefas.archive
+    (9, [
+        """CREATE TABLE IF NOT EXISTS archived_tasks(
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT,
+            due TEXT,
+            priority TEXT,
+            category_id INTEGER,
+            notify INTEGER,
+            notified INTEGER,
+            archived_at TEXT NOT NULL,
+            due_ts INTEGER GENERATED ALWAYS AS (CAST(strftime('%s', due) AS INTEGER)) VIRTUAL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_archived_tasks_due_ts ON archived_tasks(due_ts)",
+        "CREATE INDEX IF NOT EXISTS idx_archived_tasks_category_due_ts ON archived_tasks(category_id, due_ts)",
+    ]),
+    # v10: tarefas recorrentes (tarefas.recurrence). Uma regra por tarefa mestre e só as exceções
+    # por ocorrência; as ocorrências em si são geradas na leitura. notified_ts é a marca d'água
+    # do notificador: ocorrências até ela já foram avisadas.
+    (10, [
+        """CREATE TABLE IF NOT EXISTS task_recurrence(
+            task_id INTEGER PRIMARY KEY,
+            freq TEXT NOT NULL CHECK(freq IN ('daily','weekly','monthly','cron')),
+            every INTEGER NOT NULL DEFAULT 1 CHECK(every >= 1),
+            byday TEXT,
+            cron TEXT,
+            until TEXT,
+            notified_ts INTEGER
+        )""",
+        """CREATE TABLE IF NOT EXISTS task_occurrences(
+            task_id INTEGER NOT NULL,
+            occurrence_ts INTEGER NOT NULL,
+            due TEXT,
+            state TEXT CHECK(state IN ('done','cancelled')),
+            PRIMARY KEY(task_id, occurrence_ts)
+        ) WITHOUT ROWID""",
+        # o mestre nunca é notificado como tarefa comum (notified fica 1); quem avisa é a série
+        """CREATE TRIGGER IF NOT EXISTS trg_task_recurrence_master AFTER INSERT ON task_recurrence BEGIN
+            UPDATE tasks SET notified = 1 WHERE id = NEW.task_id AND notified = 0;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_tasks_recurring_notified AFTER UPDATE OF notified ON tasks
+        WHEN NEW.notified = 0 AND EXISTS (SELECT 1 FROM task_recurrence WHERE task_id = NEW.id) BEGIN
+            UPDATE tasks SET notified = 1 WHERE id = NEW.id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_tasks_recurrence_delete AFTER DELETE ON tasks BEGIN
+            DELETE FROM task_recurrence WHERE task_id = OLD.id;
+            DELETE FROM task_occurrences WHERE task_id = OLD.id;
+        END""",
+    ] + [
+        # mudar a regra ou uma exceção muda as linhas listadas: conta como mudança na tarefa
+        # (log de sincronização e versão usada nos ETags); a marca d'água do notificador não conta.
+        # Só se a tarefa ainda existe: na exclusão em cascata a tombstone tem de ficar.
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_changes_{event.split()[0].lower()} AFTER {event} ON {table} BEGIN
+            INSERT OR REPLACE INTO task_changes(task_id, deleted)
+            SELECT {row}.task_id, 0 WHERE EXISTS (SELECT 1 FROM tasks WHERE id = {row}.task_id);
+            UPDATE table_versions SET version = version + 1 WHERE name = 'tasks';
+        END"""
+        for table, event, row in (
+            ("task_recurrence", "INSERT", "NEW"),
+            ("task_recurrence", "UPDATE OF freq, every, byday, cron, until", "NEW"),
+            ("task_recurrence", "DELETE", "OLD"),
+            ("task_occurrences", "INSERT", "NEW"),
+            ("task_occurrences", "UPDATE", "NEW"),
+            ("task_occurrences", "DELETE", "OLD"),
+        )
+    ]),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(conn):
+    """Aplica as migrações que ainda não rodaram neste banco. Deve rodar dentro de transaction()."""
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    for version, steps in MIGRATIONS:
+        if version <= current:
+            continue
+        for step in steps:
+            if callable(step):
+                step(conn)
+            else:
+                conn.execute(step)
+        conn.execute(f"PRAGMA user_version = {int(version)}")
+    return max(current, SCHEMA_VERSION)
+
+
+def db_execute(query, params=(), fetch=False, many=False):
+    # usa a conexão persistente da thread; dentro de transaction() o commit fica para o final
+    conn = get_connection()
+    c = conn.cursor()
+    start = time.perf_counter()
+    try:
+        if many:
+            c.executemany(query, params)
+        else:
+            c.execute(query, params)
+        result = c.fetchall() if fetch else c.lastrowid
+    except sqlite3.Error:
+        if METRICS_ENABLED:
+            metrics.inc("trabalho_db_errors_total", query=_query_label(query))
+        raise
+    if METRICS_ENABLED:
+        _record_query(conn, query, None if many else params, time.perf_counter() - start,
+                      len(result) if fetch else None, c.rowcount)
+    return result
+
+
+# ---------- metrics ----------
+metrics.describe("trabalho_db_query_seconds", "histogram", "Latência dos comandos SQL executados por db_execute.")
+metrics.describe("trabalho_db_rows_returned_total", "counter", "Linhas devolvidas por consultas (fetch=True).")
+metrics.describe("trabalho_db_rows_affected_total", "counter", "Linhas alteradas por INSERT/UPDATE/DELETE.")
+metrics.describe("trabalho_db_errors_total", "counter", "Comandos SQL que terminaram em erro.")
+metrics.describe("trabalho_db_slow_query_seconds", "gauge",
+                 f"Última duração de cada comando acima de {SLOW_QUERY_SECONDS}s, com o plano da consulta.")
+metrics.describe("trabalho_db_connections_open", "gauge",
+                 "Conexões SQLite abertas (as das threads e as livres à espera de outra).")
+metrics.describe("trabalho_db_connections_opened_total", "counter", "Conexões SQLite abertas desde o início.")
+metrics.describe("trabalho_db_connections_evicted_total", "counter",
+                 "Conexões fechadas pelo pool (ociosas, além de DB_POOL_SIZE por thread ou de DB_IDLE_CONNECTIONS).")
+
+_query_labels = {}  # texto SQL -> rótulo; evita normalizar e refazer o hash a cada chamada
+_label_values = set()  # rótulos já usados nas métricas (no máximo QUERY_LABELS_MAX)
+_IN_LIST = re.compile(r"\?(?:\s*,\s*\?)+")  # IN (?,?,?...) de tamanho variável conta como uma consulta só
+
+
+def _query_label(query):
+    """Rótulo da consulta nas métricas: o verbo, o trecho a partir do FROM e o hash do texto
+    normalizado inteiro.
+
+    Consultas com o mesmo SELECT/JOIN inicial (get_tasks, get_task, busca, séries) ficam separadas
+    pelo hash; listas IN de tamanhos diferentes viram a mesma consulta."""
+    label = _query_labels.get(query)
+    if label is None:
+        text = _IN_LIST.sub("?, ...", " ".join(query.split()))
+        # a lista de colunas é igual em várias consultas; o trecho a partir do FROM diz mais
+        head = text if " FROM " not in text else text.split(" ", 1)[0] + " ..." + text[text.index(" FROM "):]
+        label = f"{head[:80]} #{hashlib.sha1(text.encode()).hexdigest()[:10]}"
+        if label not in _label_values:
+            if len(_label_values) >= QUERY_LABELS_MAX:
+                label = "other"
+            else:
+                _label_values.add(label)
+        if len(_query_labels) >= 4096:  # consultas montadas dinamicamente não crescem sem limite
+            _query_labels.clear()
+        _query_labels[query] = label
+    return label
+
+
+def _record_query(conn, query, params, seconds, rows_returned, rows_affected):
+    label = _query_label(query)
+    metrics.observe("trabalho_db_query_seconds", seconds, query=label)
+    if rows_returned is not None:
+        metrics.inc("trabalho_db_rows_returned_total", rows_returned, query=label)
+    elif rows_affected > 0:
+        metrics.inc("trabalho_db_rows_affected_total", rows_affected, query=label)
+    if seconds >= SLOW_QUERY_SECONDS:
+        metrics.set("trabalho_db_slow_query_seconds", round(seconds, 6), query=label,
+                    plan=explain_query(conn, query, params))
+
+
+def explain_query(conn, query, params=None):
+    """Plano de execução (EXPLAIN QUERY PLAN) em uma linha, ex.: "SCAN t | USE TEMP B-TREE FOR ORDER BY"."""
+    if params is None:  # executemany: o plano não depende dos valores, mas precisa de um por parâmetro
+        params = (None,) * query.count("?")
+    try:
+        rows = conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+    except sqlite3.Error as e:
+        return f"(sem plano: {e})"
+    return " | ".join(row[-1] for row in rows)
@@ -0,0 +1,342 @@
+"""Despacho dos alertas: do agendador aos canais de entrega (popup, navegador, webhook, log).
+
+O agendador só detecta os vencimentos. Os eventos dele vão para Dispatcher.submit (o on_due),
+que monta os alertas, escolhe os canais pela prioridade (DISPATCH_ROUTES) e põe cada lote na
+fila do canal sem esperar. Cada canal tem fila limitada e threads próprias: um canal lento (um
+webhook fora do ar) atrasa só a si mesmo, nunca a varredura dos vencimentos nem os outros canais.
+
+    dispatcher = Dispatcher([CallbackChannel("popup", mostrar), LogChannel("alertas.log")]).start()
+    scheduler = NotificationScheduler(dispatcher.submit)
+
+Em cada canal:
+- rajadas viram resumo: os alertas de um tenant que chegam juntos (em `window` segundos, ou
+  enquanto o canal espera o limite de taxa) acima de `digest_after` saem como um só, "N tarefas venceram";
+- limite de taxa por balde de fichas: `rate` alertas por segundo, até `burst` de uma vez;
+- falhas são repetidas até `retries` vezes, com espera exponencial (DISPATCH_BACKOFF_SECONDS);
+- com a fila cheia, o lote que não coube entra num resumo pendente em vez de se perder.
+
+As regras por prioridade (tocar som, exigir abrir o app) ficam em DISPATCH_PRIORITY_STYLE e chegam
+aos canais como campos do alerta.
+"""
+
+import json
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+from . import models
+from .instrument import metrics
+
+DISPATCH_ROUTES = {  # prioridade -> canais, pelo nome; os que não estão registrados são ignorados
+    "Baixa": ("popup", "stream", "log"),
+    "Média": ("popup", "stream", "log"),
+    "Alta": ("popup", "stream", "webhook", "log"),
+}
+DISPATCH_PRIORITY_STYLE = {  # prioridade -> (tocar som, exigir abrir o app)
+    "Baixa": (False, False),
+    "Média": (True, False),
+    "Alta": (True, True),
+}
+DISPATCH_CHANNEL_OPTIONS = {  # opções por canal; as omitidas usam os padrões abaixo
+    "popup": {"rate": 0.5, "burst": 3, "digest_after": 3},
+    "stream": {"window": 0.05, "digest_after": 20},
+    "webhook": {"rate": 5, "burst": 10, "workers": 2},
+    "log": {"digest_after": None},
+}
+DISPATCH_WINDOW_SECONDS = 0.25  # depois do primeiro alerta, espera por mais da mesma rajada
+DISPATCH_DIGEST_AFTER = 10  # alertas juntos acima disso viram um resumo (None = nunca)
+DISPATCH_DIGEST_TITLES = 5  # títulos listados em cada resumo
+DISPATCH_QUEUE_MAX = 1000  # lotes esperando em cada canal
+DISPATCH_RETRIES = 3
+DISPATCH_BACKOFF_SECONDS = 1.0  # primeira espera depois de uma falha; dobra a cada nova tentativa
+DISPATCH_BACKOFF_MAX_SECONDS = 60.0
+DISPATCH_LOG_FILE = None  # canal de log de standard_channels ("-" = saída de erro; None = sem canal)
+DISPATCH_WEBHOOK_URL = None  # canal webhook de standard_channels (None = sem canal)
+DISPATCH_WEBHOOK_TIMEOUT_SECONDS = 5.0
+
+metrics.describe("trabalho_dispatch_alerts_total", "counter", "Alertas recebidos do agendador pelo despacho.")
+metrics.describe("trabalho_dispatch_sent_total", "counter", "Entregas feitas por canal (alertas e resumos).")
+metrics.describe("trabalho_dispatch_errors_total", "counter", "Tentativas de entrega que falharam, por canal.")
+metrics.describe("trabalho_dispatch_failed_total", "counter", "Alertas abandonados depois de esgotar as tentativas.")
+metrics.describe("trabalho_dispatch_overflow_total", "counter", "Alertas que não couberam na fila do canal (entram num resumo).")
+metrics.describe("trabalho_dispatch_queue_depth", "gauge", "Lotes esperando na fila de cada canal.")
+metrics.describe("trabalho_dispatch_send_seconds", "histogram", "Duração de cada tentativa de entrega, por canal.")
+
+_STOP = object()
+
+
+# ---------- alertas ----------
+def _rank(priority):
+    return models.PRIORITIES.index(priority) if priority in models.PRIORITIES else -1
+
+
+def make_alert(event, tenant=None):
+    """Evento do agendador, (seq, task_id, title, due, priority), -> alerta entregue aos canais.
+
+    seq e first_seq delimitam os eventos cobertos (iguais num alerta simples); count é 1."""
+    seq, task_id, title, due, priority = event
+    sound, require_open = DISPATCH_PRIORITY_STYLE.get(priority, (False, False))
+    return {"seq": seq, "first_seq": seq, "task_id": task_id, "title": title, "due": due,
+            "priority": priority, "sound": sound, "open": require_open, "count": 1,
+            "titles": [title], "tenant": tenant}
+
+
+def digest_alerts(alerts):
+    """Junta alertas (ou resumos) de um mesmo tenant em um resumo com a maior prioridade entre eles."""
+    if len(alerts) == 1:
+        return alerts[0]
+    count = sum(a["count"] for a in alerts)
+    return {"seq": max(a["seq"] for a in alerts), "first_seq": min(a["first_seq"] for a in alerts),
+            "task_id": None, "title": f"{count} tarefas venceram", "due": None,
+            "priority": max((a["priority"] for a in alerts), key=_rank),
+            "sound": any(a["sound"] for a in alerts), "open": any(a["open"] for a in alerts), "count": count,
+            "titles": [t for a in alerts for t in a["titles"]][:DISPATCH_DIGEST_TITLES],
+            "tenant": alerts[0]["tenant"]}
+
+
+# ---------- canais ----------
+class Channel:
+    """Destino dos alertas, com fila limitada e `workers` threads próprias; send(alert) entrega um.
+
+    As opções omitidas (rate, burst, window, digest_after, workers, retries, maxsize) vêm de
+    DISPATCH_CHANNEL_OPTIONS[name] e, na falta delas, dos padrões DISPATCH_*. Uma exceção em
+    send conta como falha e a entrega é repetida."""
+    name = "channel"
+
+    def __init__(self, name=None, **options):
+        self.name = name or self.name
+        options = {**DISPATCH_CHANNEL_OPTIONS.get(self.name, {}), **options}
+        self.rate = options.get("rate")  # alertas por segundo (None = sem limite)
+        self.burst = options.get("burst", 1)
+        self.window = options.get("window", DISPATCH_WINDOW_SECONDS)
+        self.digest_after = options.get("digest_after", DISPATCH_DIGEST_AFTER)
+        self.workers = options.get("workers", 1)  # com mais de um, a ordem de entrega não é garantida
+        self.retries = options.get("retries", DISPATCH_RETRIES)
+        self.stop_event = threading.Event()
+        self._queue = queue.Queue(options.get("maxsize", DISPATCH_QUEUE_MAX))
+        self._lock = threading.Lock()
+        self._overflow = {}  # tenant -> resumo dos lotes que não couberam na fila
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._threads = []
+        self._drain_on_stop = True
+
+    def send(self, alert):
+        raise NotImplementedError
+
+    def put(self, alerts):
+        """Enfileira um lote sem bloquear; com a fila cheia, ele entra no resumo pendente do canal."""
+        try:
+            self._queue.put_nowait(alerts)
+        except queue.Full:
+            with self._lock:
+                for alert in alerts:
+                    pending = self._overflow.get(alert["tenant"])
+                    self._overflow[alert["tenant"]] = digest_alerts([pending, alert]) if pending else alert
+            metrics.inc("trabalho_dispatch_overflow_total", len(alerts), channel=self.name)
+        metrics.set("trabalho_dispatch_queue_depth", self._queue.qsize(), channel=self.name)
+
+    def start(self):
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"trabalho-dispatch-{self.name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, drain=True, timeout=None):
+        """Encerra as threads; com drain, o que já está na fila ainda é entregue (uma tentativa cada)."""
+        self._drain_on_stop = drain
+        self.stop_event.set()
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        pending = []
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            if self.stop_event.is_set() and not self._drain_on_stop:
+                continue
+            pending.extend(item)
+            # a rajada que chega logo depois do primeiro lote sai na mesma entrega
+            stopping = self._collect(pending, time.monotonic() + self.window)
+            while pending:
+                self._wait_token()
+                stopping = self._collect(pending, 0) or stopping  # o que chegou durante a espera
+                self._send(self._take(pending))
+
+    def _collect(self, pending, deadline):
+        """Junta a pending o que está na fila (esperando até deadline) e o resumo pendente; True se achou _STOP."""
+        stopping = False
+        while True:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0 and not self.stop_event.is_set():
+                    item = self._queue.get(timeout=timeout)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stopping = True
+                break
+            pending.extend(item)
+        with self._lock:
+            overflow, self._overflow = self._overflow, {}
+        pending.extend(overflow.values())
+        metrics.set("trabalho_dispatch_queue_depth", self._queue.qsize(), channel=self.name)
+        return stopping
+
+    def _wait_token(self):
+        # balde de fichas: reserva a ficha (o saldo pode ficar negativo) e espera fora do lock
+        if self.rate is None or self.stop_event.is_set():
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate) - 1
+            self._refilled = now
+            delay = -self._tokens / self.rate
+        if delay > 0:
+            self.stop_event.wait(delay)
+
+    def _take(self, pending):
+        """Tira de pending a próxima entrega: o primeiro alerta ou, numa rajada, o resumo do tenant dele."""
+        tenant = pending[0]["tenant"]
+        group = [a for a in pending if a["tenant"] == tenant]
+        if len(group) > 1 and self.digest_after is not None and sum(a["count"] for a in group) > self.digest_after:
+            pending[:] = [a for a in pending if a["tenant"] != tenant]
+            return digest_alerts(group)
+        return pending.pop(0)
+
+    def _send(self, alert):
+        for attempt in range(self.retries + 1):
+            start = time.perf_counter()
+            try:
+                self.send(alert)
+            except Exception as e:
+                metrics.inc("trabalho_dispatch_errors_total", channel=self.name)
+                if attempt == self.retries or self.stop_event.is_set():
+                    print(f"Erro no canal de alertas {self.name}:", e)
+                    metrics.inc("trabalho_dispatch_failed_total", alert["count"], channel=self.name)
+                    return False
+                self.stop_event.wait(min(DISPATCH_BACKOFF_SECONDS * 2 ** attempt, DISPATCH_BACKOFF_MAX_SECONDS))
+            else:
+                metrics.inc("trabalho_dispatch_sent_total", channel=self.name,
+                            kind="digest" if alert["count"] > 1 else "alert")
+                return True
+            finally:
+                metrics.observe("trabalho_dispatch_send_seconds", time.perf_counter() - start, channel=self.name)
+
+
+class CallbackChannel(Channel):
+    """Entrega chamando fn(alert): popup da GUI, feed do navegador no app web."""
+
+    def __init__(self, name, fn, **options):
+        super().__init__(name, **options)
+        self.fn = fn
+
+    def send(self, alert):
+        self.fn(alert)
+
+
+class LogChannel(Channel):
+    """Uma linha por alerta no arquivo path (None = saída de erro)."""
+    name = "log"
+
+    def __init__(self, path=None, name=None, **options):
+        super().__init__(name, **options)
+        self.path = path
+
+    def send(self, alert):
+        line = f"{datetime.now():%Y-%m-%d %H:%M:%S} [{alert['priority']}] {alert['title']}"
+        if alert["count"] > 1:
+            line += ": " + ", ".join(alert["titles"]) + (", ..." if alert["count"] > len(alert["titles"]) else "")
+        elif alert["due"]:
+            line += f" (vencimento {alert['due']})"
+        if alert["tenant"]:
+            line = f"{alert['tenant']}: {line}"
+        if self.path is None:
+            print(line, file=sys.stderr)
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class WebhookChannel(Channel):
+    """POST do alerta em JSON para uma URL (um serviço local que repassa por e-mail, chat etc.).
+
+    Respostas de erro (4xx/5xx) e timeouts contam como falha e são repetidos."""
+    name = "webhook"
+
+    def __init__(self, url, name=None, timeout=None, **options):
+        super().__init__(name, **options)
+        self.url = url
+        self.timeout = DISPATCH_WEBHOOK_TIMEOUT_SECONDS if timeout is None else timeout
+
+    def send(self, alert):
+        import urllib.request  # só aqui: custa ~20ms na importação do pacote, e só o webhook precisa
+        request = urllib.request.Request(self.url, data=json.dumps(alert, ensure_ascii=False).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def standard_channels():
+    """Canais ligados pela configuração: log (DISPATCH_LOG_FILE) e webhook (DISPATCH_WEBHOOK_URL)."""
+    channels = []
+    if DISPATCH_LOG_FILE:
+        channels.append(LogChannel(None if DISPATCH_LOG_FILE == "-" else DISPATCH_LOG_FILE))
+    if DISPATCH_WEBHOOK_URL:
+        channels.append(WebhookChannel(DISPATCH_WEBHOOK_URL))
+    return channels
+
+
+# ---------- despacho ----------
+class Dispatcher:
+    """Liga o agendador aos canais. submit é o on_due do NotificationScheduler; com TenantScheduler,
+    on_due(tenant, events) chama submit(events, tenant).
+
+    routes (prioridade -> nomes de canais) substitui DISPATCH_ROUTES para este despacho."""
+
+    def __init__(self, channels=(), routes=None):
+        self.routes = routes
+        self.channels = {}
+        self._started = False
+        for channel in channels:
+            self.add_channel(channel)
+
+    def add_channel(self, channel):
+        self.channels[channel.name] = channel
+        if self._started:
+            channel.start()
+        return channel
+
+    def start(self):
+        self._started = True
+        for channel in self.channels.values():
+            channel.start()
+        return self
+
+    def stop(self, drain=True, timeout=None):
+        self._started = False
+        for channel in self.channels.values():
+            channel.stop(drain, timeout)
+
+    def submit(self, events, tenant=None):
+        """Distribui os eventos às filas dos canais da rota de cada prioridade; nunca bloqueia."""
+        routes = DISPATCH_ROUTES if self.routes is None else self.routes
+        batches = {}
+        for event in events:
+            alert = make_alert(event, tenant)
+            for name in routes.get(alert["priority"], ()):
+                if name in self.channels:
+                    batches.setdefault(name, []).append(alert)
+        for name, alerts in batches.items():
+            self.channels[name].put(alerts)
+        metrics.inc("trabalho_dispatch_alerts_total", len(events))
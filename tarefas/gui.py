@@ -0,0 +1,481 @@
+"""Interface Tkinter: um cliente fino sobre o núcleo (é o único módulo que importa tkinter).
+
+Carregado só quando a GUI é aberta (python trabalho.py sem argumentos).
+"""
+
+import contextvars
+import queue
+import threading
+import tkinter as tk
+from tkinter import messagebox, simpledialog, ttk
+
+from . import models
+from .db import current_db, init_db
+from .dispatch import CallbackChannel, Dispatcher, standard_channels
+from .models import (add_category, add_task, delete_category, delete_tasks, get_categories,
+                     get_task, get_task_changes, get_tasks, move_tasks, reset_notifications, search_tasks,
+                     set_priority, task_revision, update_category, update_task)
+from .scheduler import NotificationScheduler
+from .tenants import use_tenant
+from .utils import iso_or_none, parse_datetime_input
+
+TREE_PAGE_ROWS = 500  # linhas inseridas no Treeview de cada vez (o resto entra ao rolar até o fim)
+SYNC_INTERVAL_MS = 5000  # busca periódica de mudanças (só o que mudou desde a última leitura)
+
+
+class NotifierThread(NotificationScheduler):
+    """Notificador do app Tkinter: os vencimentos vão para o despacho (popups e os canais configurados)."""
+
+    def __init__(self, app):
+        # a thread só detecta; os popups saem da thread do canal, com limite de taxa e resumo das rajadas
+        self.dispatcher = Dispatcher([CallbackChannel("popup", app.post_notification), *standard_channels()])
+        # o banco da sessão (o do tenant, se houver): a thread não herda o contexto da janela
+        super().__init__(self.dispatcher.submit, database=current_db())
+
+    def run(self):
+        self.dispatcher.start()
+        try:
+            super().run()
+        finally:
+            self.dispatcher.stop(drain=False)
+
+
+class TaskManagerApp:
+    def __init__(self, root):
+        self.root = root
+        self.task_rows = []         # resultado completo da última consulta
+        self.shown_values = {}      # iid -> valores exibidos no Treeview (na ordem da tela)
+        self.visible_limit = TREE_PAGE_ROWS
+        self.refresh_gen = 0        # descarta resultados de consultas que ficaram velhas
+        self.sync_rev = None        # revisão de task_rows; None = próxima atualização lê a lista inteira
+        self.sync_category = None   # categoria filtrada quando task_rows foi lida
+        root.title("Task Manager - Protótipo")
+        root.geometry("900x600")
+        self.setup_ui()
+        # uma thread só faz as consultas da lista (e reaproveita a conexão); copy_context: ela
+        # trabalha no banco da sessão, já que use_tenant vale só para a thread da janela
+        self.loads = queue.Queue()
+        threading.Thread(target=contextvars.copy_context().run, args=(self.load_worker,), daemon=True,
+                         name="trabalho-gui-loader").start()
+        self.scheduler = NotifierThread(self)
+        self.scheduler.start()
+        self.refresh_categories()
+        self.root.after(SYNC_INTERVAL_MS, self.sync_tick)
+
+    def load_worker(self):
+        while True:
+            load = self.loads.get()
+            # pedidos acumulados: só o mais novo importa (os outros seriam descartados por refresh_gen)
+            try:
+                while True:
+                    load = self.loads.get_nowait()
+            except queue.Empty:
+                pass
+            load()
+
+    def sync_tick(self):
+        # com a lista sincronizada, cada volta custa uma consulta ao log de mudanças
+        if not self.search_var.get().strip():
+            self.refresh_tasks()
+        self.root.after(SYNC_INTERVAL_MS, self.sync_tick)
+
+    def setup_ui(self):
+        main = ttk.Frame(self.root, padding=8)
+        main.pack(fill=tk.BOTH, expand=True)
+
+        # Left: categories
+        left = ttk.Frame(main, width=250)
+        left.pack(side=tk.LEFT, fill=tk.Y, padx=(0,8))
+
+        ttk.Label(left, text="Categorias").pack(anchor=tk.W)
+        self.cat_list = tk.Listbox(left, height=20)
+        self.cat_list.pack(fill=tk.Y, expand=False)
+        self.cat_list.bind("<<ListboxSelect>>", lambda e: self.on_category_select())
+
+        cat_btn_frame = ttk.Frame(left)
+        cat_btn_frame.pack(fill=tk.X, pady=6)
+        ttk.Button(cat_btn_frame, text="Nova", command=self.on_new_category).pack(side=tk.LEFT, padx=2)
+        ttk.Button(cat_btn_frame, text="Editar", command=self.on_edit_category).pack(side=tk.LEFT, padx=2)
+        ttk.Button(cat_btn_frame, text="Excluir", command=self.on_delete_category).pack(side=tk.LEFT, padx=2)
+        ttk.Button(cat_btn_frame, text="Mostrar Todas", command=self.on_show_all).pack(side=tk.LEFT, padx=2)
+
+        # Right: tasks
+        right = ttk.Frame(main)
+        right.pack(fill=tk.BOTH, expand=True)
+
+        top_controls = ttk.Frame(right)
+        top_controls.pack(fill=tk.X)
+        ttk.Button(top_controls, text="Nova Tarefa", command=self.on_new_task).pack(side=tk.LEFT, padx=4)
+        ttk.Button(top_controls, text="Editar Tarefa", command=self.on_edit_task).pack(side=tk.LEFT, padx=4)
+        ttk.Button(top_controls, text="Excluir Tarefa", command=self.on_delete_task).pack(side=tk.LEFT, padx=4)
+        ttk.Button(top_controls, text="Mover Tarefa", command=self.on_move_task).pack(side=tk.LEFT, padx=4)
+        ttk.Button(top_controls, text="Prioridade", command=self.on_set_priority).pack(side=tk.LEFT, padx=4)
+        ttk.Button(top_controls, text="Notificar de Novo", command=self.on_reset_notifications).pack(side=tk.LEFT, padx=4)
+        ttk.Button(top_controls, text="Atualizar", command=self.refresh_tasks).pack(side=tk.LEFT, padx=4)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(top_controls, textvariable=self.search_var, width=24)
+        search_entry.pack(side=tk.LEFT, padx=(16, 4))
+        search_entry.bind("<Return>", lambda e: self.on_search())
+        ttk.Button(top_controls, text="Buscar", command=self.on_search).pack(side=tk.LEFT, padx=4)
+
+        # task tree
+        cols = ("Título", "Descrição", "Vencimento", "Prioridade", "Categoria", "Notify")
+        tree_frame = ttk.Frame(right)
+        tree_frame.pack(fill=tk.BOTH, expand=True, pady=(8,0))
+        self.tree = ttk.Treeview(tree_frame, columns=cols, show="headings", selectmode="extended")  # Ctrl/Shift: ações em lote
+        for c in cols:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=140)
+        self.tree_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_tree_scroll)
+        self.tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+    def refresh_categories(self):
+        cats = get_categories()
+        self.cat_list.delete(0, tk.END)
+        self.cat_map = {i: cat for i, cat in enumerate(cats)}
+        for i, cat in enumerate(cats):
+            self.cat_list.insert(tk.END, f"{cat[1]}")  # title
+
+        self.refresh_tasks()
+
+    def get_selected_category(self):
+        sel = self.cat_list.curselection()
+        if not sel:
+            return None
+        idx = sel[0]
+        return self.cat_map.get(idx)
+
+    def on_category_select(self):
+        self.visible_limit = TREE_PAGE_ROWS
+        self.refresh_tasks()
+
+    def on_show_all(self):
+        self.cat_list.selection_clear(0, tk.END)
+        self.search_var.set("")
+        self.visible_limit = TREE_PAGE_ROWS
+        self.refresh_tasks()
+
+    def on_new_category(self):
+        title = simpledialog.askstring("Nova Categoria", "Título da categoria:")
+        if not title:
+            return
+        desc = simpledialog.askstring("Nova Categoria", "Descrição (opcional):") or ""
+        ok = add_category(title.strip(), desc)
+        if not ok:
+            messagebox.showerror("Erro", "Categoria já existe.")
+        self.refresh_categories()
+
+    def on_edit_category(self):
+        cat = self.get_selected_category()
+        if not cat:
+            messagebox.showinfo("Info", "Selecione uma categoria.")
+            return
+        cat_id, title, description = cat
+        new_title = simpledialog.askstring("Editar Categoria", "Título:", initialvalue=title)
+        if not new_title:
+            return
+        new_desc = simpledialog.askstring("Editar Categoria", "Descrição:", initialvalue=description) or ""
+        update_category(cat_id, new_title.strip(), new_desc)
+        self.refresh_categories()
+
+    def on_delete_category(self):
+        cat = self.get_selected_category()
+        if not cat:
+            messagebox.showinfo("Info", "Selecione uma categoria.")
+            return
+        cat_id, title, _ = cat
+        if messagebox.askyesno("Confirmar", f"Excluir categoria '{title}'? As tarefas serão desvinculadas."):
+            delete_category(cat_id)
+            self.refresh_categories()
+
+    def on_search(self):
+        self.visible_limit = TREE_PAGE_ROWS
+        self.refresh_tasks()
+
+    def refresh_tasks(self):
+        sel = self.get_selected_category()
+        cat_id = sel[0] if sel else None
+        query = self.search_var.get().strip()
+        self.refresh_gen += 1
+        gen = self.refresh_gen
+        # mesma lista de antes: basta aplicar as mudanças desde sync_rev
+        since = self.sync_rev if not query and cat_id == self.sync_category else None
+
+        def load():
+            # a consulta roda fora da thread do Tk; o resultado volta pela fila de eventos
+            try:
+                if query:
+                    # resultados por relevância; as colunas de destaque ficam de fora do Treeview
+                    rows = [r[:10] for r in search_tasks(query, limit=None, category_id=cat_id)]
+                    result = lambda: self.apply_task_rows(gen, rows)
+                elif since is None:
+                    rev = task_revision()  # lida antes da lista: mudanças no meio são aplicadas de novo, sem efeito
+                    rows = get_tasks(cat_id)
+                    result = lambda: self.apply_task_rows(gen, rows, rev, cat_id)
+                else:
+                    changes = [get_task_changes(since)]
+                    while changes[-1]["more"]:
+                        changes.append(get_task_changes(changes[-1]["rev"]))
+                    result = lambda: self.apply_task_changes(gen, changes)
+            except Exception as e:
+                print("Erro ao carregar tarefas:", e)
+                return
+            self.root.after(0, result)
+        self.loads.put(load)
+
+    def apply_task_rows(self, gen, rows, rev=None, cat_id=None):
+        if gen != self.refresh_gen:
+            return  # já existe uma consulta mais nova a caminho
+        self.task_rows = rows
+        self.sync_rev, self.sync_category = rev, cat_id
+        self.show_task_rows()
+
+    def apply_task_changes(self, gen, changes):
+        if gen != self.refresh_gen:
+            return
+        if any(c["reset"] for c in changes):
+            self.sync_rev = None  # o log não cobre mais a nossa revisão: relê tudo
+            self.refresh_tasks()
+            return
+        if any(r[11] for c in changes for r in c["changed"]):
+            # as ocorrências de uma série são expandidas na consulta: relê a lista
+            self.sync_rev = None
+            self.refresh_tasks()
+            return
+        self.sync_rev = changes[-1]["rev"]
+        if not any(c["changed"] or c["deleted"] for c in changes):
+            return
+        # uma tarefa recorrente ocupa várias linhas com o mesmo id: as das tarefas tocadas saem todas
+        rows = {}
+        for c in changes:
+            for task_id in c["deleted"]:
+                rows[task_id] = None
+            for r in c["changed"]:
+                # r tem category_id no fim; o Treeview usa só as colunas de get_tasks
+                in_list = self.sync_category is None or r[10] == self.sync_category
+                rows[r[0]] = r[:10] if in_list else None
+        kept = [r for r in self.task_rows if r[0] not in rows]
+        # mesma ordem de get_tasks: com data por (due_ts, id), depois as sem data por id
+        self.task_rows = sorted(kept + [r for r in rows.values() if r is not None],
+                                key=lambda r: (r[8] is None, r[8] or 0, r[0]))
+        self.show_task_rows()
+
+    @staticmethod
+    def task_values(r):
+        task_id, title, desc, due, priority, cat_title, notify, notified, due_ts, due_show = r
+        cat_title = cat_title or "Sem categoria"
+        notify_text = "Sim" if notify else "Não"
+        return (title, (desc[:40] + '...') if desc and len(desc) > 40 else (desc or ""),
+                due_show, priority, cat_title, notify_text)
+
+    def show_task_rows(self):
+        # atualização incremental: só apaga, insere, altera ou reordena o que mudou,
+        # assim a seleção e a posição de rolagem continuam onde estavam
+        new_values = {}
+        for r in self.task_rows[:self.visible_limit]:
+            # as ocorrências de uma série repetem o id: as seguintes levam o vencimento no iid
+            iid = str(r[0]) if str(r[0]) not in new_values else f"{r[0]}@{r[8]}"
+            new_values[iid] = self.task_values(r)
+        order = list(new_values)
+        removed = [iid for iid in self.shown_values if iid not in new_values]
+        if removed:
+            self.tree.delete(*removed)
+        for iid, values in new_values.items():
+            old = self.shown_values.get(iid)
+            if old is None:
+                self.tree.insert("", tk.END, iid=iid, values=values)
+            elif old != values:
+                self.tree.item(iid, values=values)
+        self.shown_values = new_values
+        if list(self.tree.get_children()) != order:
+            self.tree.set_children("", *order)
+
+    def on_tree_scroll(self, first, last):
+        self.tree_scroll.set(first, last)
+        # listas grandes são povoadas aos poucos: perto do fim, insere o próximo bloco
+        if float(last) >= 0.95 and len(self.task_rows) > self.visible_limit:
+            self.visible_limit += TREE_PAGE_ROWS
+            self.root.after_idle(self.show_task_rows)
+
+    def ask_task_details(self, existing=None):
+        # existing: tuple (id,title,desc,due,priority,cat_title,notify,notified)
+        title = simpledialog.askstring("Tarefa", "Título:", initialvalue=(existing[1] if existing else ""))
+        if not title:
+            return None
+        desc = simpledialog.askstring("Tarefa", "Descrição (opcional):", initialvalue=(existing[2] if existing else "")) or ""
+        due_hint = "YYYY-MM-DD HH:MM (ex: 2025-10-09 14:30) ou vazio"
+        due_in = simpledialog.askstring("Tarefa", f"Data e hora de vencimento ({due_hint}):", initialvalue=(existing[3] if existing and existing[3] else ""))
+        due_dt = parse_datetime_input(due_in or "")
+        if due_in and due_dt is None:
+            messagebox.showerror("Erro", "Formato de data/hora inválido. Use 'YYYY-MM-DD HH:MM' ou deixe vazio.")
+            return None
+        # priority selection
+        pr = simpledialog.askstring("Prioridade", f"Prioridade ({'/'.join(models.PRIORITIES)}):", initialvalue=(existing[4] if existing else "Baixa"))
+        if pr not in models.PRIORITIES:
+            messagebox.showinfo("Info", f"Prioridade inválida. Definida como 'Baixa'.")
+            pr = "Baixa"
+        # category selection
+        cats = get_categories()
+        cat_map = {str(i+1): cat for i, cat in enumerate(cats)}
+        cat_prompt = "Escolha categoria (digite número) ou deixe vazio:\n"
+        for k, cat in cat_map.items():
+            cat_prompt += f"{k}) {cat[1]}\n"
+        chosen = simpledialog.askstring("Categoria", cat_prompt, initialvalue="")
+        cat_id = None
+        if chosen and chosen.strip() in cat_map:
+            cat_id = cat_map[chosen.strip()][0]
+        notify_choice = simpledialog.askstring("Notificações", "Ativar notificações? (Sim/Não):", initialvalue=("Sim" if (existing and existing[6]) else "Sim"))
+        notify = (notify_choice is None) or notify_choice.lower().startswith("s")
+        return {
+            "title": title.strip(),
+            "desc": desc.strip(),
+            "due": iso_or_none(due_dt),
+            "priority": pr,
+            "category_id": cat_id,
+            "notify": notify
+        }
+
+    def on_new_task(self):
+        details = self.ask_task_details(None)
+        if not details:
+            return
+        add_task(details["title"], details["desc"], details["due"], details["priority"], details["category_id"], details["notify"])
+        self.refresh_tasks()
+
+    def get_selected_task_id(self):
+        sel = self.tree.selection()
+        if not sel:
+            return None
+        return int(sel[0].split("@")[0])
+
+    def get_selected_task_ids(self):
+        # sem repetir a tarefa quando várias ocorrências dela estão selecionadas
+        return list(dict.fromkeys(int(iid.split("@")[0]) for iid in self.tree.selection()))
+
+    def on_edit_task(self):
+        tid = self.get_selected_task_id()
+        if not tid:
+            messagebox.showinfo("Info", "Selecione uma tarefa.")
+            return
+        existing = get_task(tid)
+        if not existing:
+            messagebox.showerror("Erro", "Tarefa não encontrada.")
+            return
+        details = self.ask_task_details(existing)
+        if not details:
+            return
+        # find category id if chosen by name
+        update_task(tid, details["title"], details["desc"], details["due"], details["priority"], details["category_id"], details["notify"])
+        self.refresh_tasks()
+
+    def on_delete_task(self):
+        tids = self.get_selected_task_ids()
+        if not tids:
+            messagebox.showinfo("Info", "Selecione uma tarefa.")
+            return
+        question = "Excluir tarefa?" if len(tids) == 1 else f"Excluir {len(tids)} tarefas?"
+        if messagebox.askyesno("Confirmar", question):
+            delete_tasks(tids)
+            self.refresh_tasks()
+
+    def on_move_task(self):
+        tids = self.get_selected_task_ids()
+        if not tids:
+            messagebox.showinfo("Info", "Selecione uma tarefa.")
+            return
+        cats = get_categories()
+        options = {str(i+1): cat for i, cat in enumerate(cats)}
+        prompt = "Escolha a categoria destino (número) ou vazio para 'Sem categoria':\n"
+        for k, cat in options.items():
+            prompt += f"{k}) {cat[1]}\n"
+        chosen = simpledialog.askstring("Mover", prompt, initialvalue="")
+        if chosen is None:
+            return
+        cat_id = None
+        if chosen.strip() in options:
+            cat_id = options[chosen.strip()][0]
+        # um UPDATE só para todas as selecionadas
+        move_tasks(tids, cat_id)
+        self.refresh_tasks()
+
+    def on_set_priority(self):
+        tids = self.get_selected_task_ids()
+        if not tids:
+            messagebox.showinfo("Info", "Selecione uma tarefa.")
+            return
+        pr = simpledialog.askstring("Prioridade", f"Nova prioridade ({', '.join(models.PRIORITIES)}):", initialvalue="Baixa")
+        if pr is None:
+            return
+        if pr not in models.PRIORITIES:
+            messagebox.showerror("Erro", "Prioridade inválida.")
+            return
+        set_priority(tids, pr)
+        self.refresh_tasks()
+
+    def on_reset_notifications(self):
+        tids = self.get_selected_task_ids()
+        if not tids:
+            messagebox.showinfo("Info", "Selecione uma tarefa.")
+            return
+        reset_notifications(tids)
+        self.refresh_tasks()
+
+    def post_notification(self, alert):
+        # chamado pela thread do canal: o popup é montado na thread do Tk
+        self.root.after(0, self.show_notification_popup, alert)
+
+    def show_notification_popup(self, alert):
+        # as regras por prioridade vêm no alerta (tarefas.dispatch.DISPATCH_PRIORITY_STYLE):
+        # sound -> bell; open -> botão "Abrir no app". Um resumo lista os primeiros títulos.
+        if alert["sound"]:
+            try:
+                self.root.bell()
+            except Exception:
+                pass
+        task_id = alert["task_id"]
+
+        def on_open():
+            # traz a janela para frente e seleciona a tarefa (num resumo, só a janela)
+            self.root.lift()
+            self.root.attributes('-topmost', True)
+            self.root.after(1000, lambda: self.root.attributes('-topmost', False))
+            if task_id is not None and str(task_id) in self.tree.get_children():
+                self.tree.selection_set(str(task_id))
+                self.tree.see(str(task_id))
+            popup.destroy()
+
+        popup = tk.Toplevel(self.root)
+        popup.title("Alerta de Tarefa")
+        if alert["count"] > 1:
+            ttk.Label(popup, text=alert["title"]).pack(padx=12, pady=6)
+            titles = "\n".join(alert["titles"]) + ("\n..." if alert["count"] > len(alert["titles"]) else "")
+            ttk.Label(popup, text=titles).pack(padx=12, pady=6)
+        else:
+            ttk.Label(popup, text=f"Tarefa: {alert['title']}").pack(padx=12, pady=6)
+        ttk.Label(popup, text=f"Prioridade: {alert['priority']}").pack(padx=12, pady=6)
+        btn_frame = ttk.Frame(popup)
+        btn_frame.pack(pady=8)
+        ttk.Button(btn_frame, text="Fechar", command=popup.destroy).pack(side=tk.LEFT, padx=4)
+        if alert["open"]:
+            ttk.Button(btn_frame, text="Abrir no app", command=on_open).pack(side=tk.LEFT, padx=4)
+        # popup se mantém por 10s
+        popup.after(10000, popup.destroy)
+
+    def on_close(self):
+        if messagebox.askokcancel("Sair", "Deseja sair?"):
+            self.scheduler.stop()
+            self.root.destroy()
+
+
+def run(tenant=None):
+    """Abre a janela principal; retorna quando ela é fechada. Com tenant, a sessão usa o banco dele."""
+    if tenant:
+        with use_tenant(tenant):
+            return run()
+    init_db()
+    root = tk.Tk()
+    app = TaskManagerApp(root)
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
+    root.mainloop()
@@ -0,0 +1,158 @@
+"""Métricas em memória (formato texto do Prometheus) e profiler por amostragem.
+
+Não depende de nada do projeto: db, scheduler e o app web registram suas séries aqui.
+"""
+
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILER_INTERVAL_SECONDS = 0.01  # intervalo entre amostras do profiler de pilhas
+
+# segundos; mesmos buckets para comandos SQL, rotas e ciclos do agendador
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Metrics:
+    """Contadores, gauges e histogramas em memória, exportados no formato texto do Prometheus.
+
+    Cada série é identificada pelo nome e pelos rótulos (keyword arguments):
+        metrics.inc("trabalho_db_rows_returned_total", 10, query="SELECT ...")
+        metrics.observe("trabalho_http_request_seconds", 0.012, route="/", method="GET", status="200")
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}    # nome -> (tipo, ajuda)
+        self._series = {}  # nome -> {rótulos: valor | [contagem por bucket..., soma]}
+
+    def describe(self, name, kind, help_text):
+        self._meta[name] = (kind, help_text)
+        self._series.setdefault(name, {})
+
+    def inc(self, name, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._series.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        slot = bisect.bisect_left(LATENCY_BUCKETS, value)
+        with self._lock:
+            series = self._series.setdefault(name, {})
+            counts = series.get(key)
+            if counts is None:
+                counts = series[key] = [0] * (len(LATENCY_BUCKETS) + 2)  # buckets, +Inf, soma
+            counts[slot] += 1
+            counts[-1] += value
+
+    def value(self, name, **labels):
+        with self._lock:
+            return self._series.get(name, {}).get(tuple(sorted(labels.items())))
+
+    def render(self):
+        """Texto no formato de exposição do Prometheus (text/plain; version=0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._series.items()):
+                kind, help_text = self._meta.get(name, ("untyped", ""))
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in sorted(series.items()):
+                    if kind != "histogram":
+                        lines.append(f"{name}{_labels(key)} {value}")
+                        continue
+                    total = 0
+                    for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), value):
+                        total += count
+                        lines.append(f"{name}_bucket{_labels(key + (('le', bound),))} {total}")
+                    lines.append(f"{name}_sum{_labels(key)} {value[-1]:.6f}")
+                    lines.append(f"{name}_count{_labels(key)} {total}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            for series in self._series.values():
+                series.clear()
+
+
+def _labels(key):
+    if not key:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in key)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(key, escaped)) + "}"
+
+
+metrics = Metrics()
+
+
+class SamplingProfiler(threading.Thread):
+    """Profiler por amostragem dentro do processo: a cada intervalo guarda a pilha de todas as threads.
+
+    collapsed() devolve o formato "func;func;func contagem" aceito por flamegraph.pl e speedscope.
+    """
+    daemon = True
+
+    def __init__(self, interval=PROFILER_INTERVAL_SECONDS):
+        super().__init__()
+        self.interval = interval
+        self.samples = Counter()
+        self.stop_event = threading.Event()
+        self.started_at = time.time()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def start_profiler(interval=PROFILER_INTERVAL_SECONDS):
+    """Liga o profiler de amostragem (não faz nada se já estiver ligado)."""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = SamplingProfiler(interval)
+            _profiler.start()
+        return _profiler
+
+
+def stop_profiler():
+    """Desliga o profiler e devolve as pilhas coletadas (formato collapsed), ou None se estava desligado."""
+    global _profiler
+    with _profiler_lock:
+        profiler, _profiler = _profiler, None
+    if profiler is None:
+        return None
+    profiler.stop_event.set()
+    profiler.join()
+    return profiler.collapsed()
+
+
+def profiler_snapshot():
+    """Pilhas coletadas até agora sem desligar o profiler (None se desligado)."""
+    profiler = _profiler
+    return profiler.collapsed() if profiler is not None else None
@@ -0,0 +1,768 @@
+"""Categorias e tarefas: leitura, escrita, paginação, busca e estatísticas."""
+
+import base64
+import json
+import sqlite3
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+from itertools import islice
+
+from .querycache import cache
+from .db import current_db, db_execute, transaction
+from . import recurrence
+from .recurrence import from_ts, normalize_rule, series_occurrences
+from .utils import iso_or_none, to_ts
+
+TASKS_PAGE_SIZE = 50  # tarefas por página na listagem web
+TASKS_STREAM_BATCH = 500  # linhas lidas por consulta em iter_tasks
+# marcadores dos trechos encontrados na busca (highlight/snippet); cada interface decide como exibir
+HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE = "\x02", "\x03"
+CHANGES_PAGE_SIZE = 1000  # mudanças por chamada de get_task_changes
+TOMBSTONE_RETENTION_REVS = 100_000  # exclusões ficam no log por esse número de revisões
+BULK_CHUNK_SIZE = 500  # ids por "IN (...)" nas operações em lote (abaixo do limite de variáveis do SQLite)
+
+PRIORITIES = ["Baixa", "Média", "Alta"]
+
+
+def add_category(title, description=""):
+    try:
+        db_execute("INSERT INTO categories(title,description) VALUES(?,?)", (title, description))
+        return True
+    except sqlite3.IntegrityError:
+        return False
+    finally:
+        cache.invalidate_tables("categories")
+
+
+def get_categories():
+    return cache.get("categories", None, lambda: db_execute(
+        "SELECT id, title, description FROM categories ORDER BY title", fetch=True))
+
+
+def update_category(cat_id, title, description):
+    db_execute("UPDATE categories SET title=?, description=? WHERE id=?", (title, description, cat_id))
+    cache.invalidate_tables("categories")
+
+
+def delete_category(cat_id):
+    # move tasks to NULL category or delete? We'll set category_id = NULL (user decision)
+    with transaction():
+        db_execute("UPDATE tasks SET category_id = NULL WHERE category_id = ?", (cat_id,))
+        db_execute("UPDATE archived_tasks SET category_id = NULL WHERE category_id = ?", (cat_id,))
+        db_execute("DELETE FROM categories WHERE id = ?", (cat_id,))
+    cache.invalidate_tables("tasks", "categories")
+
+
+def add_task(title, description, due_iso, priority, category_id, notify=True):
+    task_id = db_execute(
+        "INSERT INTO tasks(title,description,due,priority,category_id,notify,notified) VALUES(?,?,?,?,?,?,0)",
+        (title, description, due_iso, priority, category_id, 1 if notify else 0)
+    )
+    cache.invalidate("dashboard")
+    _schedule_changed(task_id, due_iso if notify else None)
+    return task_id
+
+
+# formatação do vencimento para exibição, feita uma vez só, no SQL
+DUE_SHOW_SQL = "COALESCE(strftime('%Y-%m-%d %H:%M', t.due_ts, 'unixepoch'), t.due, 'Sem data')"
+# id,title,description,due,priority,cat_title,notify,notified,due_ts,due_show
+TASK_COLUMNS = f"t.id,t.title,t.description,t.due,t.priority,c.title, t.notify, t.notified, t.due_ts, {DUE_SHOW_SQL}"
+# linha de get_tasks com nomes, para quem percorre listas grandes (iter_tasks); continua sendo uma tupla
+TaskRow = namedtuple("TaskRow", "id title description due priority category notify notified due_ts due_show")
+# tarefas ativas + arquivadas (include_archived=True); o SQLite empurra o WHERE para cada lado do UNION
+_ARCHIVE_COLUMNS = "id, title, description, due, priority, category_id, notify, notified, due_ts"
+ALL_TASKS_SQL = f"(SELECT {_ARCHIVE_COLUMNS} FROM tasks UNION ALL SELECT {_ARCHIVE_COLUMNS} FROM archived_tasks)"
+
+
+def get_tasks(category_id=None, priority=None, notify=None, due_from=None, due_to=None,
+              limit=None, after=None, before=None, include_archived=False, expand_recurring=True):
+    """Lista tarefas na ordem (due_ts IS NULL, due_ts, id), com filtros opcionais.
+
+    due_from/due_to aceitam datetime ou texto ISO. after/before são chaves (due_ts, id) da
+    paginação por chave (keyset): devolve até `limit` tarefas depois de `after` ou antes de
+    `before`. A ordem é percorrida em dois trechos, primeiro as tarefas com data e depois as
+    sem data, para que cada trecho use um índice (idx_tasks_due_ts / idx_tasks_category_due_ts)
+    em vez de ordenar a tabela inteira.
+
+    Tarefas arquivadas (tarefas.archive) só entram com include_archived=True. Tarefas
+    recorrentes aparecem como suas ocorrências entre due_from e due_to (sem eles, a janela
+    padrão de tarefas.recurrence), com o id do mestre; expand_recurring=False lista os mestres.
+    """
+    where, params = [], []
+    if category_id is not None:
+        where.append("t.category_id = ?")
+        params.append(category_id)
+    if priority is not None:
+        where.append("t.priority = ?")
+        params.append(priority)
+    if notify is not None:
+        where.append("t.notify = ?")
+        params.append(1 if notify else 0)
+    series_where, series_params = list(where), list(params)  # filtros que valem para as séries
+    if expand_recurring:
+        where.append("t.id NOT IN (SELECT task_id FROM task_recurrence)")
+    if due_from is not None:
+        where.append("t.due_ts >= ?")
+        params.append(to_ts(due_from))
+    if due_to is not None:
+        where.append("t.due_ts <= ?")
+        params.append(to_ts(due_to))
+
+    backward = before is not None
+    key = before if backward else after
+    op, order = ("<", "DESC") if backward else (">", "")
+    # trecho 1: tarefas com data; trecho 2: sem data (não entram quando há filtro de data)
+    dated = ["t.due_ts IS NOT NULL"]
+    undated = None if (due_from is not None or due_to is not None) else ["t.due_ts IS NULL"]
+    dated_params, undated_params = [], []
+    if key is not None:
+        key_due, key_id = key
+        if key_due is None:
+            # a chave está no trecho sem data
+            undated_params.append(key_id)
+            if undated is not None:
+                undated.append(f"t.id {op} ?")
+            if not backward:
+                dated = None
+        else:
+            dated.append(f"(t.due_ts, t.id) {op} (?, ?)")
+            dated_params.extend([key_due, key_id])
+            if backward:
+                undated = None
+    segments = [
+        (dated, dated_params, f"t.due_ts {order}, t.id {order}", True),
+        (undated, undated_params, f"t.id {order}", False),
+    ]
+    if backward:
+        segments.reverse()
+
+    source = ALL_TASKS_SQL if include_archived else "tasks"
+    rows = []
+    for conds, seg_params, order_by, is_dated in segments:
+        if conds is None:
+            continue
+        remaining = None if limit is None else limit - len(rows)
+        if remaining is not None and remaining <= 0:
+            break
+        sql = f"""SELECT {TASK_COLUMNS}
+                  FROM {source} t LEFT JOIN categories c ON t.category_id = c.id
+                  WHERE {" AND ".join(where + conds)}
+                  ORDER BY {order_by}"""
+        if remaining is not None:
+            sql += f" LIMIT {int(remaining)}"
+        segment = db_execute(sql, params + seg_params, fetch=True)
+        if is_dated and expand_recurring:
+            occurrence_key = key if key is not None and key[0] is not None else None
+            segment += _occurrence_rows(series_where, series_params, due_from, due_to,
+                                        occurrence_key, backward, remaining)
+            segment.sort(key=lambda r: (r[8], r[0]), reverse=backward)
+            segment = segment[:remaining]
+        rows.extend(segment)
+    if backward:
+        rows.reverse()
+    return rows
+
+
+def iter_tasks(after=None, batch_size=None, **filters):
+    """Gerador com todas as tarefas de get_tasks(**filters), na mesma ordem, como TaskRow.
+
+    As linhas são lidas em lotes de TASKS_STREAM_BATCH pela chave (due_ts, id), como na
+    paginação: a memória fica em um lote, seja qual for o tamanho da lista, e nenhuma leitura
+    fica aberta entre um lote e outro. after é uma chave (due_ts, id) para começar depois dela."""
+    batch_size = batch_size or TASKS_STREAM_BATCH
+    key = after
+    while True:
+        rows = get_tasks(limit=batch_size, after=key, **filters)
+        for row in rows:
+            yield TaskRow._make(row)
+        if len(rows) < batch_size:
+            return
+        key = (rows[-1][8], rows[-1][0])
+
+
+def encode_cursor(row):
+    """Cursor opaco (texto seguro para URL) com a chave (due_ts, id) de uma linha de get_tasks."""
+    raw = json.dumps([row[8], row[0]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        due, task_id = json.loads(raw)
+        return (int(due) if due is not None else None, int(task_id))
+    except (ValueError, TypeError):
+        return None
+
+
+def get_tasks_page(after=None, before=None, limit=TASKS_PAGE_SIZE, **filters):
+    """Uma página de get_tasks. after/before são cursores de encode_cursor.
+
+    Retorna (rows, next_cursor, prev_cursor); um cursor None indica que não há mais páginas naquele sentido.
+    """
+    after_key, before_key = decode_cursor(after), decode_cursor(before)
+    if before_key is not None:
+        rows = get_tasks(limit=limit + 1, before=before_key, **filters)
+        has_prev, has_next = len(rows) > limit, True
+        rows = rows[-limit:] if has_prev else rows
+    else:
+        rows = get_tasks(limit=limit + 1, after=after_key, **filters)
+        has_prev, has_next = after_key is not None, len(rows) > limit
+        rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]) if rows and has_next else None
+    prev_cursor = encode_cursor(rows[0]) if rows and has_prev else None
+    return rows, next_cursor, prev_cursor
+
+
+def _fts_query(text):
+    """Texto digitado -> consulta FTS5: cada palavra vira um prefixo entre aspas e todas precisam aparecer.
+
+    Assim aspas, hífens e operadores digitados pelo usuário não viram erro de sintaxe."""
+    terms = [t.replace('"', '""') for t in text.split()]
+    return " ".join(f'"{t}"*' for t in terms if t)
+
+
+def search_tasks(query, limit=TASKS_PAGE_SIZE, offset=0, category_id=None):
+    """Busca textual em título e descrição, ordenada por relevância (bm25).
+
+    Cada linha tem as colunas de get_tasks seguidas do título destacado e de um trecho da
+    descrição, com os termos encontrados entre HIGHLIGHT_OPEN e HIGHLIGHT_CLOSE.
+    limit=None devolve todos os resultados."""
+    match = _fts_query(query or "")
+    if not match:
+        return []
+    where, params = ["tasks_fts MATCH ?"], [match]
+    if category_id is not None:
+        where.append("t.category_id = ?")
+        params.append(category_id)
+    sql = f"""SELECT {TASK_COLUMNS},
+                     highlight(tasks_fts, 0, '{HIGHLIGHT_OPEN}', '{HIGHLIGHT_CLOSE}'),
+                     snippet(tasks_fts, 1, '{HIGHLIGHT_OPEN}', '{HIGHLIGHT_CLOSE}', '…', 16)
+              FROM tasks_fts JOIN tasks t ON t.id = tasks_fts.rowid
+              LEFT JOIN categories c ON t.category_id = c.id
+              WHERE {" AND ".join(where)}
+              ORDER BY tasks_fts.rank"""
+    if limit is not None:
+        sql += " LIMIT ? OFFSET ?"
+        params.extend([int(limit), int(offset)])
+    return db_execute(sql, params, fetch=True)
+
+
+def get_task(task_id):
+    """Uma tarefa pelo id (colunas de get_tasks) ou None. Passa pelo cache."""
+    def load():
+        rows = db_execute(f"""SELECT {TASK_COLUMNS}
+                              FROM tasks t LEFT JOIN categories c ON t.category_id = c.id
+                              WHERE t.id=?""", (task_id,), fetch=True)
+        return rows[0] if rows else None
+    return cache.get("task", task_id, load)
+
+
+# última revisão atribuída; MAX(rev) não serve porque a linha mais nova pode ser uma tombstone já descartada
+CURRENT_REV_SQL = "SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'task_changes'), 0)"
+
+
+def get_task_changes(since=0, limit=CHANGES_PAGE_SIZE):
+    """Mudanças nas tarefas depois da revisão `since`, para clientes que mantêm a lista localmente.
+
+    Devolve {"rev", "changed", "deleted", "more", "reset"}: changed são linhas no formato de
+    get_tasks com category_id e um indicador de recorrência no fim (o log traz o mestre; as
+    ocorrências de uma série têm de ser relidas com get_tasks), deleted são ids excluídos. O
+    cliente guarda rev e chama de novo com ele (de imediato enquanto more for True). since=0 é a carga inicial: changed traz
+    todas as tarefas. reset=True significa o mesmo para um cliente que já tinha dados: since é
+    anterior às exclusões ainda registradas (ou veio de outro banco) e ele deve descartar o que tem.
+    """
+    floor, current = db_execute(f"""SELECT (SELECT value FROM sync_meta WHERE name = 'tombstone_floor'),
+                                           ({CURRENT_REV_SQL})""", fetch=True)[0]
+    reset = since < floor or since > current
+    if reset:
+        since = 0
+    rows = db_execute(f"""SELECT ch.rev, ch.task_id, ch.deleted, {TASK_COLUMNS}, t.category_id,
+                                 EXISTS (SELECT 1 FROM task_recurrence r WHERE r.task_id = ch.task_id)
+                          FROM task_changes ch
+                          LEFT JOIN tasks t ON t.id = ch.task_id
+                          LEFT JOIN categories c ON t.category_id = c.id
+                          WHERE ch.rev > ? {"AND ch.deleted = 0" if since == 0 else ""}
+                          ORDER BY ch.rev LIMIT ?""", (since, limit + 1), fetch=True)
+    more = len(rows) > limit
+    rows = rows[:limit]
+    changed = [r[3:] for r in rows if not r[2]]
+    deleted = [r[1] for r in rows if r[2]]
+    rev = rows[-1][0] if more else current
+    return {"rev": rev, "changed": changed, "deleted": deleted, "more": more, "reset": reset}
+
+
+def task_revision():
+    """Revisão atual do log de mudanças (o since a usar depois de ler a lista inteira)."""
+    return db_execute(CURRENT_REV_SQL, fetch=True)[0][0]
+
+
+def prune_task_tombstones(keep_revs=None):
+    """Descarta do log as exclusões mais velhas que keep_revs revisões (padrão TOMBSTONE_RETENTION_REVS)
+    e sobe tombstone_floor."""
+    keep_revs = TOMBSTONE_RETENTION_REVS if keep_revs is None else keep_revs
+    with transaction():
+        newest = db_execute(f"""SELECT MAX(rev) FROM task_changes WHERE deleted = 1
+                                AND rev <= ({CURRENT_REV_SQL}) - ?""", (keep_revs,), fetch=True)[0][0]
+        if newest is None:
+            return
+        db_execute("DELETE FROM task_changes WHERE deleted = 1 AND rev <= ?", (newest,))
+        db_execute("UPDATE sync_meta SET value = MAX(value, ?) WHERE name = 'tombstone_floor'", (newest,))
+
+
+def update_task(task_id, title, description, due_iso, priority, category_id, notify):
+    with transaction():
+        db_execute("""UPDATE tasks SET title=?,description=?,due=?,priority=?,category_id=?,notify=?,notified=0
+                      WHERE id=?""", (title, description, due_iso, priority, category_id, 1 if notify else 0, task_id))
+        if due_iso is None:
+            # sem vencimento não há primeira ocorrência: a tarefa deixa de ser recorrente
+            db_execute("DELETE FROM task_recurrence WHERE task_id=?", (task_id,))
+    cache.invalidate("task", task_id)
+    cache.invalidate("dashboard")
+    _schedule_changed(task_id, due_iso if notify else None)
+
+
+def delete_task(task_id):
+    # a limpeza do log vai no mesmo commit da exclusão
+    with transaction():
+        db_execute("DELETE FROM tasks WHERE id=?", (task_id,))
+        prune_task_tombstones()
+    cache.invalidate("task", task_id)
+    cache.invalidate("dashboard")
+    _schedule_changed(task_id, None)
+
+
+def set_task_notified(task_id):
+    db_execute("UPDATE tasks SET notified=1 WHERE id=?", (task_id,))
+    cache.invalidate("task", task_id)
+    _schedule_changed(task_id, None)
+
+
+def get_due_notifications(now=None):
+    """Tarefas com notificação pendente cujo vencimento já passou: (id, title, due, priority).
+
+    O filtro de horário roda no SQL e usa o índice idx_tasks_pending_due, então as tarefas
+    futuras nem são lidas."""
+    now = now or datetime.now()
+    return db_execute("""SELECT id,title,due,priority FROM tasks
+                         WHERE notify=1 AND notified=0 AND due_ts IS NOT NULL AND due_ts <= ?
+                         ORDER BY due_ts""", (to_ts(now),), fetch=True)
+
+
+def claim_due_notifications(now=None):
+    """Marca como notificadas todas as tarefas vencidas e as devolve, (id, title, due, priority), em um só commit.
+
+    O UPDATE ... RETURNING é atômico: se vários processos (workers do Flask, app Tkinter)
+    reivindicarem ao mesmo tempo, cada tarefa é entregue a apenas um deles."""
+    now = now or datetime.now()
+    params = (to_ts(now),)
+    with transaction():
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            rows = db_execute("""UPDATE tasks SET notified=1
+                                 WHERE notify=1 AND notified=0 AND due_ts IS NOT NULL AND due_ts <= ?
+                                 RETURNING id,title,due,priority""", params, fetch=True)
+        else:
+            # SQLite antigo sem RETURNING: BEGIN IMMEDIATE (transaction) já bloqueia outros escritores
+            rows = get_due_notifications(now)
+            db_execute("""UPDATE tasks SET notified=1
+                          WHERE notify=1 AND notified=0 AND due_ts IS NOT NULL AND due_ts <= ?""", params)
+    for r in rows:
+        cache.invalidate("task", r[0])
+    return sorted(rows, key=lambda r: (r[2], r[0]))
+
+
+def get_dashboard_stats(now=None, include_archived=False):
+    """Estatísticas do dashboard. Os totais vêm de task_counters (mantida por triggers) e ficam
+    em cache; só a contagem de atrasadas depende da hora e é feita no índice idx_tasks_due_ts.
+
+    Com include_archived=True as tarefas arquivadas também entram; elas não têm contadores,
+    então archived_tasks é agregada (uma varredura, guardada em cache como os contadores).
+    Cada tarefa recorrente conta como as suas ocorrências na janela padrão de tarefas.recurrence."""
+    now = now or datetime.now()
+    counters = cache.get("dashboard", None, lambda: db_execute(
+        """SELECT k.category_key, c.title, k.priority, k.total, k.no_notify
+           FROM task_counters k LEFT JOIN categories c ON c.id = k.category_key
+           WHERE k.total > 0""", fetch=True))
+    overdue = db_execute("SELECT COUNT(*) FROM tasks WHERE due_ts IS NOT NULL AND due_ts < ?",
+                         (to_ts(now),), fetch=True)[0][0]
+    archived = []
+    if include_archived:
+        archived = cache.get("dashboard", "archived", lambda: db_execute(
+            """SELECT COALESCE(a.category_id, 0), c.title, COALESCE(a.priority, ''), COUNT(*), SUM(a.notify = 0)
+               FROM archived_tasks a LEFT JOIN categories c ON c.id = a.category_id
+               GROUP BY 1, 3""", fetch=True))
+        counters = counters + archived
+        overdue += db_execute("SELECT COUNT(*) FROM archived_tasks WHERE due_ts IS NOT NULL AND due_ts < ?",
+                              (to_ts(now),), fetch=True)[0][0]
+    # séries recorrentes: no lugar do mestre, as ocorrências da janela padrão
+    recurring, recurring_overdue = _recurrence_dashboard_rows(now)
+    counters = counters + recurring
+    overdue += recurring_overdue
+    total = sum(r[3] for r in counters)
+    by_priority = {p: 0 for p in PRIORITIES}
+    by_category = {}
+    for cat_key, cat_title, priority, count, _ in counters:
+        by_priority[priority] = by_priority.get(priority, 0) + count
+        cat = by_category.setdefault(cat_key, {"id": cat_key or None, "title": cat_title or "Sem categoria", "total": 0})
+        cat["total"] += count
+    stats = {
+        "total": total,
+        # tarefas sem data de vencimento contam como pendentes
+        "pending": total - overdue,
+        "overdue": overdue,
+        "no_notify": sum(r[4] for r in counters),
+        "by_priority": by_priority,
+        "by_category": sorted(by_category.values(), key=lambda c: c["title"]),
+    }
+    if include_archived:
+        stats["archived"] = sum(r[3] for r in archived)
+    return stats
+
+
+# ---------- tarefas recorrentes ----------
+# A regra e as exceções ficam em task_recurrence/task_occurrences (as funções puras estão em
+# tarefas.recurrence). Toda leitura expande só uma janela de vencimentos, então o custo segue o
+# número de séries e de exceções. Colunas: as de get_tasks, category_id e a regra.
+_SERIES_COLUMNS = f"{TASK_COLUMNS}, t.category_id, r.freq, r.every, r.byday, r.cron, r.until, r.notified_ts"
+
+
+def _load_series(where=(), params=(), notify_only=False):
+    conds = ["t.due_ts IS NOT NULL", *where] + (["t.notify = 1"] if notify_only else [])
+    # CROSS JOIN fixa a ordem: percorre as séries (poucas) e busca cada mestre pelo id, em vez de
+    # o planejador varrer tasks pelo índice de vencimento procurando regras
+    return db_execute(f"""SELECT {_SERIES_COLUMNS}
+                          FROM task_recurrence r CROSS JOIN tasks t ON t.id = r.task_id
+                          LEFT JOIN categories c ON t.category_id = c.id
+                          WHERE {" AND ".join(conds)}""", params, fetch=True)
+
+
+def _load_overrides(task_ids):
+    """{task_id: {vencimento original: (novo vencimento, estado)}} das séries dadas."""
+    overrides = {}
+    for chunk, marks in _id_chunks(task_ids):
+        for task_id, occurrence, due, state in db_execute(
+                f"SELECT task_id, occurrence_ts, due, state FROM task_occurrences WHERE task_id IN ({marks})",
+                chunk, fetch=True):
+            overrides.setdefault(task_id, {})[occurrence] = (due, state)
+    return overrides
+
+
+def _expand(series, overrides, lo, hi=None):
+    s = series
+    return series_occurrences(s[11], s[12], s[13], s[14], datetime.fromisoformat(s[3]),
+                              datetime.fromisoformat(s[15]) if s[15] else None,
+                              overrides.get(s[0], {}), lo, hi)
+
+
+def _recurrence_window(now):
+    # ancorada no início do dia: a janela só anda à meia-noite (ver recurrence_clock)
+    day = datetime(now.year, now.month, now.day)
+    return (to_ts(day - timedelta(days=recurrence.RECURRENCE_LOOKBEHIND_DAYS)),
+            to_ts(day + timedelta(days=recurrence.RECURRENCE_HORIZON_DAYS)))
+
+
+def recurrence_clock(now=None):
+    """O que muda as leituras das séries só com o passar do tempo: (início do dia que ancora a
+    janela padrão, due_ts da última ocorrência já vencida ou None). Entra no ETag do app web,
+    junto de querycache.last_passed_due, que só olha os vencimentos gravados em tasks.
+
+    Fica no cache até a próxima ocorrência vencer, a meia-noite chegar ou uma tarefa mudar (as
+    regras e exceções contam como mudança em tasks), então um GET condicional não expande as séries."""
+    now = now or datetime.now()
+    now_ts = to_ts(now)
+    clock = cache.get("recurrence", "clock", lambda: _recurrence_clock(now))
+    if not clock[2] <= now_ts < clock[3]:
+        cache.invalidate("recurrence", "clock")
+        clock = cache.get("recurrence", "clock", lambda: _recurrence_clock(now))
+    return clock[:2]
+
+
+def _recurrence_clock(now):
+    # (início do dia, última ocorrência vencida, quando foi calculado, até quando vale)
+    day = datetime(now.year, now.month, now.day)
+    lo = _recurrence_window(now)[0]
+    now_ts = to_ts(now)
+    valid_until = to_ts(day + timedelta(days=1))
+    series = _load_series()
+    overrides = _load_overrides([s[0] for s in series]) if series else {}
+    last = None
+    for s in series:
+        passed = deque(_expand(s, overrides, lo, now_ts - 1), maxlen=1)
+        if passed and (last is None or passed[0][0] > last):
+            last = passed[0][0]
+        upcoming = next(iter(_expand(s, overrides, now_ts, valid_until - 1)), None)
+        if upcoming is not None:
+            valid_until = min(valid_until, upcoming[0])
+    return to_ts(day), last, now_ts, valid_until
+
+
+def _occurrence_rows(where, params, due_from, due_to, key, backward, limit):
+    """Ocorrências das séries que passam nos filtros, como linhas de get_tasks (id = o do mestre).
+
+    key/backward/limit seguem a paginação de get_tasks: cada série gera no máximo limit ocorrências."""
+    # sem limites, a janela padrão; com um só, ela é contada a partir dele
+    lo, hi = _recurrence_window(datetime.now())
+    if due_from is not None:
+        lo = to_ts(due_from)
+        hi = to_ts(due_to) if due_to is not None else _recurrence_window(from_ts(lo))[1]
+    elif due_to is not None:
+        hi = to_ts(due_to)
+        lo = min(lo, _recurrence_window(from_ts(hi))[0])
+    if key is not None:
+        if backward:
+            hi = min(hi, key[0])
+        else:
+            lo = max(lo, key[0])
+    series = _load_series(where, params)
+    if not series:
+        return []
+    overrides = _load_overrides([s[0] for s in series])
+    rows = []
+    for s in series:
+        found = _expand(s, overrides, lo, hi)
+        if key is not None:
+            found = (o for o in found if ((o[0], s[0]) < key if backward else (o[0], s[0]) > key))
+        if limit is not None:
+            found = deque(found, maxlen=limit) if backward else islice(found, limit)
+        for due_ts, _, due in found:
+            notified = int(s[16] is not None and due_ts <= s[16])
+            rows.append((s[0], s[1], s[2], due, s[4], s[5], s[6], notified, due_ts,
+                         from_ts(due_ts).strftime("%Y-%m-%d %H:%M")))
+    return rows
+
+
+def _recurrence_dashboard_rows(now):
+    """Ajustes de get_dashboard_stats, no formato de task_counters, e a diferença de atrasadas:
+    sai o mestre (que os contadores já incluem) e entram as ocorrências da janela padrão."""
+    series = _load_series()
+    if not series:
+        return [], 0
+    now_ts = to_ts(now)
+    lo, hi = _recurrence_window(now)
+    overrides = _load_overrides([s[0] for s in series])
+    rows, overdue = [], 0
+    for s in series:
+        cat_key, priority, no_notify = s[10] or 0, s[4] or "", not s[6]
+        rows.append((cat_key, s[5], priority, -1, -no_notify))
+        overdue -= s[8] < now_ts
+        total = late = 0
+        for due_ts, _, _ in _expand(s, overrides, lo, hi):
+            total += 1
+            late += due_ts < now_ts
+        rows.append((cat_key, s[5], priority, total, total if no_notify else 0))
+        overdue += late
+    return rows, overdue
+
+
+def _notify_floor(series, lo):
+    # próxima ocorrência a avisar: depois da marca d'água, mas nunca antes da janela (sem rajadas de atrasadas)
+    return max(lo, series[16] + 1 if series[16] is not None else series[8])
+
+
+def next_occurrence_notifications(task_ids=None, now=None):
+    """{task_id: due_ts da próxima ocorrência a notificar (None = nenhuma)} das séries dadas (ou de todas)."""
+    now = now or datetime.now()
+    where, params = [], []
+    if task_ids is not None:
+        task_ids = list(task_ids)
+        where.append(f"t.id IN ({','.join('?' * len(task_ids))})")
+        params = task_ids
+        if not task_ids:
+            return {}
+    series = _load_series(where, params)
+    overrides = _load_overrides([s[0] for s in series if s[6]])
+    result = dict.fromkeys(task_ids or ())
+    lo = _recurrence_window(now)[0]
+    for s in series:
+        first = next(iter(_expand(s, overrides, _notify_floor(s, lo))), None) if s[6] else None
+        result[s[0]] = first[0] if first else None
+    return result
+
+
+def claim_due_occurrences(now=None):
+    """Equivalente de claim_due_notifications para as séries: devolve (rows, next_due).
+
+    rows: (id, title, due, priority) da ocorrência vencida mais recente de cada série ainda não
+    avisada (as anteriores, perdidas com o notificador parado, não geram alertas repetidos); a
+    marca d'água da série avança até agora. next_due: {task_id: due_ts da próxima ocorrência}
+    das séries examinadas, para o agendador."""
+    now = now or datetime.now()
+    now_ts = to_ts(now)
+    lo = _recurrence_window(now)[0]
+    rows, next_due = [], {}
+    with transaction():
+        series = _load_series(notify_only=True)
+        overrides = _load_overrides([s[0] for s in series])
+        for s in series:
+            floor = _notify_floor(s, lo)
+            if floor > now_ts:
+                continue
+            due = deque(_expand(s, overrides, floor, now_ts), maxlen=1)
+            if due:
+                rows.append((s[0], s[1], due[0][2], s[4]))
+                db_execute("UPDATE task_recurrence SET notified_ts = ? WHERE task_id = ?", (now_ts, s[0]))
+            upcoming = next(iter(_expand(s, overrides, now_ts + 1)), None)
+            next_due[s[0]] = upcoming[0] if upcoming else None
+    return rows, next_due
+
+
+def set_recurrence(task_id, freq, every=1, byday=None, cron=None, until=None):
+    """Torna a tarefa recorrente (ou troca a regra). O vencimento dela é a primeira ocorrência.
+
+    freq: daily, weekly, monthly ou cron (ver tarefas.recurrence); until: datetime, texto ISO ou None."""
+    freq, every, byday, cron = normalize_rule(freq, every, byday, cron)
+    task = get_task(task_id)
+    if task is None:
+        raise ValueError(f"Tarefa inexistente: {task_id}")
+    if task[8] is None:
+        raise ValueError("Tarefa recorrente precisa de vencimento")
+    until = _normalize_due(until)
+    # sem upsert: o ON CONFLICT de fora valeria também para o INSERT OR REPLACE dos triggers do log
+    db_execute("""INSERT OR REPLACE INTO task_recurrence(task_id, freq, every, byday, cron, until, notified_ts)
+                  VALUES(?,?,?,?,?,?, (SELECT notified_ts FROM task_recurrence WHERE task_id = ?))""",
+               (task_id, freq, every, byday, cron, until, task_id))
+    cache.invalidate("task", task_id)
+    cache.invalidate("dashboard")
+    _schedule_reload()
+
+
+def clear_recurrence(task_id):
+    """Volta a ser uma tarefa comum (com o vencimento da primeira ocorrência); as exceções são descartadas."""
+    with transaction():
+        db_execute("DELETE FROM task_occurrences WHERE task_id = ?", (task_id,))
+        db_execute("DELETE FROM task_recurrence WHERE task_id = ?", (task_id,))
+    cache.invalidate("task", task_id)
+    cache.invalidate("dashboard")
+    _schedule_reload()
+
+
+def get_recurrence(task_id):
+    """{"freq", "every", "byday", "cron", "until"} da tarefa, ou None se ela não é recorrente."""
+    rows = db_execute("SELECT freq, every, byday, cron, until FROM task_recurrence WHERE task_id = ?",
+                      (task_id,), fetch=True)
+    return dict(zip(("freq", "every", "byday", "cron", "until"), rows[0])) if rows else None
+
+
+def override_occurrence(task_id, occurrence, due=None, state=None):
+    """Exceção para uma ocorrência, identificada pelo vencimento original (datetime ou ISO).
+
+    due remarca a ocorrência; state 'done' a conclui e 'cancelled' a pula. Sem due nem state,
+    a exceção é removida e a ocorrência volta ao normal."""
+    occurrence_ts = to_ts(occurrence)
+    if occurrence_ts is None:
+        raise ValueError(f"Data/hora inválida: {occurrence}")
+    if state is not None and state not in recurrence.OCCURRENCE_STATES:
+        raise ValueError(f"Estado inválido: {state}")
+    due = _normalize_due(due)
+    if due is None and state is None:
+        db_execute("DELETE FROM task_occurrences WHERE task_id = ? AND occurrence_ts = ?", (task_id, occurrence_ts))
+    else:
+        db_execute("""INSERT OR REPLACE INTO task_occurrences(task_id, occurrence_ts, due, state)
+                      VALUES(?,?,?,?)""", (task_id, occurrence_ts, due, state))
+    cache.invalidate("dashboard")
+    _schedule_reload()
+
+
+def complete_occurrence(task_id, occurrence):
+    override_occurrence(task_id, occurrence, state="done")
+
+
+def _normalize_due(value):
+    """datetime ou texto ISO -> texto no formato gravado em tasks.due; ValueError se não for data."""
+    if value is None or value == "":
+        return None
+    dt = value if isinstance(value, datetime) else None
+    if dt is None:
+        try:
+            dt = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Data/hora inválida: {value}") from None
+    return iso_or_none(dt)
+
+
+# ---------- operações em lote ----------
+# Cada função recebe uma lista de ids, roda numa transação só (um commit, UPDATE/DELETE com
+# "IN (...)" em blocos de BULK_CHUNK_SIZE) e devolve os ids que existiam e foram alterados.
+def _id_chunks(task_ids):
+    ids = list(dict.fromkeys(int(i) for i in task_ids))
+    for start in range(0, len(ids), BULK_CHUNK_SIZE):
+        chunk = ids[start:start + BULK_CHUNK_SIZE]
+        yield chunk, ",".join("?" * len(chunk))
+
+
+def _bulk_update(task_ids, assignments, params=()):
+    """UPDATE tasks SET assignments nas tarefas de task_ids; devolve [(id, due)] das que existiam."""
+    rows = []
+    with transaction():
+        for chunk, marks in _id_chunks(task_ids):
+            found = db_execute(f"SELECT id, due FROM tasks WHERE id IN ({marks})", chunk, fetch=True)
+            if found:
+                db_execute(f"UPDATE tasks SET {assignments} WHERE id IN ({marks})", (*params, *chunk))
+                rows.extend(found)
+    for task_id, _ in rows:
+        cache.invalidate("task", task_id)
+    if rows:
+        cache.invalidate("dashboard")
+    return rows
+
+
+def move_tasks(task_ids, category_id):
+    """Move as tarefas para a categoria (None = "Sem categoria")."""
+    if category_id is not None and not db_execute("SELECT 1 FROM categories WHERE id = ?", (category_id,), fetch=True):
+        raise ValueError(f"Categoria inexistente: {category_id}")
+    return [r[0] for r in _bulk_update(task_ids, "category_id = ?", (category_id,))]
+
+
+def set_priority(task_ids, priority):
+    if priority not in PRIORITIES:
+        raise ValueError(f"Prioridade inválida: {priority}")
+    return [r[0] for r in _bulk_update(task_ids, "priority = ?", (priority,))]
+
+
+def reset_notifications(task_ids):
+    """Marca as tarefas para notificar de novo (notify=1, notified=0) e as devolve ao agendador."""
+    rows = _bulk_update(task_ids, "notify = 1, notified = 0")
+    for task_id, due in rows:
+        _schedule_changed(task_id, due)
+    return [r[0] for r in rows]
+
+
+def delete_tasks(task_ids):
+    deleted = []
+    with transaction():
+        for chunk, marks in _id_chunks(task_ids):
+            found = db_execute(f"SELECT id FROM tasks WHERE id IN ({marks})", chunk, fetch=True)
+            if found:
+                db_execute(f"DELETE FROM tasks WHERE id IN ({marks})", chunk)
+                deleted.extend(r[0] for r in found)
+        prune_task_tombstones()
+    for task_id in deleted:
+        cache.invalidate("task", task_id)
+        _schedule_changed(task_id, None)
+    if deleted:
+        cache.invalidate("dashboard")
+    return deleted
+
+
+# ---------- avisos ao agendador ----------
+_schedulers = []  # agendadores ativos neste processo, avisados pelas funções de escrita
+
+
+def _local_schedulers():
+    # só os agendadores do banco atual: com tenants, cada banco tem o seu
+    database = current_db()
+    return [scheduler for scheduler in list(_schedulers) if scheduler.database_path() == database]
+
+
+def _schedule_changed(task_id, due_iso):
+    """Avisa os agendadores ativos que o vencimento de uma tarefa mudou (None = não notificar mais)."""
+    for scheduler in _local_schedulers():
+        scheduler.reschedule(task_id, due_iso)
+
+
+def _schedule_reload():
+    """Pede aos agendadores ativos que releiam o banco inteiro (após importações em lote)."""
+    for scheduler in _local_schedulers():
+        scheduler.request_reconcile()
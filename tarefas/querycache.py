@@ -0,0 +1,143 @@
+"""Cache LRU das leituras repetidas e versões de mudança das tabelas (usadas nos ETags)."""
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from . import db
+from .db import db_execute
+from .utils import to_ts
+
+CACHE_MAX_ENTRIES = 1024  # entradas do cache de leitura (LRU), somando todos os bancos
+CACHE_MAX_DATABASES = 64  # bancos (tenants) acompanhados ao mesmo tempo; o menos usado sai do cache
+
+_MISSING = object()
+
+
+class QueryCache:
+    """Cache LRU em memória para leituras repetidas (categorias, tarefa por id, dashboard).
+
+    Cada namespace depende de algumas tabelas (NAMESPACE_TABLES). As funções de escrita deste
+    módulo invalidam o que alteram; escritas feitas por fora (outros processos, SQL direto) são
+    detectadas pelo PRAGMA data_version de uma conexão própria, que muda sempre que outra
+    conexão faz commit. Só então table_versions é lida para descobrir quais tabelas mudaram.
+
+    As entradas são separadas por banco (db.current_db()): get/invalidate valem para o banco do
+    contexto atual, e cada banco acompanhado tem a sua conexão de vigia.
+    """
+    NAMESPACE_TABLES = {
+        "categories": ("categories",),
+        "task": ("tasks", "categories"),
+        "dashboard": ("tasks", "categories"),
+        "recurrence": ("tasks",),
+    }
+
+    def __init__(self, maxsize=CACHE_MAX_ENTRIES):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # (banco, namespace, key) -> valor, do menos para o mais recente
+        self._lock = threading.RLock()
+        self._generation = 0  # muda a cada invalidação; evita guardar um valor lido antes dela
+        self._watchers = OrderedDict()  # banco -> [conexão, data_version, versões das tabelas]
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, namespace, key, loader):
+        """Valor em cache para (namespace, key); se não houver, chama loader() e guarda o resultado."""
+        entry_key = (db.current_db(), namespace, key)
+        with self._lock:
+            self._check_external_writes()
+            value = self._entries.get(entry_key, _MISSING)
+            if value is not _MISSING:
+                self._entries.move_to_end(entry_key)
+                self.hits += 1
+                return value
+            self.misses += 1
+            generation = self._generation
+        value = loader()
+        with self._lock:
+            if generation == self._generation and entry_key[0] in self._watchers:
+                self._entries[entry_key] = value
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, namespace=None, key=_MISSING, database=None):
+        """Descarta uma entrada, um namespace inteiro ou (sem argumentos) tudo, do banco atual."""
+        database = database or db.current_db()
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if key is not _MISSING and namespace is not None:
+                self._entries.pop((database, namespace, key), None)
+            else:
+                for k in [k for k in self._entries if k[0] == database and namespace in (None, k[1])]:
+                    del self._entries[k]
+
+    def invalidate_tables(self, *tables, database=None):
+        for namespace, deps in self.NAMESPACE_TABLES.items():
+            if any(t in deps for t in tables):
+                self.invalidate(namespace, database=database)
+
+    def _check_external_writes(self):
+        database = db.current_db()
+        watcher = self._watchers.get(database)
+        if watcher is None:
+            db.get_connection()  # cria o esquema, se o arquivo é novo
+            watcher = self._watchers[database] = [sqlite3.connect(database, check_same_thread=False), None, {}]
+            while len(self._watchers) > CACHE_MAX_DATABASES:
+                # sem vigia, as entradas desse banco não seriam mais invalidadas por escritas de fora
+                old, (conn, _, _) = self._watchers.popitem(last=False)
+                conn.close()
+                self.invalidate(database=old)
+        else:
+            self._watchers.move_to_end(database)
+        data_version = watcher[0].execute("PRAGMA data_version").fetchone()[0]
+        if data_version == watcher[1]:
+            return watcher
+        watcher[1] = data_version
+        versions = dict(watcher[0].execute("SELECT name, version FROM table_versions").fetchall())
+        changed = [t for t, v in versions.items() if watcher[2].get(t) != v]
+        watcher[2] = versions
+        if changed:
+            self.invalidate_tables(*changed, database=database)
+        return watcher
+
+    def table_versions(self):
+        """Versões atuais de table_versions; só consulta o banco se PRAGMA data_version mudou."""
+        with self._lock:
+            return dict(self._check_external_writes()[2])
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+cache = QueryCache()
+
+
+def cache_stats():
+    return cache.stats()
+
+
+def get_change_version(*tables):
+    """Versão de mudança do banco: tupla com a versão de cada tabela pedida (todas, se nenhuma).
+
+    Muda a cada escrita nessas tabelas, de qualquer processo; serve para ETags."""
+    versions = cache.table_versions()
+    return tuple(versions.get(t, 0) for t in (tables or sorted(versions)))
+
+
+def last_passed_due(now=None):
+    """Maior due_ts já vencido: muda sempre que um vencimento passa (usado no ETag do dashboard)."""
+    now = now or datetime.now()
+    return db_execute("SELECT MAX(due_ts) FROM tasks WHERE due_ts < ?", (to_ts(now),), fetch=True)[0][0]
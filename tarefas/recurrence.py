@@ -0,0 +1,178 @@
+"""Regras de recorrência e geração preguiçosa das ocorrências.
+
+Uma tarefa recorrente é uma linha comum em tasks (o "mestre": título, categoria, prioridade,
+notify; o vencimento é o da primeira ocorrência) mais a regra em task_recurrence:
+- daily / weekly / monthly: a cada `every` dias, semanas ou meses, no horário do mestre;
+  weekly aceita byday ("0,2,4", 0 = segunda; padrão: o dia da semana do mestre) e monthly
+  repete o dia do mês do mestre (meses que não o têm são pulados);
+- cron: expressão de 5 campos "minuto hora dia mês dia-da-semana" (0 ou 7 = domingo), como no crontab;
+- until: fim opcional, inclusive.
+
+As ocorrências não são gravadas. task_occurrences guarda só as exceções, por (tarefa, vencimento
+original): um novo vencimento e/ou o estado 'done' (concluída) ou 'cancelled' (pulada). Aqui ficam
+só as funções puras; as consultas e escritas estão em tarefas.models, junto das outras de tasks.
+"""
+
+import calendar
+import heapq
+from datetime import datetime, timedelta
+
+from .utils import to_ts
+
+FREQUENCIES = ("daily", "weekly", "monthly", "cron")
+OCCURRENCE_STATES = ("done", "cancelled")
+# janela expandida quando a consulta não dá due_from/due_to (listagens, dashboard, notificador)
+RECURRENCE_LOOKBEHIND_DAYS = 30
+RECURRENCE_HORIZON_DAYS = 90
+CRON_SEARCH_DAYS = 366 * 8  # cron que nunca casa (ex.: "0 0 30 2 *") para de procurar depois disso
+
+_CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+_EPOCH = datetime(1970, 1, 1)
+
+
+def from_ts(ts):
+    """Inverso de utils.to_ts: due_ts -> datetime (horário de parede)."""
+    return _EPOCH + timedelta(seconds=ts)
+
+
+def parse_cron(expr):
+    """"*/15 9-17 * * 1-5" -> (minutos, horas, dias, meses, dias da semana) como conjuntos.
+
+    Devolve também se dia do mês e dia da semana são "*": como no cron, se os dois forem
+    restritos basta um deles casar. ValueError para expressões inválidas."""
+    fields = (expr or "").split()
+    if len(fields) != 5:
+        raise ValueError(f"Expressão cron inválida: {expr}")
+    sets = []
+    for text, (lo, hi) in zip(fields, _CRON_FIELDS):
+        values = set()
+        for part in text.split(","):
+            span, _, step = part.partition("/")
+            try:
+                step = int(step) if step else 1
+                if span == "*":
+                    first, last = lo, hi
+                elif "-" in span:
+                    first, last = (int(v) for v in span.split("-", 1))
+                else:
+                    first = int(span)
+                    last = hi if step > 1 else first  # "5/15" = de 5 em diante, a cada 15
+            except ValueError:
+                raise ValueError(f"Expressão cron inválida: {expr}") from None
+            if step < 1 or first < lo or last > hi or first > last:
+                raise ValueError(f"Expressão cron inválida: {expr}")
+            values.update(range(first, last + 1, step))
+        sets.append(values)
+    if 7 in sets[4]:
+        sets[4].discard(7)
+        sets[4].add(0)
+    return (*sets, fields[2] == "*", fields[4] == "*")
+
+
+def normalize_rule(freq, every=1, byday=None, cron=None):
+    """Valida uma regra e devolve (freq, every, byday, cron) no formato gravado; ValueError se inválida."""
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Recorrência inválida: {freq}")
+    try:
+        every = int(every or 1)
+    except (TypeError, ValueError):
+        raise ValueError(f"Intervalo inválido: {every}") from None
+    if every < 1:
+        raise ValueError(f"Intervalo inválido: {every}")
+    if freq == "cron":
+        parse_cron(cron)
+        return freq, 1, None, " ".join(cron.split())
+    if freq == "weekly" and byday:
+        days = byday.split(",") if isinstance(byday, str) else byday
+        try:
+            days = sorted({int(d) for d in days})
+        except (TypeError, ValueError):
+            raise ValueError(f"Dias da semana inválidos: {byday}") from None
+        if not all(0 <= d <= 6 for d in days):
+            raise ValueError(f"Dias da semana inválidos: {byday}")
+        return freq, every, ",".join(map(str, days)), None
+    return freq, every, None, None
+
+
+def occurrences(freq, every, byday, cron, start, until=None, after=None):
+    """Gera, em ordem, os vencimentos da regra a partir de `after` (inclusive) e nunca antes de `start`.
+
+    Os saltos até `after` são calculados, não percorridos (exceto no cron, que anda dia a dia)."""
+    after = max(start, after) if after is not None else start
+    if freq == "daily":
+        step = timedelta(days=every)
+        dt = start + step * -((start - after) // step)
+        while until is None or dt <= until:
+            yield dt
+            dt += step
+    elif freq == "weekly":
+        days = [int(d) for d in byday.split(",")] if byday else [start.weekday()]
+        monday = start - timedelta(days=start.weekday())
+        week = (after - monday).days // 7 // every * every
+        while True:
+            base = monday + timedelta(weeks=week)
+            for day in days:
+                dt = base + timedelta(days=day)
+                if dt < after:
+                    continue
+                if until is not None and dt > until:
+                    return
+                yield dt
+            week += every
+    elif freq == "monthly":
+        first = start.year * 12 + start.month - 1
+        month = (after.year * 12 + after.month - 1 - first) // every * every
+        while True:
+            year, mon = divmod(first + month, 12)
+            if until is not None and datetime(year, mon + 1, 1) > until:
+                return
+            if start.day <= calendar.monthrange(year, mon + 1)[1]:
+                dt = start.replace(year=year, month=mon + 1)
+                if dt >= after:
+                    yield dt
+            month += every
+    elif freq == "cron":
+        minutes, hours, doms, months, dows, dom_any, dow_any = parse_cron(cron)
+        times = [(h, m) for h in sorted(hours) for m in sorted(minutes)]
+        day = datetime(after.year, after.month, after.day)
+        idle = 0
+        while idle < CRON_SEARCH_DAYS:
+            if until is not None and day > until:
+                return
+            dom_ok, dow_ok = day.day in doms, day.isoweekday() % 7 in dows
+            if day.month in months and ((dom_ok and dow_ok) if dom_any or dow_any else (dom_ok or dow_ok)):
+                idle = 0
+                for h, m in times:
+                    dt = day.replace(hour=h, minute=m)
+                    if dt < after:
+                        continue
+                    if until is not None and dt > until:
+                        return
+                    yield dt
+            else:
+                idle += 1
+            day += timedelta(days=1)
+
+
+def series_occurrences(freq, every, byday, cron, start, until, overrides, lo, hi=None):
+    """Ocorrências efetivas de uma série com vencimento em [lo, hi] (due_ts; hi None = sem fim).
+
+    overrides: {vencimento original (ts): (novo vencimento ISO ou None, estado ou None)}.
+    Gera (due_ts, occurrence_ts, due_iso) em ordem de vencimento: concluídas e puladas ficam de
+    fora e as remarcadas aparecem no novo horário. occurrence_ts identifica a ocorrência."""
+    moved = []
+    for occurrence, (due, state) in overrides.items():
+        due_ts = to_ts(due)
+        if state is None and due_ts is not None and lo <= due_ts and (hi is None or due_ts <= hi):
+            moved.append((due_ts, occurrence, due))
+    moved.sort()
+
+    def regular():
+        for dt in occurrences(freq, every, byday, cron, start, until, from_ts(lo)):
+            ts = to_ts(dt)
+            if hi is not None and ts > hi:
+                return
+            if ts not in overrides:
+                yield ts, ts, dt.isoformat(sep=" ")
+
+    return heapq.merge(regular(), moved)
@@ -0,0 +1,376 @@
+"""Agendador de notificações independente de interface (usado pelo app web e pela GUI).
+
+Com vários processos no mesmo banco (workers do Flask, apps Tkinter), só um deles é o líder:
+quem segura o lease em notifier_lease faz a varredura dos vencimentos e grava as tarefas
+reivindicadas em notification_events. Todos os processos, inclusive o líder, leem essa tabela
+e entregam os alertas aos seus clientes. Se o líder morre, o lease expira e outro assume.
+O líder também roda o arquivamento periódico das tarefas antigas (tarefas.archive). Para as
+tarefas recorrentes, o heap guarda o vencimento da próxima ocorrência de cada série.
+
+Com tenants (tarefas.tenants), cada banco tem o seu lease e o seu heap; TenantScheduler roda
+um NotificationScheduler por tenant dentro de uma única thread.
+"""
+
+import heapq
+import os
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from datetime import datetime
+
+from . import archive, db
+from .db import db_execute, transaction, use_database
+from .instrument import metrics
+from .models import (_schedulers, claim_due_notifications, claim_due_occurrences, next_occurrence_notifications,
+                     task_revision)
+from .tenants import tenant_path
+from .utils import to_ts
+
+RECONCILE_INTERVAL_SECONDS = 60  # releitura completa do banco (rede de segurança do líder)
+SCHEDULER_HEAP_LIMIT = 1000  # quantos vencimentos futuros o agendador mantém em memória
+LEASE_NAME = "notifier"
+LEASE_TTL_SECONDS = 15  # sem renovação por esse tempo, o lease fica livre para outro processo
+LEASE_HEARTBEAT_SECONDS = 5  # intervalo de renovação (bem menor que o TTL)
+EVENT_POLL_SECONDS = 1.0  # intervalo de leitura de notification_events e do log de mudanças
+NOTIFICATION_EVENTS_KEEP = 10_000  # eventos guardados para quem reconecta (o líder apaga os mais velhos)
+
+metrics.describe("trabalho_notifier_cycle_seconds", "histogram", "Duração de cada volta do agendador de notificações.")
+metrics.describe("trabalho_notifier_backlog", "gauge", "Vencimentos pendentes no heap do agendador.")
+metrics.describe("trabalho_notifier_fired_total", "counter", "Notificações reivindicadas e publicadas pelo líder.")
+metrics.describe("trabalho_notifier_delivered_total", "counter", "Eventos de notificação entregues neste processo.")
+metrics.describe("trabalho_notifier_errors_total", "counter", "Erros no laço do agendador.")
+metrics.describe("trabalho_notifier_leader", "gauge", "1 se este processo segura o lease do notificador.")
+metrics.describe("trabalho_notifier_leadership_changes_total", "counter", "Vezes que este processo ganhou ou perdeu o lease.")
+
+
+# ---------- lease e eventos ----------
+def acquire_lease(holder, name=LEASE_NAME, ttl=None):
+    """Pega ou renova o lease `name` por ttl segundos (padrão LEASE_TTL_SECONDS); True se holder ficou com ele.
+
+    Só funciona se o lease está livre, expirado ou já é de holder. O relógio é o do sistema
+    (time.time), comum a todos os processos da máquina.
+    """
+    now = time.time()
+    ttl = LEASE_TTL_SECONDS if ttl is None else ttl
+    with transaction():
+        db_execute("""INSERT INTO notifier_lease(name, holder, expires_at) VALUES(?, ?, ?)
+                      ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+                      WHERE notifier_lease.holder = excluded.holder OR notifier_lease.expires_at < ?""",
+                   (name, holder, now + ttl, now))
+        rows = db_execute("SELECT holder FROM notifier_lease WHERE name = ?", (name,), fetch=True)
+    return bool(rows) and rows[0][0] == holder
+
+
+def release_lease(holder, name=LEASE_NAME):
+    """Libera o lease se ainda for de holder (o próximo processo assume sem esperar o TTL)."""
+    db_execute("DELETE FROM notifier_lease WHERE name = ? AND holder = ?", (name, holder))
+
+
+def lease_holder(name=LEASE_NAME):
+    """(holder, expires_at) do lease atual, ou None."""
+    rows = db_execute("SELECT holder, expires_at FROM notifier_lease WHERE name = ?", (name,), fetch=True)
+    return rows[0] if rows else None
+
+
+def publish_notifications(rows):
+    """Grava tarefas reivindicadas, (id, title, due, priority), em notification_events."""
+    db_execute("INSERT INTO notification_events(task_id, title, due, priority) VALUES(?,?,?,?)", rows, many=True)
+
+
+def get_notification_events(after_seq, limit=1000):
+    """Eventos depois de after_seq, em ordem: (seq, task_id, title, due, priority)."""
+    return db_execute("""SELECT seq, task_id, title, due, priority FROM notification_events
+                         WHERE seq > ? ORDER BY seq LIMIT ?""", (after_seq, limit), fetch=True)
+
+
+def latest_notification_seq():
+    return db_execute("SELECT COALESCE(MAX(seq), 0) FROM notification_events", fetch=True)[0][0]
+
+
+class NotificationScheduler(threading.Thread):
+    """Agendador de notificações independente de GUI; roda um por processo.
+
+    Todo agendador disputa o lease a cada LEASE_HEARTBEAT_SECONDS. O líder mantém um min-heap
+    com os próximos vencimentos e dorme exatamente até o primeiro deles; add_task/update_task/
+    delete_task deste processo o acordam na hora, e as escritas de outros processos chegam pelo
+    log task_changes, lido a cada EVENT_POLL_SECONDS. Ao vencer, o líder reivindica as tarefas e as
+    publica em notification_events na mesma transação.
+
+    Todos os agendadores leem notification_events a partir do último evento visto e chamam
+    on_due(events) com (seq, task_id, title, due, priority); seq é global e crescente, então
+    cada tarefa vencida aparece uma única vez em cada processo. on_due deve voltar logo: a GUI e o
+    app web passam Dispatcher.submit (tarefas.dispatch), que só enfileira para os canais.
+
+    database fixa o banco (o de um tenant); cada volta do laço é um step(), que TenantScheduler
+    chama direto para rodar vários bancos na mesma thread.
+    """
+    daemon = True
+
+    def __init__(self, on_due, reconcile_interval=None, database=None, wake=None, labels=None):
+        super().__init__()
+        self.on_due = on_due
+        self.reconcile_interval = RECONCILE_INTERVAL_SECONDS if reconcile_interval is None else reconcile_interval
+        self.database = database  # None = db.DB; com um caminho, a thread trabalha nesse banco
+        self.labels = labels or {}  # rótulos das métricas (ex.: tenant)
+        self.holder = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self.last_seq = None   # último evento entregue; lido do banco quando a thread começa
+        self.stop_event = threading.Event()
+        self._wake = wake or threading.Event()  # TenantScheduler passa o evento da sua thread
+        self._lock = threading.Lock()
+        self._heap = []        # (due_ts, task_id)
+        self._due_by_id = {}   # task_id -> due_ts atual; entradas do heap que não batem estão obsoletas
+        self._horizon = None   # último vencimento carregado quando o heap foi truncado
+        self._changes_rev = 0  # revisão de task_changes já aplicada ao heap
+        self._next_reconcile = 0
+        self._next_archive = 0
+        self._next_heartbeat = 0
+        self._reconcile_requested = False
+
+    def database_path(self):
+        return self.database or db.DB
+
+    def reschedule(self, task_id, due_iso):
+        if self.is_leader:
+            self._set_due(task_id, to_ts(due_iso))
+            self._wake.set()
+
+    def _set_due(self, task_id, due_ts):
+        with self._lock:
+            # só o líder mantém o heap (só ele o esvazia); quem assume a liderança o recarrega em reconcile
+            if not self.is_leader:
+                return
+            if due_ts is None:
+                self._due_by_id.pop(task_id, None)
+            else:
+                self._due_by_id[task_id] = due_ts
+                heapq.heappush(self._heap, (due_ts, task_id))
+
+    def request_reconcile(self):
+        """Recarrega o heap do banco na próxima volta (usado após escritas em lote)."""
+        self._reconcile_requested = True
+        self._wake.set()
+
+    def next_deadline(self):
+        with self._lock:
+            # remoção preguiçosa: descarta entradas que não correspondem mais ao vencimento atual
+            while self._heap and self._due_by_id.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def reconcile(self):
+        self._changes_rev = task_revision()  # antes da leitura: o que mudar no meio é reaplicado
+        rows = db_execute("""SELECT id, due_ts FROM tasks
+                             WHERE notify=1 AND notified=0 AND due_ts IS NOT NULL
+                             ORDER BY due_ts LIMIT ?""", (SCHEDULER_HEAP_LIMIT + 1,), fetch=True)
+        horizon = None
+        if len(rows) > SCHEDULER_HEAP_LIMIT:
+            rows = rows[:SCHEDULER_HEAP_LIMIT]
+            horizon = rows[-1][1]
+        due_by_id = dict(rows)
+        # séries recorrentes: uma entrada por série, com a próxima ocorrência a notificar
+        due_by_id.update((task_id, due_ts) for task_id, due_ts in next_occurrence_notifications().items()
+                         if due_ts is not None)
+        heap = [(due_ts, task_id) for task_id, due_ts in due_by_id.items()]
+        heapq.heapify(heap)
+        with self._lock:
+            self._due_by_id = due_by_id
+            self._heap = heap
+            self._horizon = horizon
+        db_execute("DELETE FROM notification_events WHERE seq <= ?",
+                   (latest_notification_seq() - NOTIFICATION_EVENTS_KEEP,))
+
+    def apply_task_changes(self):
+        """Aplica ao heap as mudanças feitas por outros processos desde a última leitura do log."""
+        rows = db_execute("""SELECT ch.rev, ch.task_id,
+                                    CASE WHEN t.notify = 1 AND t.notified = 0 THEN t.due_ts END,
+                                    r.task_id IS NOT NULL
+                             FROM task_changes ch LEFT JOIN tasks t ON t.id = ch.task_id
+                             LEFT JOIN task_recurrence r ON r.task_id = ch.task_id
+                             WHERE ch.rev > ? ORDER BY ch.rev LIMIT ?""",
+                          (self._changes_rev, SCHEDULER_HEAP_LIMIT), fetch=True)
+        if len(rows) >= SCHEDULER_HEAP_LIMIT:
+            self.reconcile()  # escrita em lote: mais barato reler os primeiros vencimentos
+            return
+        series_due = next_occurrence_notifications({r[1] for r in rows if r[3]}) if rows else {}
+        for rev, task_id, due_ts, _ in rows:
+            self._set_due(task_id, series_due.get(task_id, due_ts))
+            self._changes_rev = rev
+
+    def update_leadership(self):
+        leader = acquire_lease(self.holder)
+        if leader != self.is_leader:
+            self.is_leader = leader
+            metrics.inc("trabalho_notifier_leadership_changes_total", **self.labels)
+            metrics.set("trabalho_notifier_leader", 1 if leader else 0, **self.labels)
+            if leader:
+                self._reconcile_requested = True
+            else:
+                with self._lock:
+                    self._heap, self._due_by_id, self._horizon = [], {}, None
+
+    def fire(self, now):
+        with transaction():
+            # reivindicar e publicar juntos: se o processo cair no meio, nenhum alerta se perde
+            rows = claim_due_notifications(now)
+            occurrences, series_due = claim_due_occurrences(now)
+            rows += occurrences
+            if rows:
+                publish_notifications(rows)
+        now_ts = to_ts(now)
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now_ts:
+                due_ts, task_id = heapq.heappop(self._heap)
+                if self._due_by_id.get(task_id) == due_ts:
+                    del self._due_by_id[task_id]
+        # a série volta para o heap com a próxima ocorrência
+        for task_id, due_ts in series_due.items():
+            self._set_due(task_id, due_ts)
+        if rows:
+            metrics.inc("trabalho_notifier_fired_total", len(rows), **self.labels)
+
+    def deliver_events(self):
+        events = get_notification_events(self.last_seq)
+        while events:
+            self.last_seq = events[-1][0]
+            metrics.inc("trabalho_notifier_delivered_total", len(events), **self.labels)
+            self.on_due(events)
+            events = get_notification_events(self.last_seq)
+
+    def leader_step(self):
+        """Uma volta do líder; devolve quanto dormir (None = voltar ao topo do laço já)."""
+        if self._reconcile_requested or time.monotonic() >= self._next_reconcile:
+            self._reconcile_requested = False
+            self.reconcile()
+            self._next_reconcile = time.monotonic() + self.reconcile_interval
+        else:
+            self.apply_task_changes()
+        if time.monotonic() >= self._next_archive:
+            # o líder também move as tarefas antigas para a camada fria (um processo só faz isso)
+            moved = archive.run_archival()
+            backlog = moved >= archive.ARCHIVE_MAX_BATCHES * archive.ARCHIVE_BATCH_SIZE
+            self._next_archive = time.monotonic() + (EVENT_POLL_SECONDS if backlog else archive.ARCHIVE_INTERVAL_SECONDS)
+        now = datetime.now()
+        now_ts = to_ts(now)
+        deadline = self.next_deadline()
+        if deadline is not None and deadline <= now_ts:
+            self.fire(now)
+            return None
+        if self._horizon is not None and self._horizon <= now_ts:
+            self._next_reconcile = 0
+            return None
+        timeout = self._next_reconcile - time.monotonic()
+        for limit in (deadline, self._horizon):
+            if limit is not None:
+                timeout = min(timeout, limit - now_ts - now.microsecond / 1_000_000)
+        return timeout
+
+    def step(self):
+        """Uma volta do laço: lease, trabalho do líder e entrega dos eventos; devolve quanto dormir."""
+        cycle_start = time.perf_counter()
+        try:
+            if self.last_seq is None:
+                self.last_seq = latest_notification_seq()
+            if time.monotonic() >= self._next_heartbeat:
+                self.update_leadership()
+                self._next_heartbeat = time.monotonic() + LEASE_HEARTBEAT_SECONDS
+            timeout = self.leader_step() if self.is_leader else EVENT_POLL_SECONDS
+            self.deliver_events()
+            if timeout is None:
+                return 0
+            return min(timeout, EVENT_POLL_SECONDS, self._next_heartbeat - time.monotonic())
+        except Exception as e:
+            print("Erro no scheduler:", e)
+            metrics.inc("trabalho_notifier_errors_total", **self.labels)
+            return LEASE_HEARTBEAT_SECONDS
+        finally:
+            # cada volta do laço conta como um ciclo, inclusive as que voltam ao topo sem dormir
+            metrics.observe("trabalho_notifier_cycle_seconds", time.perf_counter() - cycle_start)
+            metrics.set("trabalho_notifier_backlog", len(self._due_by_id), **self.labels)
+
+    def shutdown(self):
+        """Sai do laço: libera o lease (o próximo processo assume sem esperar o TTL)."""
+        if self in _schedulers:
+            _schedulers.remove(self)
+        if self.is_leader:
+            try:
+                release_lease(self.holder)
+            except Exception as e:
+                print("Erro ao liberar o lease do notificador:", e)
+            self.is_leader = False
+            metrics.set("trabalho_notifier_leader", 0, **self.labels)
+
+    def run(self):
+        _schedulers.append(self)
+        # sem database, segue db.DB (o contexto das threads novas não herda use_database)
+        with use_database(self.database) if self.database else nullcontext():
+            try:
+                while not self.stop_event.is_set():
+                    self._wake.clear()
+                    timeout = self.step()
+                    if timeout > 0:
+                        self._wake.wait(timeout)
+            finally:
+                self.shutdown()
+
+    def stop(self):
+        self.stop_event.set()
+        self._wake.set()
+
+
+class TenantScheduler(threading.Thread):
+    """Notificador de vários tenants em uma só thread: um NotificationScheduler (sem thread
+    própria) por banco, todos acordados pelo mesmo evento. A thread dorme até o prazo mais
+    próximo entre eles. on_due(tenant, events) recebe os eventos de cada tenant."""
+    daemon = True
+
+    def __init__(self, on_due, tenants=()):
+        super().__init__(name="trabalho-tenant-notifier")
+        self.on_due = on_due
+        self.stop_event = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._schedulers = {}  # tenant -> NotificationScheduler
+        for name in tenants:
+            self.add_tenant(name)
+
+    def add_tenant(self, name):
+        """Passa a notificar o tenant (sem efeito se ele já está na lista); devolve o agendador dele."""
+        with self._lock:
+            scheduler = self._schedulers.get(name)
+            if scheduler is None:
+                scheduler = NotificationScheduler(lambda events, name=name: self.on_due(name, events),
+                                                  database=tenant_path(name), wake=self._wake,
+                                                  labels={"tenant": name})
+                self._schedulers[name] = scheduler
+                _schedulers.append(scheduler)
+                self._wake.set()
+        return scheduler
+
+    def remove_tenant(self, name):
+        with self._lock:
+            scheduler = self._schedulers.pop(name, None)
+        if scheduler is not None:
+            with use_database(scheduler.database):
+                scheduler.shutdown()
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                self._wake.clear()
+                timeout = RECONCILE_INTERVAL_SECONDS
+                with self._lock:
+                    schedulers = list(self._schedulers.values())
+                for scheduler in schedulers:
+                    with use_database(scheduler.database):
+                        timeout = min(timeout, scheduler.step())
+                if timeout > 0:
+                    self._wake.wait(timeout)
+        finally:
+            for name in list(self._schedulers):
+                self.remove_tenant(name)
+
+    def stop(self):
+        self.stop_event.set()
+        self._wake.set()
@@ -0,0 +1,47 @@
+"""Modo multi-tenant: um arquivo SQLite por usuário ou equipe.
+
+Cada tenant tem o próprio banco em TENANT_DIR/<nome>.db, com o próprio lock de escrita, log de
+mudanças e lease do notificador; escritas de tenants diferentes não disputam o mesmo lock.
+
+    with use_tenant("equipe-a"):
+        add_task(...)          # grava em tenants/equipe-a.db
+        get_tasks()
+
+A escolha vale para o contexto atual (ver db.use_database): o app web entra no tenant de cada
+requisição, a GUI no da sessão e a linha de comando com --tenant. O esquema é criado na primeira
+abertura do arquivo. Fora de use_tenant tudo continua usando DB, como antes.
+"""
+
+import os
+import re
+from contextlib import contextmanager
+
+from .db import use_database
+
+TENANT_DIR = "tenants"
+TENANT_NAME_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{0,63}")  # vira nome de arquivo: sem barras nem pontos
+
+
+def tenant_path(name):
+    """Arquivo do banco do tenant; ValueError se o nome não é válido."""
+    if not isinstance(name, str) or not TENANT_NAME_RE.fullmatch(name):
+        raise ValueError(f"Tenant inválido: {name!r}")
+    return os.path.join(TENANT_DIR, f"{name}.db")
+
+
+def list_tenants():
+    """Nomes dos tenants que já têm banco em TENANT_DIR."""
+    try:
+        files = os.listdir(TENANT_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(f[:-3] for f in files if f.endswith(".db") and TENANT_NAME_RE.fullmatch(f[:-3]))
+
+
+@contextmanager
+def use_tenant(name):
+    """Dentro do bloco, todo o núcleo trabalha no banco do tenant (criado se ainda não existe)."""
+    path = tenant_path(name)
+    os.makedirs(TENANT_DIR, exist_ok=True)
+    with use_database(path):
+        yield path
@@ -0,0 +1,279 @@
+"""Importação/exportação em lote (CSV e JSONL) e a linha de comando correspondente."""
+
+import argparse
+import csv
+import io
+import json
+import sys
+from contextlib import nullcontext
+
+from . import models, recurrence
+from .archive import archive_stats, archive_tasks, compact_database, vacuum_database
+from .querycache import cache
+from .db import db_execute, get_connection, init_db, transaction
+from .models import _normalize_due, _schedule_reload, get_categories
+from .recurrence import from_ts, normalize_rule
+from .tenants import tenant_path, use_tenant
+from .utils import iso_or_none, parse_datetime_input, to_ts
+
+IMPORT_BATCH_SIZE = 1000  # linhas por executemany na importação em lote
+MAX_IMPORT_ERRORS = 100  # erros detalhados no relatório de importação (o total é sempre contado)
+# as seis primeiras são as do formulário; as outras só o export completo traz (todas opcionais na importação):
+# recurrence/every/byday/cron/until são a regra da série e occurrences, as exceções
+# [[vencimento original, novo vencimento ou null, estado ou null], ...] (texto JSON no CSV)
+TASK_EXPORT_FIELDS = ["title", "description", "due", "priority", "category", "notify", "notified",
+                      "category_description", "recurrence", "every", "byday", "cron", "until", "occurrences"]
+
+
+def _read_records(stream, fmt):
+    """Gera (número da linha, dict) de um arquivo CSV (com cabeçalho) ou JSONL, sem carregar tudo na memória.
+
+    Um arquivo que não está em UTF-8 levanta ValueError (a importação inteira é desfeita)."""
+    try:
+        yield from _parse_records(stream, fmt)
+    except UnicodeDecodeError:
+        raise ValueError("Arquivo não está em UTF-8") from None
+
+
+def _parse_records(stream, fmt):
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_no, None
+                continue
+            yield line_no, record
+    else:
+        raise ValueError(f"Formato desconhecido: {fmt}")
+
+
+def _parse_bool(value, default=True):
+    if value is None or value == "":
+        return default
+    if isinstance(value, (bool, int)):
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in ("1", "true", "sim", "s", "yes", "y"):
+        return True
+    if text in ("0", "false", "não", "nao", "n", "no"):
+        return False
+    raise ValueError(f"Valor de notificação inválido: {value}")
+
+
+def validate_task_record(record):
+    """Converte um registro importado em (title, description, due_iso, priority, category_title, notify).
+
+    Usa as mesmas regras dos formulários: parse_datetime_input para a data e PRIORITIES para a
+    prioridade. Levanta ValueError com a mensagem do problema."""
+    if not isinstance(record, dict):
+        raise ValueError("Registro inválido")
+    title = str(record.get("title") or "").strip()
+    if not title:
+        raise ValueError("Título obrigatório")
+    description = str(record.get("description") or "").strip()
+    due_raw = str(record.get("due") or "").strip()
+    due_dt = parse_datetime_input(due_raw)
+    if due_raw and due_dt is None:
+        raise ValueError(f"Data/hora inválida: {due_raw}")
+    priority = str(record.get("priority") or "Baixa").strip()
+    if priority not in models.PRIORITIES:
+        raise ValueError(f"Prioridade inválida: {priority}")
+    category = str(record.get("category") or "").strip() or None
+    notify = _parse_bool(record.get("notify"))
+    return title, description, iso_or_none(due_dt), priority, category, notify
+
+
+def _record_extras(record, due_iso):
+    """Campos do export completo: (notified, descrição da categoria, regra ou None, exceções).
+
+    A regra é (freq, every, byday, cron, until), validada como em set_recurrence; as exceções,
+    (occurrence_ts, due, state) como em override_occurrence. Levanta ValueError."""
+    notified = _parse_bool(record.get("notified"), default=False)
+    category_description = str(record.get("category_description") or "").strip()
+    freq = str(record.get("recurrence") or "").strip()
+    if not freq:
+        return notified, category_description, None, []
+    if due_iso is None:
+        raise ValueError("Tarefa recorrente precisa de vencimento")
+    rule = (*normalize_rule(freq, record.get("every") or 1, record.get("byday") or None, record.get("cron") or None),
+            _normalize_due(record.get("until") or None))
+    items = record.get("occurrences") or []
+    if isinstance(items, str):
+        try:
+            items = json.loads(items)
+        except ValueError:
+            raise ValueError(f"Exceções inválidas: {items}") from None
+    overrides = []
+    for item in items if isinstance(items, list) else [items]:
+        if not isinstance(item, list) or len(item) != 3:
+            raise ValueError(f"Exceção inválida: {item}")
+        occurrence, due, state = item
+        occurrence_ts = to_ts(_normalize_due(occurrence))
+        if occurrence_ts is None:
+            raise ValueError(f"Exceção sem vencimento original: {item}")
+        if state is not None and state not in recurrence.OCCURRENCE_STATES:
+            raise ValueError(f"Estado inválido: {state}")
+        overrides.append((occurrence_ts, _normalize_due(due), state))
+    return notified, category_description, rule, overrides
+
+
+def import_tasks(stream, fmt="csv"):
+    """Importa tarefas de um arquivo texto (CSV ou JSONL) em uma única transação.
+
+    As linhas válidas são inseridas em lotes de IMPORT_BATCH_SIZE com executemany; categorias
+    citadas que ainda não existem são criadas pelo título. Retorna um relatório:
+    {"imported": n, "categories_created": n, "error_count": n, "errors": [(linha, mensagem), ...]}.
+    """
+    report = {"imported": 0, "categories_created": 0, "error_count": 0, "errors": []}
+    batch = []
+
+    def flush():
+        db_execute("INSERT INTO tasks(title,description,due,priority,category_id,notify,notified) VALUES(?,?,?,?,?,?,?)",
+                   batch, many=True)
+        report["imported"] += len(batch)
+        batch.clear()
+
+    with transaction():
+        cat_ids = {title: cat_id for cat_id, title, _ in get_categories()}
+        for line_no, record in _read_records(stream, fmt):
+            try:
+                title, description, due_iso, priority, category, notify = validate_task_record(record)
+                notified, category_description, rule, overrides = _record_extras(record, due_iso)
+            except ValueError as e:
+                report["error_count"] += 1
+                if len(report["errors"]) < MAX_IMPORT_ERRORS:
+                    report["errors"].append((line_no, str(e)))
+                continue
+            cat_id = None
+            if category:
+                cat_id = cat_ids.get(category)
+                if cat_id is None:
+                    cat_id = cat_ids[category] = db_execute(
+                        "INSERT INTO categories(title,description) VALUES(?,?)", (category, category_description))
+                    report["categories_created"] += 1
+            row = (title, description, due_iso, priority, cat_id, 1 if notify else 0, 1 if notified else 0)
+            if rule is None:
+                batch.append(row)
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    flush()
+                continue
+            # série: inserida sozinha (precisa do id para a regra), depois das anteriores, na ordem do arquivo
+            if batch:
+                flush()
+            task_id = db_execute("""INSERT INTO tasks(title,description,due,priority,category_id,notify,notified)
+                                    VALUES(?,?,?,?,?,?,?)""", row)
+            db_execute("INSERT INTO task_recurrence(task_id, freq, every, byday, cron, until) VALUES(?,?,?,?,?,?)",
+                       (task_id, *rule))
+            if overrides:
+                db_execute("INSERT INTO task_occurrences(task_id, occurrence_ts, due, state) VALUES(?,?,?,?)",
+                           [(task_id, *o) for o in overrides], many=True)
+            report["imported"] += 1
+        if batch:
+            flush()
+    if report["imported"]:
+        cache.invalidate_tables("tasks", "categories")
+        _schedule_reload()
+    return report
+
+
+def export_tasks(fmt="csv"):
+    """Gera o conteúdo do export (CSV com cabeçalho ou JSONL) linha a linha, lendo direto do cursor.
+
+    O formato é o mesmo aceito por import_tasks, e a volta não perde nada: vencimento como
+    gravado (com segundos), notified, descrição da categoria e a regra das séries com as exceções."""
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Formato desconhecido: {fmt}")
+    overrides = {}  # exceções das séries (poucas): lidas antes, para o cursor das tarefas seguir sozinho
+    for task_id, occurrence_ts, due, state in db_execute(
+            "SELECT task_id, occurrence_ts, due, state FROM task_occurrences ORDER BY task_id, occurrence_ts",
+            fetch=True):
+        overrides.setdefault(task_id, []).append([iso_or_none(from_ts(occurrence_ts)), due, state])
+    cursor = get_connection().execute("""SELECT t.id, t.title, t.description, t.due, t.priority, c.title, t.notify,
+                                                t.notified, c.description, r.freq, r.every, r.byday, r.cron, r.until
+                                         FROM tasks t LEFT JOIN categories c ON t.category_id = c.id
+                                         LEFT JOIN task_recurrence r ON r.task_id = t.id
+                                         ORDER BY t.id""")
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if fmt == "csv":
+        writer.writerow(TASK_EXPORT_FIELDS)
+    for (task_id, title, description, due, priority, category, notify, notified, category_description,
+         freq, every, byday, cron, until) in cursor:
+        occurrences = overrides.get(task_id, [])
+        if fmt == "csv":
+            occurrences = json.dumps(occurrences) if occurrences else ""
+        values = [title, description or "", due or "", priority, category or "", 1 if notify else 0,
+                  1 if notified else 0, category_description or "", freq or "", every or "", byday or "",
+                  cron or "", until or "", occurrences]
+        if fmt == "csv":
+            writer.writerow(values)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        else:
+            yield json.dumps(dict(zip(TASK_EXPORT_FIELDS, values)), ensure_ascii=False) + "\n"
+
+
+def cli(argv):
+    """Linha de comando: python trabalho.py [--tenant NOME] import ARQUIVO | export [ARQUIVO] | archive
+    (sem argumentos abre a GUI)."""
+    parser = argparse.ArgumentParser(prog="trabalho.py", description="Importação/exportação em lote de tarefas")
+    parser.add_argument("--tenant", help="usa o banco do tenant (tarefas.tenants) em vez de DB")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="importa tarefas de um arquivo CSV ou JSONL")
+    imp.add_argument("file")
+    imp.add_argument("--format", choices=["csv", "jsonl"])
+    exp = sub.add_parser("export", help="exporta todas as tarefas (padrão: saída padrão)")
+    exp.add_argument("file", nargs="?")
+    exp.add_argument("--format", choices=["csv", "jsonl"])
+    arc = sub.add_parser("archive", help="move as tarefas antigas para archived_tasks e compacta o banco")
+    arc.add_argument("--vacuum", action="store_true",
+                     help="VACUUM completo no fim (ativa auto_vacuum=INCREMENTAL em bancos antigos)")
+    args = parser.parse_args(argv)
+    if args.tenant:
+        try:
+            tenant_path(args.tenant)
+        except ValueError as e:
+            parser.error(str(e))
+    with use_tenant(args.tenant) if args.tenant else nullcontext():
+        return _run_command(args)
+
+
+def _run_command(args):
+    init_db()
+    if args.command == "archive":
+        moved = archive_tasks()
+        compact_database()
+        if args.vacuum:
+            vacuum_database()
+        stats = archive_stats()
+        print(f"{moved} tarefas arquivadas; {stats['hot']} ativas, {stats['archived']} arquivadas")
+        return 0
+    fmt = args.format or ("jsonl" if (args.file or "").endswith((".jsonl", ".ndjson")) else "csv")
+    if args.command == "import":
+        try:
+            with open(args.file, encoding="utf-8-sig", newline="") as f:
+                report = import_tasks(f, fmt)
+        except ValueError as e:
+            print(f"Erro: {e}", file=sys.stderr)
+            return 1
+        print(f"{report['imported']} tarefas importadas, {report['categories_created']} categorias criadas, "
+              f"{report['error_count']} erros")
+        for line_no, msg in report["errors"]:
+            print(f"  linha {line_no}: {msg}")
+        return 1 if report["error_count"] else 0
+    out = open(args.file, "w", encoding="utf-8", newline="") if args.file else sys.stdout
+    try:
+        for chunk in export_tasks(fmt):
+            out.write(chunk)
+    finally:
+        if args.file:
+            out.close()
+    return 0
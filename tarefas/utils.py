@@ -0,0 +1,56 @@
+"""Conversão de datas: entrada do usuário, ISO, timestamps (due_ts) e exibição."""
+
+import calendar
+from datetime import datetime
+
+
+def parse_datetime_input(text):
+    """Esperado: 'YYYY-MM-DD HH:MM', 'YYYY-MM-DDTHH:MM' (do datetime-local) ou '' para None.
+    Os segundos são opcionais (o export grava o vencimento como está no banco)."""
+    text = text.strip()
+    if not text:
+        return None
+    # Com 'T' vem do datetime-local; com espaço, manual/antigo ou de um export
+    sep = 'T' if 'T' in text else ' '
+    for fmt in (f"%Y-%m-%d{sep}%H:%M", f"%Y-%m-%d{sep}%H:%M:%S"):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    return None
+
+
+def iso_or_none(dt):
+    # Para o banco, ainda usamos o padrão com espaço
+    return dt.isoformat(sep=' ') if dt else None
+
+
+def _parse_due(due_iso):
+    if not due_iso:
+        return None
+    try:
+        return datetime.fromisoformat(due_iso)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_ts(value):
+    """Vencimento -> inteiro (segundos desde a época) comparável com a coluna due_ts.
+
+    Aceita datetime ou texto ISO. O horário é tratado como horário de parede, sem fuso,
+    igual ao strftime('%s', due) do SQLite, então os dois lados sempre batem."""
+    if isinstance(value, str):
+        value = _parse_due(value)
+    if value is None:
+        return None
+    return calendar.timegm(value.timetuple())
+
+
+def format_due_iso(s):
+    if not s:
+        return "Sem data"
+    try:
+        dt = datetime.fromisoformat(s)
+        return dt.strftime("%Y-%m-%d %H:%M")
+    except Exception:
+        return s
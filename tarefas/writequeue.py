@@ -0,0 +1,179 @@
+"""Fila de escrita com commit em grupo (opcional).
+
+Cada add_task/update_task/delete_task chamado direto faz o próprio commit, e cada commit é um
+fsync. Com a fila, as escritas vão para uma thread única que junta o que chegou em poucos
+milissegundos (ou WRITE_BATCH_MAX operações) em uma transação só:
+
+    q = get_write_queue()
+    future = q.add_task("título", "", "2030-01-01 10:00:00", "Baixa", None)
+    task_id = future.result()   # resolve depois do commit, com o id ou a exceção da operação
+
+Cada operação roda em um SAVEPOINT próprio: se uma falhar, só ela é desfeita e o resto do lote
+é gravado. Com a fila cheia, submit() espera até WRITE_QUEUE_TIMEOUT_SECONDS e levanta queue.Full.
+A operação grava no banco de quem a enfileirou (db.current_db(), ex.: o tenant da requisição);
+um lote com vários bancos vira uma transação por banco.
+"""
+
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from . import models
+from .db import current_db, db_execute, get_connection, transaction, use_database
+from .instrument import metrics
+
+WRITE_BATCH_MAX = 256  # operações por transação
+WRITE_BATCH_DELAY_SECONDS = 0.005  # quanto o escritor espera por mais operações depois da primeira
+WRITE_QUEUE_MAX = 10_000  # operações pendentes antes de submit() bloquear
+WRITE_QUEUE_TIMEOUT_SECONDS = 5.0  # espera máxima de submit() com a fila cheia (None = sem limite)
+# PRAGMA synchronous da conexão do escritor: "full" (fsync a cada commit), "normal" (padrão do
+# WAL: um commit pode se perder numa queda de energia, nunca corrompe) ou "off" (sem fsync)
+WRITE_DURABILITY = "normal"
+DURABILITY_MODES = {"full": "FULL", "normal": "NORMAL", "off": "OFF"}
+
+metrics.describe("trabalho_write_queue_depth", "gauge", "Operações esperando na fila de escrita.")
+metrics.describe("trabalho_write_batches_total", "counter", "Transações feitas pelo escritor da fila.")
+metrics.describe("trabalho_write_ops_total", "counter", "Operações gravadas pela fila, por resultado.")
+metrics.describe("trabalho_write_batch_seconds", "histogram", "Duração de cada lote, do BEGIN ao commit.")
+metrics.describe("trabalho_write_queue_rejected_total", "counter", "Operações recusadas com a fila cheia.")
+
+_STOP = object()
+
+
+class WriteQueue(threading.Thread):
+    """Escritor único: consome a fila e grava as operações em lotes, uma transação por lote."""
+    daemon = True
+
+    def __init__(self, maxsize=None):
+        super().__init__(name="trabalho-writer")
+        self._queue = queue.Queue(WRITE_QUEUE_MAX if maxsize is None else maxsize)
+        self._durability = {}  # banco -> (id da conexão do escritor, modo já aplicado nela)
+
+    def submit(self, fn, *args, **kwargs):
+        """Enfileira fn(*args, **kwargs) para o escritor; devolve um Future com o retorno de fn."""
+        future = Future()
+        try:
+            self._queue.put((fn, args, kwargs, future, current_db()), timeout=WRITE_QUEUE_TIMEOUT_SECONDS)
+        except queue.Full:
+            metrics.inc("trabalho_write_queue_rejected_total")
+            raise
+        metrics.set("trabalho_write_queue_depth", self._queue.qsize())
+        return future
+
+    def add_task(self, *args, **kwargs):
+        return self.submit(models.add_task, *args, **kwargs)
+
+    def update_task(self, *args, **kwargs):
+        return self.submit(models.update_task, *args, **kwargs)
+
+    def delete_task(self, *args, **kwargs):
+        return self.submit(models.delete_task, *args, **kwargs)
+
+    def flush(self):
+        """Espera tudo o que já foi enfileirado ser gravado."""
+        self.submit(lambda: None).result()
+
+    def stop(self):
+        """Grava o que falta na fila e encerra a thread."""
+        if self.is_alive():
+            self._queue.put(_STOP)
+            self.join()
+
+    def run(self):
+        while True:
+            batch, stopping = self._next_batch()
+            if batch:
+                self.write_batch(batch)
+            if stopping:
+                return
+
+    def _next_batch(self):
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + WRITE_BATCH_DELAY_SECONDS
+        while len(batch) < WRITE_BATCH_MAX:
+            try:
+                # o que já está na fila entra sem esperar; depois, só até o prazo
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _apply_durability(self, conn):
+        # por id da conexão: o pool pode fechar a do escritor e abrir outra para o mesmo banco
+        if self._durability.get(current_db()) != (id(conn), WRITE_DURABILITY):
+            conn.execute(f"PRAGMA synchronous={DURABILITY_MODES[WRITE_DURABILITY]}")
+            self._durability[current_db()] = (id(conn), WRITE_DURABILITY)
+
+    def write_batch(self, batch):
+        """Grava o lote, uma transação por banco, e resolve os futures depois de cada commit."""
+        metrics.set("trabalho_write_queue_depth", self._queue.qsize())
+        # cancelados antes de começar não rodam
+        batch = [item for item in batch if item[3].set_running_or_notify_cancel()]
+        by_database = {}
+        for item in batch:
+            by_database.setdefault(item[4], []).append(item)
+        for database, items in by_database.items():
+            with use_database(database):
+                self._write_database_batch(items)
+
+    def _write_database_batch(self, batch):
+        results = []
+        start = time.perf_counter()
+        try:
+            self._apply_durability(get_connection())
+            with transaction():
+                for fn, args, kwargs, _, _ in batch:
+                    db_execute("SAVEPOINT write_op")
+                    try:
+                        results.append((True, fn(*args, **kwargs)))
+                    except Exception as e:
+                        db_execute("ROLLBACK TO write_op")
+                        results.append((False, e))
+                    db_execute("RELEASE write_op")
+        except Exception as e:
+            # o commit (ou o BEGIN) falhou: nada do lote foi gravado
+            metrics.inc("trabalho_write_ops_total", len(batch), result="error")
+            for item in batch:
+                item[3].set_exception(e)
+            return
+        finally:
+            metrics.observe("trabalho_write_batch_seconds", time.perf_counter() - start)
+            metrics.inc("trabalho_write_batches_total")
+        for (_, _, _, future, _), (ok, value) in zip(batch, results):
+            metrics.inc("trabalho_write_ops_total", result="ok" if ok else "error")
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue():
+    """Fila de escrita do processo, criada e iniciada na primeira chamada (esvaziada ao sair)."""
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None or not _write_queue.is_alive():
+            _write_queue = WriteQueue()
+            _write_queue.start()
+            atexit.register(_write_queue.stop)
+    return _write_queue
+
+
+def stop_write_queue():
+    """Grava o que está pendente e encerra a fila do processo."""
+    global _write_queue
+    with _write_queue_lock:
+        q, _write_queue = _write_queue, None
+    if q is not None:
+        q.stop()
@@ -0,0 +1,28 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tarefas  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Banco novo em tmp_path (tenants em tmp_path/tenants); nunca toca o tasks.db do projeto."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tarefas, "DB", str(tmp_path / "tasks.db"))
+    monkeypatch.setattr(tarefas, "TENANT_DIR", str(tmp_path / "tenants"))
+    tarefas.init_db()
+    yield tmp_path
+    tarefas.close_connection()
+
+
+@pytest.fixture
+def web(db, monkeypatch):
+    """Cliente de teste do app web (sem tenants) sobre o banco de db."""
+    app_module = importlib.import_module("app")
+    monkeypatch.setattr(app_module, "TENANTS_ENABLED", False)
+    return app_module.app.test_client()
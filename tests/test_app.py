@@ -0,0 +1,63 @@
+import importlib
+from datetime import datetime
+
+import pytest
+
+import tarefas
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setenv("TASKS_TENANTS", "1")
+    app_module = importlib.import_module("app")
+    monkeypatch.setattr(app_module, "TENANTS_ENABLED", True)
+    return app_module.app.test_client()
+
+
+@pytest.mark.parametrize("url", ["/api/export?format=csv", "/api/export?format=jsonl",
+                                 "/api/tasks?format=ndjson", "/api/tasks?all=1", "/?all=1"])
+def test_streamed_routes_read_the_tenant_database(client, url):
+    tarefas.add_task("DEFAULT-DB-SECRET", "", None, "Baixa", None)
+    with tarefas.use_tenant("alice"):
+        tarefas.add_task("alice-task", "", None, "Baixa", None)
+    body = client.get(url + "&tenant=alice").get_data(as_text=True)
+    assert "alice-task" in body
+    assert "DEFAULT-DB-SECRET" not in body
+
+
+@pytest.mark.parametrize("url", ["/?archived=1", "/?archived=1&all=1"])
+def test_archived_rows_are_read_only_and_restorable(web, url):
+    live = tarefas.add_task("ativa", "", "2020-01-02 10:00:00", "Baixa", None, notify=False)
+    old = tarefas.add_task("antiga", "", "2020-01-01 10:00:00", "Baixa", None, notify=False)
+    tarefas.archive_tasks(datetime(2030, 1, 1))
+    tarefas.restore_tasks([live])
+    body = web.get(url).get_data(as_text=True)
+    assert f'/edit_task/{live}"' in body and f'value="{live}"' in body
+    assert f'/edit_task/{old}"' not in body and f'value="{old}"' not in body
+    assert f'/restore_task/{old}"' in body
+    assert web.get(f"/edit_task/{old}").headers["Location"].endswith("/?archived=1")
+    assert web.post(f"/restore_task/{old}").status_code == 302
+    assert tarefas.get_task(old) is not None
+
+
+def test_alert_feed_reads_the_event_table_only_for_a_gap(web):
+    app_module = importlib.import_module("app")
+    tarefas.publish_notifications([(1, "antiga", "2030-01-01 10:00:00", "Baixa")])
+    feed = app_module.AlertFeed()
+    feed.delivered_seq = tarefas.latest_notification_seq()
+    statements = []
+    conn = tarefas.get_connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        # em dia com o feed: nada a ler, o próximo alerta chega por queue()
+        assert feed.after(feed.delivered_seq) == []
+        assert statements == []
+        # retomando de antes: a lacuna vem da tabela de eventos, sem segurar cond
+        assert [a["title"] for _, a in feed.after(0)] == ["antiga"]
+    finally:
+        conn.set_trace_callback(None)
+    # sem notificador neste processo, toda leitura vai à tabela
+    idle = app_module.AlertFeed(live=False)
+    idle.delivered_seq = feed.delivered_seq
+    tarefas.publish_notifications([(2, "de outro processo", "2030-01-01 10:00:00", "Alta")])
+    assert [a["title"] for _, a in idle.after(idle.delivered_seq)] == ["de outro processo"]
@@ -0,0 +1,17 @@
+from datetime import datetime
+
+import tarefas
+
+
+def test_pending_alerts_are_not_archived(db):
+    now = datetime(2030, 1, 1)
+    pending = tarefas.add_task("alerta pendente", "", "2020-01-01 10:00:00", "Alta", None, notify=True)
+    silent = tarefas.add_task("sem alerta", "", "2020-01-01 10:00:00", "Alta", None, notify=False)
+    alerted = tarefas.add_task("avisada", "", "2020-01-01 10:00:00", "Alta", None, notify=True)
+    tarefas.set_task_notified(alerted)
+    assert tarefas.archive_tasks(now) == 2
+    assert [r[0] for r in tarefas.get_tasks()] == [pending]
+    assert tarefas.claim_due_notifications(now)[0][0] == pending
+    # depois do alerta, a regra de idade a alcança
+    assert tarefas.archive_tasks(now) == 1
+    assert {r[0] for r in tarefas.get_tasks(include_archived=True)} == {pending, silent, alerted}
@@ -0,0 +1,54 @@
+import threading
+
+import tarefas
+from tarefas import db as dbmod
+
+
+def test_query_labels_tell_queries_apart_and_stay_bounded(monkeypatch):
+    columns = "SELECT t.id, t.title, t.description, t.due, t.priority, c.title, t.notify, t.notified " * 4
+    a = dbmod._query_label(columns + "FROM tasks t WHERE t.id = ?")
+    b = dbmod._query_label(columns + "FROM tasks t WHERE t.priority = ?")
+    assert a != b
+    assert "FROM tasks t WHERE" in a
+    assert (dbmod._query_label("SELECT id FROM tasks WHERE id IN (?,?,?)")
+            == dbmod._query_label("SELECT id FROM tasks WHERE id IN (?, ?)"))
+    monkeypatch.setattr(tarefas, "QUERY_LABELS_MAX", len(dbmod._label_values))
+    assert dbmod._query_label("SELECT 1 FROM tasks WHERE title = 'nova'") == "other"
+
+
+def _gauge(name):
+    for line in tarefas.metrics.render().splitlines():
+        if line.startswith(name + " "):
+            return float(line.split()[1])
+    return 0.0
+
+
+def test_connections_of_finished_threads_are_reused(db):
+    opened = _gauge("trabalho_db_connections_opened_total")
+    for _ in range(20):
+        thread = threading.Thread(target=tarefas.get_tasks)
+        thread.start()
+        thread.join()
+    # uma conexão só, passada de uma thread encerrada para a seguinte
+    assert _gauge("trabalho_db_connections_opened_total") - opened == 1
+    assert [path for path, _, _ in dbmod._idle].count(tarefas.DB) == 1
+
+
+def test_open_gauge_counts_released_connections(db, monkeypatch):
+    monkeypatch.setattr(tarefas, "DB_IDLE_CONNECTIONS", 2)
+    before = _gauge("trabalho_db_connections_open")
+    barrier = threading.Barrier(6)
+
+    def work():
+        tarefas.get_tasks()
+        barrier.wait()
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # seis conexões ao mesmo tempo; depois, só as DB_IDLE_CONNECTIONS guardadas continuam abertas
+    idle = sum(1 for path, _, _ in dbmod._idle if path == tarefas.DB)
+    assert idle <= 2
+    assert _gauge("trabalho_db_connections_open") - before <= 2
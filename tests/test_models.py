@@ -0,0 +1,17 @@
+import tarefas
+
+
+def test_delete_task_prunes_tombstones_in_the_same_commit(db, monkeypatch):
+    monkeypatch.setattr(tarefas, "TOMBSTONE_RETENTION_REVS", 0)
+    first = tarefas.add_task("a", "", None, "Baixa", None)
+    second = tarefas.add_task("b", "", None, "Baixa", None)
+    tarefas.delete_task(first)
+    statements = []
+    conn = tarefas.get_connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        tarefas.delete_task(second)
+    finally:
+        conn.set_trace_callback(None)
+    assert [s for s in statements if s.startswith(("BEGIN", "COMMIT"))] == ["BEGIN IMMEDIATE", "COMMIT"]
+    assert tarefas.db_execute("SELECT task_id FROM task_changes WHERE deleted = 1", fetch=True) == []
@@ -0,0 +1,50 @@
+import threading
+from collections import Counter
+from datetime import datetime
+
+import tarefas
+
+NOW = datetime(2030, 6, 1, 12, 0)
+
+
+def _race(n_threads, claim):
+    """Roda claim() em n_threads threads ao mesmo tempo (cada uma com a sua conexão) e junta o que cada uma pegou."""
+    barrier = threading.Barrier(n_threads)
+    claimed, errors = [], []
+
+    def worker():
+        try:
+            barrier.wait()
+            for _ in range(5):
+                claimed.extend(claim())
+        except Exception as e:  # noqa: BLE001 - a falha aparece no assert abaixo
+            errors.append(e)
+        finally:
+            tarefas.close_connection()
+
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    return claimed
+
+
+def test_concurrent_claimers_get_each_due_task_once(db):
+    due = [tarefas.add_task(f"t{i}", "", "2030-06-01 10:00:00", "Baixa", None) for i in range(200)]
+    tarefas.add_task("futura", "", "2030-06-02 10:00:00", "Baixa", None)
+    tarefas.add_task("sem aviso", "", "2030-06-01 10:00:00", "Baixa", None, notify=False)
+    claimed = _race(8, lambda: [r[0] for r in tarefas.claim_due_notifications(NOW)])
+    assert Counter(claimed) == Counter(due)
+
+
+def test_concurrent_claimers_get_each_occurrence_once(db):
+    series = []
+    for i in range(20):
+        task_id = tarefas.add_task(f"s{i}", "", "2030-05-01 09:00:00", "Baixa", None)
+        tarefas.set_recurrence(task_id, "daily")
+        series.append(task_id)
+    claimed = _race(8, lambda: [r[0] for r in tarefas.claim_due_occurrences(NOW)[0]])
+    # uma entrega por série: a ocorrência de hoje, 09:00
+    assert Counter(claimed) == Counter(series)
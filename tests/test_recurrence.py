@@ -0,0 +1,166 @@
+from datetime import datetime
+from itertools import islice
+
+import pytest
+
+import tarefas
+from tarefas.recurrence import from_ts, normalize_rule, occurrences, parse_cron, series_occurrences
+
+
+def test_recurrence_clock_moves_when_an_occurrence_passes(db):
+    task_id = tarefas.add_task("diária", "", "2030-01-01 10:00:00", "Baixa", None)
+    tarefas.set_recurrence(task_id, "daily")
+    before, after = datetime(2030, 1, 5, 9, 59), datetime(2030, 1, 5, 10, 1)
+    # só a ocorrência das 10:00 passou: tasks não mudou, o relógio das séries mudou
+    assert tarefas.last_passed_due(before) == tarefas.last_passed_due(after)
+    assert tarefas.recurrence_clock(before)[0] == tarefas.recurrence_clock(after)[0]
+    assert tarefas.recurrence_clock(before)[1] < tarefas.recurrence_clock(after)[1]
+    assert tarefas.recurrence_clock(after)[1] == tarefas.to_ts(datetime(2030, 1, 5, 10, 0))
+    # a janela anda à meia-noite
+    assert tarefas.recurrence_clock(datetime(2030, 1, 6, 0, 1))[0] != tarefas.recurrence_clock(after)[0]
+
+
+def test_recurrence_clock_is_cached_until_the_next_occurrence(db):
+    task_id = tarefas.add_task("diária", "", "2030-01-01 10:00:00", "Baixa", None)
+    tarefas.set_recurrence(task_id, "daily")
+    clock = tarefas.recurrence_clock(datetime(2030, 1, 5, 10, 1))
+    statements = []
+    conn = tarefas.get_connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        # o GET condicional seguinte não expande as séries
+        assert tarefas.recurrence_clock(datetime(2030, 1, 5, 18, 0)) == clock
+    finally:
+        conn.set_trace_callback(None)
+    assert statements == []
+    assert tarefas.recurrence_clock(datetime(2030, 1, 6, 10, 1))[1] > clock[1]
+    # mudar a regra invalida o relógio
+    tarefas.set_recurrence(task_id, "cron", cron="30 10 * * *")
+    assert tarefas.recurrence_clock(datetime(2030, 1, 6, 10, 1))[1] == tarefas.to_ts(datetime(2030, 1, 5, 10, 30))
+
+
+# ---------- funções puras (tarefas.recurrence) ----------
+def first(n, freq, every=1, byday=None, cron=None, start=None, until=None, after=None):
+    return list(islice(occurrences(freq, every, byday, cron, start, until, after), n))
+
+
+def test_parse_cron_ranges_steps_and_sunday():
+    minutes, hours, doms, months, dows, dom_any, dow_any = parse_cron("*/15 9-17 * * 1-5")
+    assert minutes == {0, 15, 30, 45}
+    assert hours == set(range(9, 18))
+    assert doms == set(range(1, 32)) and months == set(range(1, 13))
+    assert dows == {1, 2, 3, 4, 5}
+    assert (dom_any, dow_any) == (True, False)
+    assert parse_cron("5/20 0 * * 7")[0] == {5, 25, 45}
+    assert parse_cron("0 0 * * 7")[4] == {0}  # 7 também é domingo
+
+
+@pytest.mark.parametrize("expr", ["", "* * * *", "60 * * * *", "*/0 * * * *", "5-3 * * * *", "x * * * *",
+                                  "0 0 0 * *", "0 0 * 13 *"])
+def test_parse_cron_rejects_invalid(expr):
+    with pytest.raises(ValueError):
+        parse_cron(expr)
+
+
+def test_normalize_rule():
+    assert normalize_rule("weekly", "2", "4,0,4") == ("weekly", 2, "0,4", None)
+    assert normalize_rule("cron", 5, cron=" 0  9 * * 1 ") == ("cron", 1, None, "0 9 * * 1")
+    for args in (("yearly",), ("daily", -1), ("weekly", 1, "7")):
+        with pytest.raises(ValueError):
+            normalize_rule(*args)
+
+
+def test_monthly_skips_months_without_the_day():
+    start = datetime(2030, 1, 31, 9)
+    assert first(4, "monthly", start=start) == [datetime(2030, m, 31, 9) for m in (1, 3, 5, 7)]
+    leap = datetime(2028, 2, 29, 8)
+    assert first(2, "monthly", every=12, start=leap) == [leap, datetime(2032, 2, 29, 8)]
+
+
+def test_intervals_stay_anchored_on_the_start():
+    # a cada 2 meses a partir de janeiro: depois de fevereiro vem março, não fevereiro
+    assert first(2, "monthly", every=2, start=datetime(2030, 1, 15), after=datetime(2030, 2, 1)) == [
+        datetime(2030, 3, 15), datetime(2030, 5, 15)]
+    # a cada 3 dias: o salto até `after` é calculado a partir do início
+    assert first(2, "daily", every=3, start=datetime(2030, 1, 1, 7), after=datetime(2030, 1, 5)) == [
+        datetime(2030, 1, 7, 7), datetime(2030, 1, 10, 7)]
+    # semanas alternadas, segunda e sexta, contadas da semana do início (quarta, 2030-01-02)
+    assert first(4, "weekly", every=2, byday="0,4", start=datetime(2030, 1, 2, 9), after=datetime(2030, 1, 8)) == [
+        datetime(2030, 1, 14, 9), datetime(2030, 1, 18, 9), datetime(2030, 1, 28, 9), datetime(2030, 2, 1, 9)]
+
+
+def test_never_before_start_and_until_is_inclusive():
+    start = datetime(2030, 1, 2, 9)  # quarta: a segunda da mesma semana fica de fora
+    assert first(1, "weekly", byday="0,2", start=start) == [start]
+    assert list(occurrences("daily", 1, None, None, start, until=datetime(2030, 1, 4, 9))) == [
+        start, datetime(2030, 1, 3, 9), datetime(2030, 1, 4, 9)]
+
+
+def test_wall_clock_hour_survives_dst_changes():
+    # horário de parede, sem fuso: 09:00 continua 09:00 nas trocas de horário de verão
+    days = list(occurrences("daily", 1, None, None, datetime(2030, 3, 29, 9), until=datetime(2030, 4, 2, 9)))
+    assert [d.hour for d in days] == [9] * 5
+    assert [tarefas.to_ts(b) - tarefas.to_ts(a) for a, b in zip(days, days[1:])] == [86400] * 4
+    assert from_ts(tarefas.to_ts(datetime(2030, 10, 27, 2, 30))) == datetime(2030, 10, 27, 2, 30)
+
+
+def test_cron_day_of_month_or_weekday_and_month_end():
+    # com dia do mês e da semana restritos, basta um casar (dia 13 ou sexta)
+    assert first(3, "cron", cron="0 9 13 * 5", start=datetime(2030, 1, 1)) == [
+        datetime(2030, 1, 4, 9), datetime(2030, 1, 11, 9), datetime(2030, 1, 13, 9)]
+    assert first(3, "cron", cron="30 12 31 * *", start=datetime(2030, 1, 1)) == [
+        datetime(2030, m, 31, 12, 30) for m in (1, 3, 5)]
+    # nunca casa: a busca para em CRON_SEARCH_DAYS em vez de girar para sempre
+    assert first(1, "cron", cron="0 0 30 2 *", start=datetime(2030, 1, 1)) == []
+
+
+def test_series_occurrences_applies_overrides():
+    start = datetime(2030, 1, 1, 9)
+    ts = [tarefas.to_ts(datetime(2030, 1, d, 9)) for d in range(1, 6)]
+    overrides = {
+        ts[1]: (None, "done"),                      # 02: concluída
+        ts[2]: (None, "cancelled"),                 # 03: pulada
+        ts[3]: ("2030-01-05 18:00:00", None),       # 04: remarcada para depois da 05
+        ts[4]: ("2031-01-01 09:00:00", None),       # 05: remarcada para fora da janela
+    }
+    until = datetime(2030, 1, 5, 23)
+    found = list(series_occurrences("daily", 1, None, None, start, until, overrides, ts[0], ts[4] + 86400))
+    assert found == [(ts[0], ts[0], "2030-01-01 09:00:00"),
+                     (tarefas.to_ts(datetime(2030, 1, 5, 18)), ts[3], "2030-01-05 18:00:00")]
+
+
+# ---------- exceções gravadas (tarefas.models) ----------
+def _dues(task_id):
+    rows = tarefas.get_tasks(due_from="2030-01-01 00:00:00", due_to="2030-01-05 23:59:00")
+    return [r[3] for r in rows if r[0] == task_id]
+
+
+def test_override_and_complete_occurrence(db):
+    task_id = tarefas.add_task("diária", "", "2030-01-01 09:00:00", "Baixa", None)
+    tarefas.set_recurrence(task_id, "daily")
+    assert len(_dues(task_id)) == 5
+    tarefas.complete_occurrence(task_id, "2030-01-02 09:00:00")
+    tarefas.override_occurrence(task_id, datetime(2030, 1, 3, 9), due="2030-01-03 15:30")
+    assert _dues(task_id) == ["2030-01-01 09:00:00", "2030-01-03 15:30:00", "2030-01-04 09:00:00",
+                              "2030-01-05 09:00:00"]
+    # sem due nem state, a exceção sai e a ocorrência volta ao normal
+    tarefas.override_occurrence(task_id, "2030-01-02 09:00:00")
+    assert "2030-01-02 09:00:00" in _dues(task_id)
+    with pytest.raises(ValueError):
+        tarefas.override_occurrence(task_id, "2030-01-02 09:00:00", state="adiada")
+    with pytest.raises(ValueError):
+        tarefas.override_occurrence(task_id, "ontem", state="done")
+
+
+def test_clearing_the_due_date_drops_the_rule_in_the_same_commit(db):
+    task_id = tarefas.add_task("diária", "", "2030-01-01 10:00:00", "Baixa", None)
+    tarefas.set_recurrence(task_id, "daily")
+    statements = []
+    conn = tarefas.get_connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        tarefas.update_task(task_id, "diária", "", None, "Baixa", None, False)
+    finally:
+        conn.set_trace_callback(None)
+    assert [s for s in statements if s.startswith(("BEGIN", "COMMIT"))] == ["BEGIN IMMEDIATE", "COMMIT"]
+    assert tarefas.get_recurrence(task_id) is None
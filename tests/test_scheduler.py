@@ -0,0 +1,63 @@
+import threading
+import time
+
+import tarefas
+
+
+def test_follower_keeps_no_heap(db):
+    follower = tarefas.NotificationScheduler(lambda events: None)
+    leader = tarefas.NotificationScheduler(lambda events: None)
+    leader.update_leadership()
+    assert leader.is_leader
+    follower.update_leadership()
+    assert not follower.is_leader
+    for i in range(1000):
+        due = f"2030-01-01 10:{i % 60:02d}:00"
+        follower.reschedule(i, due)
+        leader.reschedule(i, due)
+    follower.reschedule(1, None)
+    assert follower._heap == [] and follower._due_by_id == {}
+    assert len(leader._due_by_id) == 1000
+
+
+def test_one_holder_wins_the_lease_race(db):
+    barrier = threading.Barrier(8)
+    won = []
+
+    def contender(holder):
+        barrier.wait()
+        if tarefas.acquire_lease(holder):
+            won.append(holder)
+        tarefas.close_connection()
+
+    threads = [threading.Thread(target=contender, args=(f"p{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(won) == 1
+    assert tarefas.lease_holder()[0] == won[0]
+
+
+def test_expired_lease_is_taken_over(db, monkeypatch):
+    monkeypatch.setattr(tarefas, "LEASE_TTL_SECONDS", 0.2)
+    first = tarefas.NotificationScheduler(lambda events: None)
+    second = tarefas.NotificationScheduler(lambda events: None)
+    first.update_leadership()
+    first.reschedule(1, "2030-01-01 10:00:00")
+    # o segundo processo, com a sua conexão, não toma um lease válido
+    taken = []
+    thread = threading.Thread(target=lambda: (second.update_leadership(), taken.append(second.is_leader),
+                                              tarefas.close_connection()))
+    thread.start()
+    thread.join()
+    assert first.is_leader and taken == [False]
+    # o primeiro para de renovar (processo travado): depois do TTL o segundo assume
+    time.sleep(0.25)
+    thread = threading.Thread(target=lambda: (second.update_leadership(), tarefas.close_connection()))
+    thread.start()
+    thread.join()
+    assert second.is_leader and tarefas.lease_holder()[0] == second.holder
+    # ao voltar, o antigo líder vê que perdeu o lease e larga o heap
+    first.update_leadership()
+    assert not first.is_leader and first._due_by_id == {}
@@ -0,0 +1,34 @@
+import tarefas
+
+
+def test_settings_have_one_owner_and_no_private_names():
+    assert not [name for name in tarefas.__all__ if name.startswith("_")]
+    modules = {module for module in tarefas._SETTINGS.values()}
+    for name, owner in tarefas._SETTINGS.items():
+        assert name in vars(owner), name
+    # toda constante pública de um módulo do pacote está registrada, e só no módulo que a define
+    for module in modules:
+        for name in vars(module):
+            if name.isupper() and not name.startswith("_"):
+                assert tarefas._SETTINGS.get(name) is module, f"{module.__name__}.{name}"
+
+
+def test_setting_reaches_every_reader(monkeypatch):
+    monkeypatch.setattr(tarefas, "PRIORITIES", ["Baixa", "Média", "Alta", "Urgente"])
+    assert tarefas.models.PRIORITIES[-1] == "Urgente"
+    assert tarefas.validate_task_record({"title": "t", "priority": "Urgente"})[3] == "Urgente"
+    assert tarefas.digest_alerts([tarefas.make_alert((1, 1, "a", None, "Alta")),
+                                  tarefas.make_alert((2, 2, "b", None, "Urgente"))])["priority"] == "Urgente"
+
+
+def test_baseline_names_still_work_through_trabalho(monkeypatch):
+    import trabalho
+    for name in ("DB", "PRIORITIES", "CHECK_INTERVAL_SECONDS", "init_db", "db_execute", "add_category",
+                 "get_categories", "update_category", "delete_category", "add_task", "get_tasks", "update_task",
+                 "delete_task", "set_task_notified", "parse_datetime_input", "iso_or_none", "format_due_iso",
+                 "main"):
+        assert getattr(trabalho, name) is not None, name
+    # o intervalo antigo do notificador é o da releitura completa
+    monkeypatch.setattr(trabalho, "CHECK_INTERVAL_SECONDS", 5)
+    assert tarefas.RECONCILE_INTERVAL_SECONDS == 5
+    assert tarefas.NotificationScheduler(lambda events: None).reconcile_interval == 5
@@ -0,0 +1,65 @@
+import io
+import json
+
+import pytest
+
+import tarefas
+
+
+def _snapshot():
+    tasks = tarefas.db_execute("""SELECT t.title, t.description, t.due, t.priority, c.title, c.description,
+                                         t.notify, t.notified, r.freq, r.every, r.byday, r.cron, r.until
+                                  FROM tasks t LEFT JOIN categories c ON c.id = t.category_id
+                                  LEFT JOIN task_recurrence r ON r.task_id = t.id ORDER BY t.id""", fetch=True)
+    overrides = tarefas.db_execute("""SELECT t.title, o.occurrence_ts, o.due, o.state FROM task_occurrences o
+                                      JOIN tasks t ON t.id = o.task_id ORDER BY 1, 2""", fetch=True)
+    return tasks, overrides
+
+
+def _fill():
+    tarefas.add_category("Casa", "coisas de casa")
+    cat_id = tarefas.get_categories()[0][0]
+    tarefas.add_task("com segundos", "d", "2030-01-01 10:00:30", "Alta", cat_id)
+    avisada = tarefas.add_task("avisada", "", "2020-01-01 10:00:00", "Baixa", None)
+    tarefas.set_task_notified(avisada)
+    tarefas.add_task("sem data", "", None, "Média", None, notify=False)
+    weekly = tarefas.add_task("semanal", "", "2030-01-07 09:00:00", "Baixa", cat_id)
+    tarefas.set_recurrence(weekly, "weekly", every=2, byday=[0, 2], until="2030-06-01 00:00:00")
+    tarefas.override_occurrence(weekly, "2030-01-07 09:00:00", state="done")
+    tarefas.override_occurrence(weekly, "2030-01-09 09:00:00", due="2030-01-09 11:30:00")
+    cron = tarefas.add_task("cron", "", "2030-01-01 08:00:00", "Baixa", None)
+    tarefas.set_recurrence(cron, "cron", cron="0 8 * * 1-5")
+
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+def test_export_import_round_trip_is_lossless(db, tmp_path, monkeypatch, fmt):
+    _fill()
+    before = _snapshot()
+    data = "".join(tarefas.export_tasks(fmt))
+    monkeypatch.setattr(tarefas, "DB", str(tmp_path / "outro.db"))
+    tarefas.init_db()
+    report = tarefas.import_tasks(io.StringIO(data), fmt)
+    assert (report["imported"], report["error_count"]) == (5, 0)
+    assert _snapshot() == before
+
+
+def test_old_six_column_files_still_import(db):
+    report = tarefas.import_tasks(io.StringIO("title,due\nt,2030-01-01 10:00\n"), "csv")
+    assert report["imported"] == 1
+    assert tarefas.get_tasks()[0][3] == "2030-01-01 10:00:00"
+
+
+def test_bad_rule_is_a_line_error(db):
+    line = json.dumps({"title": "x", "due": "2030-01-01 10:00", "recurrence": "hourly"})
+    report = tarefas.import_tasks(io.StringIO(line + "\n"), "jsonl")
+    assert report["imported"] == 0 and "Recorrência inválida" in report["errors"][0][1]
+
+
+@pytest.mark.parametrize("url", ["/import", "/api/import"])
+def test_non_utf8_upload_is_rejected_with_400(web, url):
+    body = "title\nrelatório\n".encode("latin-1")
+    resp = web.post(url + "?format=csv", data={"file": (io.BytesIO(body), "t.csv")},
+                    content_type="multipart/form-data")
+    assert resp.status_code == 400
+    assert "UTF-8" in resp.get_data(as_text=True)
+    assert tarefas.get_tasks() == []
@@ -0,0 +1,45 @@
+import queue
+
+import pytest
+
+import tarefas
+
+
+def _half_written():
+    # grava e falha: o SAVEPOINT da operação tem de desfazer o INSERT
+    tarefas.add_task("metade", "", None, "Baixa", None)
+    raise ValueError("falhou")
+
+
+def test_failing_op_is_rolled_back_alone(db):
+    writer = tarefas.WriteQueue()
+    # enfileiradas antes de o escritor começar: saem no mesmo lote (uma transação)
+    futures = [writer.add_task(f"t{i}", "", None, "Baixa", None) for i in range(3)]
+    failing = writer.submit(_half_written)
+    futures.append(writer.add_task("depois", "", None, "Baixa", None))
+    writer.start()
+    try:
+        ids = [f.result(timeout=5) for f in futures]
+        with pytest.raises(ValueError):
+            failing.result(timeout=5)
+    finally:
+        writer.stop()
+    # lido por outra conexão (a desta thread), depois do commit do escritor
+    titles = sorted(r[1] for r in tarefas.get_tasks())
+    assert titles == ["depois", "t0", "t1", "t2"]
+    assert sorted(r[0] for r in tarefas.get_tasks()) == sorted(ids)
+
+
+def test_full_queue_rejects_after_the_timeout(db, monkeypatch):
+    monkeypatch.setattr(tarefas, "WRITE_QUEUE_TIMEOUT_SECONDS", 0.05)
+    writer = tarefas.WriteQueue(maxsize=2)
+    accepted = [writer.add_task(f"t{i}", "", None, "Baixa", None) for i in range(2)]
+    with pytest.raises(queue.Full):
+        writer.add_task("recusada", "", None, "Baixa", None)
+    writer.start()
+    try:
+        for future in accepted:
+            future.result(timeout=5)
+    finally:
+        writer.stop()
+    assert sorted(r[1] for r in tarefas.get_tasks()) == ["t0", "t1"]